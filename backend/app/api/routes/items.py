@@ -1,26 +1,19 @@
-from fastapi import APIRouter, HTTPException
-from typing import List, Optional
-import psycopg2
-from psycopg2.extras import RealDictCursor
-import os
-from dotenv import load_dotenv
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from typing import Optional
 from pydantic import BaseModel
-from datetime import datetime, timezone
-
-load_dotenv()
+from ...services.catalog_cache import get_catalog_cache
+from ...services.config import API_MAX_PAGE_SIZE, API_PAGE_SIZE
+from ...services.db_pool import get_pool
+from ...services.items import insert_item
+from ...services.pagination import decode_cursor, parse_fields, project, set_next_cursor, split_page
 
 router = APIRouter(
     prefix="/items",
     tags=["items"]
 )
 
-db_params = {
-    'host': os.getenv('DB_HOST', 'localhost'),
-    'database': os.getenv('DB_NAME', 'cs2skins'),
-    'user': os.getenv('DB_USER'),
-    'password': os.getenv('DB_PASSWORD'),
-    'port': os.getenv('DB_PORT', '5432')
-}
+ITEM_FIELDS = ('item_id', 'market_hash_name', 'item_type', 'weapon_type', 'skin_name', 'wear',
+               'buff_price', 'volume', 'created_at')
 
 class ItemCreate(BaseModel):
     market_hash_name: str
@@ -29,63 +22,47 @@ class ItemCreate(BaseModel):
     skin_name: str
     wear: str
 
+def _select_items(conn, limit: Optional[int] = None, after=None):
+    # Paged from the cached catalog, which holds every item in keyset order, so no SQL runs per page;
+    # idx_items_created_at_item_id serves only the keyset SQL of /api/prices
+    return get_catalog_cache().get(conn).page(after, limit)
+
 @router.post("/")
 async def create_item(item: ItemCreate):
     """Create a new item"""
     try:
-        conn = psycopg2.connect(**db_params)
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        
-        cur.execute("""
-            SELECT item_id FROM items 
-            WHERE market_hash_name = %s
-        """, (item.market_hash_name,))
-        
-        if cur.fetchone():
+        new_item = await get_pool().run(insert_item, item)
+
+        if not new_item:
             raise HTTPException(status_code=400, detail="Item already exists")
-        
-        cur.execute("""
-            INSERT INTO items 
-            (market_hash_name, item_type, weapon_type, skin_name, wear, created_at)
-            VALUES (%s, %s, %s, %s, %s, CURRENT_TIMESTAMP)
-            RETURNING *
-        """, (
-            item.market_hash_name,
-            item.item_type,
-            item.weapon_type,
-            item.skin_name,
-            item.wear
-        ))
-        
-        new_item = cur.fetchone()
-        conn.commit()
+
         return new_item
-        
+
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        if conn:
-            cur.close()
-            conn.close()
 
 @router.get("/")
-async def get_items():
-    """Get all items from database"""
+async def get_items(
+    request: Request,
+    response: Response,
+    limit: int = Query(API_PAGE_SIZE, ge=1, le=API_MAX_PAGE_SIZE, description="Items per page"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return")
+):
+    """Get items newest first, one keyset page at a time"""
+    try:
+        after = decode_cursor(cursor) if cursor else None
+        names = parse_fields(fields, ITEM_FIELDS)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     try:
-        conn = psycopg2.connect(**db_params)
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        
-        cur.execute("""
-            SELECT * FROM items 
-            ORDER BY created_at DESC
-        """)
-        
-        items = cur.fetchall()
-        return items
-        
+        rows = await get_pool().run(_select_items, limit + 1, after)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        if conn:
-            cur.close()
-            conn.close()
\ No newline at end of file
+
+    page, next_cursor = split_page(rows, limit)
+    set_next_cursor(request, response, next_cursor)
+    return project(page, names)
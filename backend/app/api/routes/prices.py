@@ -1,146 +1,274 @@
-from fastapi import APIRouter, HTTPException, Query
-from typing import List, Optional
-from datetime import datetime, timedelta
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from typing import Iterator, List, Optional
+from datetime import datetime, timedelta, timezone
+import asyncio
+import logging
+import threading
 import psycopg2
 from psycopg2.extras import RealDictCursor
-import os
-from dotenv import load_dotenv
-from pydantic import BaseModel
-
-load_dotenv()
-
-db_params = {
-    "host": os.getenv("DB_HOST", "localhost"),
-    "database": os.getenv("DB_NAME"),
-    "user": os.getenv("DB_USER"),
-    "password": os.getenv("DB_PASSWORD"),
-    "port": os.getenv("DB_PORT", "5432")
+from ...services.candles import CANDLE_TABLES
+from ...services.config import (API_MAX_PAGE_SIZE, API_PAGE_SIZE, EXPORT_MAX_CONCURRENT, EXPORT_SEND_TIMEOUT,
+                                HISTORY_MAX_ROWS, RAW_TICK_RETENTION_DAYS, SERIES_MAX_ITEMS)
+from ...services.db_pool import get_pool
+from ...services.history_export import MEDIA_TYPES, stream_price_history
+from ...services.items import insert_item
+from ...services.pagination import decode_cursor, parse_fields, project, set_next_cursor, split_page
+from ...services.price_series import candle_interval, select_price_series
+from ...services.query_cache import get_query_cache
+from .items import ItemCreate
+
+# Selectable fields of the item price listing; latest_prices is only joined for the fields that need it
+ITEM_PRICE_COLUMNS = {
+    'item_id': 'i.item_id',
+    'market_hash_name': 'i.market_hash_name',
+    'item_type': 'i.item_type',
+    'weapon_type': 'i.weapon_type',
+    'skin_name': 'i.skin_name',
+    'wear': 'i.wear',
+    'steam_price': 'steam.price',
+    'buff_price': 'COALESCE(buff.price, i.buff_price)',
+    'volume': 'COALESCE(buff.volume, i.volume)',
+    'price_updated': 'GREATEST(steam.timestamp, buff.timestamp)',
+    'created_at': 'i.created_at'
 }
 
-class ItemCreate(BaseModel):
-    market_hash_name: str
-    item_type: str
-    weapon_type: str
-    skin_name: str
-    wear: str
+logger = logging.getLogger(__name__)
+
+# Each running export holds a pooled connection until its client has read it
+_export_slots = threading.BoundedSemaphore(EXPORT_MAX_CONCURRENT)
 
 router = APIRouter(
     prefix="/prices",
     tags=["prices"]
 )
 
+def _select_items(conn, limit: Optional[int] = None, after=None, fields: Optional[List[str]] = None):
+    cur = conn.cursor(cursor_factory=RealDictCursor)
+
+    # item_id and created_at are always selected: the next page's cursor is built from them
+    names = ['item_id', 'created_at'] + [name for name in fields or ITEM_PRICE_COLUMNS
+                                         if name not in ('item_id', 'created_at')]
+    columns = [f"{ITEM_PRICE_COLUMNS[name]} as {name}" for name in names]
+    query = f"""
+        SELECT {', '.join(columns)}
+        FROM items i
+    """
+    if any('steam.' in ITEM_PRICE_COLUMNS[name] for name in names):
+        query += " LEFT JOIN latest_prices steam ON steam.item_id = i.item_id AND steam.source = 'steam'"
+    if any('buff.' in ITEM_PRICE_COLUMNS[name] for name in names):
+        query += " LEFT JOIN latest_prices buff ON buff.item_id = i.item_id AND buff.source = 'buff'"
+    params = []
+
+    if after:
+        query += " WHERE (i.created_at, i.item_id) < (%s, %s)"
+        params.extend(after)
+
+    query += " ORDER BY i.created_at DESC, i.item_id DESC"
+
+    if limit is not None:
+        query += " LIMIT %s"
+        params.append(limit)
+
+    cur.execute(query, params)
+    return cur.fetchall()
+
+def history_interval(days: int) -> str:
+    """Raw ticks while compaction keeps them for the whole range, closing prices of candles beyond"""
+    return 'raw' if days <= RAW_TICK_RETENTION_DAYS else candle_interval(days)
+
+def _select_price_history(conn, item_id: str, days: int, source: Optional[str], limit: int = HISTORY_MAX_ROWS):
+    cur = conn.cursor(cursor_factory=RealDictCursor)
+
+    interval = history_interval(days)
+    if interval == 'raw':
+        query = """
+            SELECT 
+                ph.price,
+                ph.volume,
+                ph.source,
+                ph.timestamp,
+                i.market_hash_name
+            FROM price_history ph
+            JOIN items i ON ph.item_id = i.item_id
+            WHERE ph.item_id = %s
+            AND ph.timestamp >= %s
+        """
+    else:
+        query = f"""
+            SELECT 
+                ph.close as price,
+                ph.volume,
+                ph.source,
+                ph.bucket as timestamp,
+                i.market_hash_name
+            FROM {CANDLE_TABLES[interval][0]} ph
+            JOIN items i ON ph.item_id = i.item_id
+            WHERE ph.item_id = %s
+            AND ph.bucket >= %s
+        """
+
+    params = [item_id, datetime.now(timezone.utc) - timedelta(days=days)]
+
+    if source:
+        query += " AND ph.source = %s"
+        params.append(source)
+
+    query += f" ORDER BY ph.{'timestamp' if interval == 'raw' else 'bucket'} DESC LIMIT %s"
+    params.append(limit)
+
+    cur.execute(query, params)
+    return cur.fetchall()
+
+def _select_price_analysis(conn, item_id: str):
+    cur = conn.cursor(cursor_factory=RealDictCursor)
+
+    cur.execute("""
+        WITH price_stats AS (
+            SELECT 
+                SUM(price_sum) / SUM(tick_count) as avg_price,
+                MIN(low) as min_price,
+                MAX(high) as max_price,
+                source
+            FROM price_candles_hourly
+            WHERE item_id = %s
+            AND bucket >= NOW() - INTERVAL '7 days'
+            GROUP BY source
+        )
+        SELECT 
+            source,
+            ROUND(avg_price::numeric, 2) as average_price,
+            min_price,
+            max_price
+        FROM price_stats
+    """, (item_id,))
+    return cur.fetchall()
+
 @router.post("/")
-async def add_item(item: dict):
+async def add_item(item: ItemCreate):
     """Add a new item to the database"""
     try:
-        conn = psycopg2.connect(**db_params)
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        
-        cur.execute("""
-            SELECT item_id FROM items 
-            WHERE market_hash_name = %s
-        """, (item.market_hash_name,))
-        
-        if cur.fetchone():
+        new_item = await get_pool().run(insert_item, item)
+
+        if not new_item:
             raise HTTPException(status_code=400, detail="Item already exists")
-        
 
-        cur.execute("""
-            INSERT INTO items 
-            (market_hash_name, type, weapon_type, skin_name, wear)
-            VALUES (%s, %s, %s, %s, %s, CURRENT_TIMESTAMP)
-            RETURNING *
-        """, (
-            item.market_hash_name,
-            item.item_type,
-            item.weapon_type,
-            item.skin_name,
-            item.wear
-        ))
-        
-        new_item = cur.fetchone()
-        conn.commit()
         return new_item
-        
+
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        if conn:
-            cur.close()
-            conn.close()
 
 @router.get("/")
-async def get_items():
-    """Get all items from database"""
+async def get_items(
+    request: Request,
+    response: Response,
+    limit: int = Query(API_PAGE_SIZE, ge=1, le=API_MAX_PAGE_SIZE, description="Items per page"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return")
+):
+    """Get items with their latest prices, newest first, one keyset page at a time"""
     try:
-        conn = psycopg2.connect(**db_params)
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        
-        cur.execute("""
-            SELECT 
-                item_id,
-                market_hash_name,
-                item_type,
-                weapon_type,
-                skin_name,
-                wear,
-                steam_price,
-                buff_price,
-                volume,
-                created_at
-            FROM items 
-            ORDER BY created_at DESC
-        """)
-        
-        items = cur.fetchall()
-        return items
-        
+        after = decode_cursor(cursor) if cursor else None
+        names = parse_fields(fields, list(ITEM_PRICE_COLUMNS))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        rows = await get_pool().run(_select_items, limit + 1, after, names)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    page, next_cursor = split_page(rows, limit)
+    set_next_cursor(request, response, next_cursor)
+    return project(page, names)
+
+def _export_price_history(since: datetime, item_ids: Optional[List[int]], source: Optional[str], export_format: str):
+    # Entered on the first chunk, in Starlette's threadpool; the connection is held until the stream ends
+    with get_pool().connection() as conn:
+        yield from stream_price_history(conn, since, item_ids, source, export_format)
+
+class ExportResponse(StreamingResponse):
+    """Stream an export, giving up on clients that stop reading for send_timeout seconds.
+
+    However the response ends, the export's generator is closed (returning its connection to the
+    pool) and the export slot taken for it is released.
+    """
+
+    def __init__(self, content: Iterator[str], slot: threading.BoundedSemaphore,
+                 send_timeout: float = EXPORT_SEND_TIMEOUT, **kwargs):
+        super().__init__(content, **kwargs)
+        self.content = content
+        self.slot = slot
+        self.send_timeout = send_timeout
+
+    async def __call__(self, scope, receive, send):
+        async def timed_send(message):
+            await asyncio.wait_for(send(message), self.send_timeout)
+
+        try:
+            await super().__call__(scope, receive, timed_send)
+        except asyncio.TimeoutError:
+            logger.warning(f"Export client stopped reading for {self.send_timeout}s, dropping the stream")
+        finally:
+            try:
+                await run_in_threadpool(self.content.close)
+            finally:
+                self.slot.release()
+
+@router.get("/export")
+async def export_price_history(
+    item_id: Optional[List[int]] = Query(None, description="Items to export (repeatable); all items if omitted"),
+    days: int = Query(30, ge=1, description="Number of days of raw history to export"),
+    source: Optional[str] = Query(None, description="Filter by source (steam/buff)"),
+    format: str = Query('ndjson', pattern='^(ndjson|csv)$', description="ndjson or csv")
+):
+    """Stream raw price ticks as NDJSON or CSV without loading the range into memory"""
+    if days > RAW_TICK_RETENTION_DAYS:
+        raise HTTPException(status_code=400, detail=f"Raw ticks are kept for {RAW_TICK_RETENTION_DAYS} days; "
+                                                    "use /api/prices/series for longer ranges")
+    if not _export_slots.acquire(blocking=False):
+        raise HTTPException(status_code=503, detail=f"{EXPORT_MAX_CONCURRENT} exports are already running; retry later")
+
+    since = datetime.now(timezone.utc) - timedelta(days=days)
+    return ExportResponse(
+        _export_price_history(since, item_id, source, format),
+        _export_slots,
+        media_type=MEDIA_TYPES[format],
+        headers={'Content-Disposition': f'attachment; filename="price_history.{format}"'}
+    )
+
+@router.get("/series")
+async def get_price_series(
+    item_id: List[int] = Query(..., description="Items to chart (repeatable)"),
+    days: int = Query(30, ge=1, description="Number of days of history"),
+    points: int = Query(200, ge=3, le=2000, description="Maximum points per series"),
+    source: str = Query('buff', pattern='^(buff|steam)$', description="Price source (steam/buff)")
+):
+    """Downsampled closing-price series for many items in one request, for charts"""
+    item_ids = list(dict.fromkeys(item_id))
+    if len(item_ids) > SERIES_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {SERIES_MAX_ITEMS} items per request")
+
+    try:
+        return await get_pool().run(select_price_series, item_ids, days, points, source)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        if conn:
-            cur.close()
-            conn.close()
 
 @router.get("/{item_id}/history")
 async def get_price_history(
+    response: Response,
     item_id: str,
     days: Optional[int] = Query(7, description="Number of days of history to fetch"),
-    source: Optional[str] = Query(None, description="Filter by source (steam/buff)")
+    source: Optional[str] = Query(None, description="Filter by source (steam/buff)"),
+    limit: int = Query(HISTORY_MAX_ROWS, ge=1, le=HISTORY_MAX_ROWS, description="Most recent rows to return")
 ):
-    """Get price history for a specific item"""
+    """Get price history for a specific item: raw ticks, or hourly/daily closes past the raw retention"""
     try:
-        conn = psycopg2.connect(**db_params)
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        
-        query = """
-            SELECT 
-                ph.price,
-                ph.volume,
-                ph.source,
-                ph.timestamp,
-                i.market_hash_name
-            FROM price_history ph
-            JOIN items i ON ph.item_id = i.id
-            WHERE ph.item_id = %s
-            AND ph.timestamp >= %s
-        """
-        
-        params = [item_id, datetime.now() - timedelta(days=days)]
-        
-        if source:
-            query += " AND ph.source = %s"
-            params.append(source)
-            
-        query += " ORDER BY ph.timestamp DESC"
-        
-        cur.execute(query, params)
-        results = cur.fetchall()
-        
-        cur.close()
-        conn.close()
-        
-        return results
+        response.headers['X-Price-Interval'] = history_interval(days)
+        return await get_pool().run(_select_price_history, item_id, days, source, limit)
     except psycopg2.Error as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
     except Exception as e:
@@ -150,35 +278,10 @@ async def get_price_history(
 async def get_price_analysis(item_id: str):
     """Get price analysis for an item"""
     try:
-        conn = psycopg2.connect(**db_params)
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        
-        cur.execute("""
-            WITH price_stats AS (
-                SELECT 
-                    AVG(price) as avg_price,
-                    MIN(price) as min_price,
-                    MAX(price) as max_price,
-                    source
-                FROM price_history
-                WHERE item_id = %s
-                AND timestamp >= NOW() - INTERVAL '7 days'
-                GROUP BY source
-            )
-            SELECT 
-                source,
-                ROUND(avg_price::numeric, 2) as average_price,
-                min_price,
-                max_price
-            FROM price_stats
-        """, (item_id,))
-        
-        analysis = cur.fetchall()
-        return analysis
+        return await get_query_cache().cached(
+            'price_analysis', {'item_id': item_id}, lambda: get_pool().run(_select_price_analysis, item_id),
+            item_id=int(item_id) if item_id.isdigit() else None
+        )
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        if conn:
-            cur.close()
-            conn.close()
\ No newline at end of file
@@ -1,14 +1,16 @@
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
-from datetime import datetime, timedelta
-import psycopg2
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
 from dotenv import load_dotenv
-from typing import List, Dict, Optional
+from typing import Optional
 from psycopg2.extras import RealDictCursor
-import statistics
-import os
 from app.api.routes import items, prices
+from app.services.analytics_snapshots import latest_snapshot, refresh_snapshot
+from app.services.catalog_cache import get_catalog_cache
+from app.services.db_pool import init_pool, close_pool, get_pool
+from app.services.query_cache import get_query_cache
 import logging
 
 logging.basicConfig(
@@ -23,70 +25,142 @@ logger = logging.getLogger(__name__)
 
 load_dotenv()
 
-db_params = {
-    'host': os.getenv('DB_HOST', 'localhost'),
-    'database': os.getenv('DB_NAME', 'cs2skins'),
-    'user': os.getenv('DB_USER'),
-    'password': os.getenv('DB_PASSWORD'),
-    'port': os.getenv('DB_PORT', '5432')
-}
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    init_pool()
+    yield
+    close_pool()
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 templates = Jinja2Templates(directory="app/templates")
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
 
 app.include_router(items.router, prefix="/api")
 app.include_router(prices.router, prefix="/api")
 
+def _ping(conn):
+    cur = conn.cursor()
+    cur.execute("SELECT 1")
+    cur.close()
+
+@app.get("/health")
+async def health():
+    """Database reachability and connection pool metrics"""
+    try:
+        await get_pool().run(_ping)
+        return {"status": "ok", "pool": get_pool().stats(), "catalog": get_catalog_cache().stats(),
+                "query_cache": get_query_cache().stats()}
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+def _load_skin_detail(conn, item_id: int):
+    item = get_catalog_cache().get_item(conn, item_id)
+    if not item:
+        return None, []
+
+    cur = conn.cursor(cursor_factory=RealDictCursor)
+    # One market per chart: Buff prices are CNY and Steam prices USD
+    cur.execute("""
+        SELECT close as price, high, low, price_sum, tick_count, bucket::date as date
+        FROM price_candles_hourly
+        WHERE item_id = %s
+        AND source = 'buff'
+        AND bucket >= NOW() - INTERVAL '7 days'
+        ORDER BY bucket ASC
+    """, (item_id,))
+    return item, cur.fetchall()
+
 @app.get("/skin/{item_id}")
 async def skin_detail(request: Request, item_id: int):
     try:
-        conn = psycopg2.connect(**db_params)
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        
-        cur.execute("""
-            SELECT * FROM items WHERE item_id = %s
-        """, (item_id,))
-        item = cur.fetchone()
-        
+        item, history = await get_pool().run(_load_skin_detail, item_id)
+
         if not item:
             raise HTTPException(status_code=404, detail="Item not found")
-        
-        cur.execute("""
-            SELECT price, timestamp::date as date
-            FROM price_history
-            WHERE item_id = %s
-            AND timestamp >= NOW() - INTERVAL '7 days'
-            ORDER BY timestamp ASC
-        """, (item_id,))
-        history = cur.fetchall()
-        
+
         price_history = {
             "dates": [h['date'].strftime('%Y-%m-%d') for h in history],
             "prices": [float(h['price']) for h in history]
         }
-        
-        prices = [float(h['price']) for h in history]
+
+        ticks = sum(h['tick_count'] for h in history)
         stats = {
-            "avg_price": statistics.mean(prices) if prices else None,
-            "max_price": max(prices) if prices else None,
-            "min_price": min(prices) if prices else None
+            "avg_price": sum(h['price_sum'] for h in history) / ticks if ticks else None,
+            "max_price": max(h['high'] for h in history) if history else None,
+            "min_price": min(h['low'] for h in history) if history else None
         }
-        
+
         return templates.TemplateResponse("skin_details.html", {
             "request": request,
             "item": item,
             "price_history": price_history,
             "stats": stats
         })
-        
+
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        if cur:
-            cur.close()
-        if conn:
-            conn.close()
+
+SORT_COLUMNS = {
+    "name": "i.market_hash_name",
+    "price": "current_price",
+    "type": "i.weapon_type",
+    "wear": "i.wear"
+}
+
+def _load_skins(conn, weapon_type, wear, min_price, max_price, sort_by, order):
+    catalog = get_catalog_cache().get(conn)
+    weapon_types, wears = catalog.weapon_types, catalog.wears
+
+    cur = conn.cursor(cursor_factory=RealDictCursor)
+
+    # Buff prices (CNY) only, like /api/prices: Steam ticks are USD and must not be compared with them
+    query = """
+        SELECT i.*, 
+               COALESCE(ph.price, i.buff_price) as current_price,
+               ph.timestamp as price_updated
+        FROM items i
+        LEFT JOIN latest_prices ph ON ph.item_id = i.item_id AND ph.source = 'buff'
+        WHERE 1=1
+    """
+    params = []
+
+    if weapon_type:
+        query += " AND i.weapon_type = %s"
+        params.append(weapon_type)
+
+    if wear:
+        query += " AND i.wear = %s"
+        params.append(wear)
+
+    if min_price:
+        query += " AND COALESCE(ph.price, i.buff_price) >= %s"
+        params.append(min_price)
+
+    if max_price:
+        query += " AND COALESCE(ph.price, i.buff_price) <= %s"
+        params.append(max_price)
+
+    sort_column = SORT_COLUMNS.get(sort_by, "i.market_hash_name")
+
+    query += f" ORDER BY {sort_column} {'DESC' if order == 'desc' else 'ASC'}"
+
+    cur.execute(query, params)
+    items = cur.fetchall()
+
+    cur.execute("""
+        SELECT 
+            COUNT(*) as total_items,
+            AVG(COALESCE(ph.price, i.buff_price)) as avg_price,
+            MIN(COALESCE(ph.price, i.buff_price)) as min_price,
+            MAX(COALESCE(ph.price, i.buff_price)) as max_price
+        FROM items i
+        LEFT JOIN latest_prices ph ON ph.item_id = i.item_id AND ph.source = 'buff'
+    """)
+    stats = cur.fetchone()
+    return weapon_types, wears, items, stats
+
 @app.get("/")
 @app.get("/skins")
 async def list_skins(
@@ -99,72 +173,16 @@ async def list_skins(
     order: Optional[str] = "asc"
 ):
     try:
-        conn = psycopg2.connect(**db_params)
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        
-        cur.execute("SELECT DISTINCT weapon_type FROM items ORDER BY weapon_type")
-        weapon_types = [row['weapon_type'] for row in cur.fetchall()]
-        
-        cur.execute("SELECT DISTINCT wear FROM items WHERE wear IS NOT NULL ORDER BY wear")
-        wears = [row['wear'] for row in cur.fetchall()]
-        
-        query = """
-            SELECT i.*, 
-                   COALESCE(ph.price, i.buff_price) as current_price,
-                   ph.timestamp as price_updated
-            FROM items i
-            LEFT JOIN (
-                SELECT DISTINCT ON (item_id) item_id, price, timestamp
-                FROM price_history
-                ORDER BY item_id, timestamp DESC
-            ) ph ON i.item_id = ph.item_id
-            WHERE 1=1
-        """
-        params = []
-        
-        if weapon_type:
-            query += " AND i.weapon_type = %s"
-            params.append(weapon_type)
-        
-        if wear:
-            query += " AND i.wear = %s"
-            params.append(wear)
-        
-        if min_price:
-            query += " AND COALESCE(ph.price, i.buff_price) >= %s"
-            params.append(min_price)
-        
-        if max_price:
-            query += " AND COALESCE(ph.price, i.buff_price) <= %s"
-            params.append(max_price)
-        
-        sort_column = {
-            "name": "i.market_hash_name",
-            "price": "current_price",
-            "type": "i.weapon_type",
-            "wear": "i.wear"
-        }.get(sort_by, "i.market_hash_name")
-        
-        query += f" ORDER BY {sort_column} {'DESC' if order == 'desc' else 'ASC'}"
-        
-        cur.execute(query, params)
-        items = cur.fetchall()
-        
-        cur.execute("""
-            SELECT 
-                COUNT(*) as total_items,
-                AVG(COALESCE(ph.price, i.buff_price)) as avg_price,
-                MIN(COALESCE(ph.price, i.buff_price)) as min_price,
-                MAX(COALESCE(ph.price, i.buff_price)) as max_price
-            FROM items i
-            LEFT JOIN (
-                SELECT DISTINCT ON (item_id) item_id, price
-                FROM price_history
-                ORDER BY item_id, timestamp DESC
-            ) ph ON i.item_id = ph.item_id
-        """)
-        stats = cur.fetchone()
-        
+        # Normalized the way _load_skins interprets them, so equivalent URLs share an entry
+        sort_by = sort_by if sort_by in SORT_COLUMNS else "name"
+        order = "desc" if order == "desc" else "asc"
+        weapon_types, wears, items, stats = await get_query_cache().cached(
+            'skins',
+            {'weapon_type': weapon_type or None, 'wear': wear or None, 'min_price': min_price or None,
+             'max_price': max_price or None, 'sort_by': sort_by, 'order': order},
+            lambda: get_pool().run(_load_skins, weapon_type, wear, min_price, max_price, sort_by, order)
+        )
+
         return templates.TemplateResponse("skins.html", {
             "request": request,
             "items": items,
@@ -180,86 +198,26 @@ async def list_skins(
                 "order": order
             }
         })
-        
+
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        if cur:
-            cur.close()
-        if conn:
-            conn.close()
+
+def _load_analytics(conn):
+    snapshot = latest_snapshot(conn)
+    if snapshot is None:
+        # Nothing computed yet (fresh database, no collection run): compute the first one now
+        refresh_snapshot(conn, min_interval=0)
+        snapshot = latest_snapshot(conn)
+    return snapshot
 
 @app.get("/analytics")
 async def analytics(request: Request):
     try:
-        conn = psycopg2.connect(**db_params)
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        
-        cur.execute("""
-            SELECT 
-                COUNT(DISTINCT i.item_id) as total_items,
-                COUNT(DISTINCT ph.id) as total_price_points,
-                COALESCE(AVG(NULLIF(ph.price, 0)), 0) as overall_avg_price
-            FROM items i
-            LEFT JOIN price_history ph ON i.item_id = ph.item_id
-        """)
-        market_stats = cur.fetchone()
-        
-        cur.execute("""
-            SELECT 
-                i.market_hash_name,
-                COALESCE(AVG(NULLIF(ph.price, 0)), 0) as avg_price,
-                COALESCE(MIN(NULLIF(ph.price, 0)), 0) as min_price,
-                COALESCE(MAX(NULLIF(ph.price, 0)), 0) as max_price,
-                COUNT(DISTINCT ph.id) as data_points
-            FROM items i
-            LEFT JOIN price_history ph ON i.item_id = ph.item_id
-            WHERE ph.timestamp >= NOW() - INTERVAL '30 days'
-            GROUP BY i.market_hash_name
-            HAVING COUNT(ph.id) > 0
-            ORDER BY avg_price DESC
-            LIMIT 10
-        """)
-        top_items = cur.fetchall() or []
-
-        cur.execute("""
-            WITH daily_prices AS (
-                SELECT 
-                    item_id,
-                    DATE(timestamp) as date,
-                    AVG(NULLIF(price, 0)) as avg_daily_price
-                FROM price_history
-                WHERE timestamp >= NOW() - INTERVAL '30 days'
-                GROUP BY item_id, DATE(timestamp)
-            ),
-            price_changes AS (
-                SELECT 
-                    i.market_hash_name,
-                    COALESCE(
-                        (
-                            MAX(CASE WHEN date = DATE(NOW()) THEN avg_daily_price END) -
-                            MIN(CASE WHEN date = DATE(NOW() - INTERVAL '7 days') THEN avg_daily_price END)
-                        ) / NULLIF(MIN(CASE WHEN date = DATE(NOW() - INTERVAL '7 days') THEN avg_daily_price END), 0) * 100,
-                        0
-                    ) as price_change
-                FROM daily_prices dp
-                JOIN items i ON dp.item_id = i.item_id
-                GROUP BY i.market_hash_name
-                HAVING COUNT(dp.avg_daily_price) > 0
-            )
-            SELECT 
-                market_hash_name,
-                CASE 
-                    WHEN price_change::text = 'NaN' OR price_change::text = 'infinity' 
-                    THEN 0 
-                    ELSE price_change 
-                END as price_change
-            FROM price_changes
-            WHERE price_change IS NOT NULL
-            ORDER BY ABS(price_change) DESC
-            LIMIT 5
-        """)
-        trending_items = cur.fetchall() or []
+        snapshot = await get_pool().run(_load_analytics)
+        data = snapshot['data'] if snapshot else {}
+        market_stats = data.get('market_stats')
+        top_items = data.get('top_items') or []
+        trending_items = data.get('trending_items') or []
 
         if not market_stats:
             market_stats = {
@@ -267,22 +225,22 @@ async def analytics(request: Request):
                 'total_price_points': 0,
                 'overall_avg_price': 0
             }
-        
+
         return templates.TemplateResponse("analytics.html", {
             "request": request,
             "top_items": top_items,
             "market_stats": market_stats,
-            "trending_items": trending_items
+            "trending_items": trending_items,
+            "snapshot": {
+                "version": snapshot['version'],
+                "computed_at": snapshot['computed_at'].astimezone(timezone.utc),
+                "age_seconds": (datetime.now(timezone.utc) - snapshot['computed_at']).total_seconds()
+            } if snapshot else None
         })
-        
+
     except Exception as e:
         logger.error(f"Analytics error: {str(e)}")
         raise HTTPException(
             status_code=500,
             detail="Error generating analytics. Please try again later."
         )
-    finally:
-        if cur:
-            cur.close()
-        if conn:
-            conn.close()
\ No newline at end of file
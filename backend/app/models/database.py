@@ -1,5 +1,6 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, ForeignKey
-from sqlalchemy.orm import declarative_base
+from sqlalchemy import create_engine, Column, BigInteger, Integer, String, Float, DateTime, ForeignKey
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import declarative_base, declared_attr
 from datetime import datetime, timezone
 import os
 from dotenv import load_dotenv
@@ -23,23 +24,117 @@ class Item(Base):
     volume = Column(Integer, nullable=True)
     created_at = Column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc))
 
+    __table_args__ = (
+        Index('idx_items_created_at_item_id', 'created_at', 'item_id'),  # keyset pagination of /api/prices (/api/items pages the cached catalog)
+    )
+
 class PriceHistory(Base):
     __tablename__ = 'price_history'
     
+    # Range-partitioned by month on timestamp (see services/partitions.py), so the
+    # partition key has to be part of the primary key
     id = Column(Integer, primary_key=True, autoincrement=True)
     item_id = Column(Integer, ForeignKey('items.item_id', ondelete='CASCADE'))
     price = Column(Float, nullable=False)
     volume = Column(Integer, nullable=True)
     source = Column(String, nullable=False)  # 'steam' or 'buff'
-    timestamp = Column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc))
+    timestamp = Column(DateTime(timezone=True), primary_key=True, default=lambda: datetime.now(timezone.utc))
 
     __table_args__ = (
-        Index('idx_price_history_item_id', 'item_id'),
+        Index('idx_price_history_item_timestamp', 'item_id', 'timestamp'),
         Index('idx_price_history_timestamp', 'timestamp'),
-        Index('idx_price_history_source', 'source')
+        {'postgresql_partition_by': 'RANGE (timestamp)'}
     )
 
+class LatestPrice(Base):
+    __tablename__ = 'latest_prices'
+
+    # Newest tick per item and source, maintained by PriceWriter alongside price_history
+    item_id = Column(Integer, ForeignKey('items.item_id', ondelete='CASCADE'), primary_key=True)
+    source = Column(String, primary_key=True)
+    price = Column(Float, nullable=False)
+    volume = Column(Integer, nullable=True)
+    timestamp = Column(DateTime(timezone=True), nullable=False)
+
+class CandleMixin:
+    """OHLC rollup of price ticks per item, source and UTC bucket, maintained by PriceWriter"""
+
+    @declared_attr
+    def item_id(cls):
+        return Column(Integer, ForeignKey('items.item_id', ondelete='CASCADE'), primary_key=True)
+
+    source = Column(String, primary_key=True)
+    bucket = Column(DateTime(timezone=True), primary_key=True)
+    open = Column(Float, nullable=False)
+    high = Column(Float, nullable=False)
+    low = Column(Float, nullable=False)
+    close = Column(Float, nullable=False)
+    open_at = Column(DateTime(timezone=True), nullable=False)   # tick times, so late ticks merge correctly
+    close_at = Column(DateTime(timezone=True), nullable=False)
+    price_sum = Column(Float, nullable=False)                   # avg = price_sum / tick_count
+    tick_count = Column(Integer, nullable=False)
+    volume = Column(Integer, nullable=True)                     # volume reported by the closing tick
+
+class PriceCandleHourly(CandleMixin, Base):
+    __tablename__ = 'price_candles_hourly'
+
+    __table_args__ = (
+        Index('idx_price_candles_hourly_bucket', 'bucket'),
+        Index('idx_price_candles_hourly_item_bucket', 'item_id', 'bucket'),  # the primary key leads with source
+    )
+
+class PriceCandleDaily(CandleMixin, Base):
+    __tablename__ = 'price_candles_daily'
+
+    __table_args__ = (
+        Index('idx_price_candles_daily_bucket', 'bucket'),
+        Index('idx_price_candles_daily_item_bucket', 'item_id', 'bucket'),  # the primary key leads with source
+    )
+
+class CompactionState(Base):
+    __tablename__ = 'compaction_state'
+
+    # Everything before the watermark has been compacted for this tier ('raw' or 'hourly')
+    tier = Column(String, primary_key=True)
+    watermark = Column(DateTime(timezone=True), nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc))
+
+class AnalyticsSnapshot(Base):
+    __tablename__ = 'analytics_snapshots'
+
+    # Market analytics computed after collection runs; the highest snapshot_id is the current version
+    snapshot_id = Column(Integer, primary_key=True, autoincrement=True)
+    computed_at = Column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc))
+    duration_ms = Column(Float, nullable=False)
+    data = Column(JSONB, nullable=False)   # market_stats, top_items, trending_items
+
+class CacheVersion(Base):
+    __tablename__ = 'cache_versions'
+
+    # Bumped with every write that cached reads depend on, so web processes notice other processes' writes
+    name = Column(String, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc))
+
+class CollectionRun(Base):
+    __tablename__ = 'collection_runs'
+
+    run_id = Column(Integer, primary_key=True, autoincrement=True)
+    status = Column(String, nullable=False, default='running')  # running, completed, abandoned
+    items_total = Column(Integer, nullable=True)
+    started_at = Column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc))
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+class CollectionCheckpoint(Base):
+    __tablename__ = 'collection_checkpoints'
+
+    run_id = Column(Integer, ForeignKey('collection_runs.run_id', ondelete='CASCADE'), primary_key=True)
+    item_id = Column(Integer, ForeignKey('items.item_id', ondelete='CASCADE'), primary_key=True)
+
 def init_database():
+    # Imported lazily so the models stay importable on their own, e.g. as backend.app.models.database from scripts/
+    from ..services.partitions import ensure_partitions
+
     db_params = {
         'host': os.getenv('DB_HOST', 'localhost'),
         'database': os.getenv('DB_NAME', 'cs2skins'),
@@ -54,8 +149,11 @@ def init_database():
     
     Base.metadata.drop_all(engine)
     Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        ensure_partitions(conn.connection)
     
     return engine
 
+# Run from backend/ as: python -m app.models.database
 if __name__ == "__main__":
     init_database()
\ No newline at end of file
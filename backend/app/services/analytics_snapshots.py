@@ -0,0 +1,139 @@
+import json
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from psycopg2.extras import Json, RealDictCursor
+
+from .config import ANALYTICS_REFRESH_INTERVAL, ANALYTICS_SNAPSHOTS_KEPT
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary pg_advisory lock key: one snapshot computation at a time across processes
+REFRESH_LOCK_KEY = 74231901
+
+
+def compute_analytics(conn) -> Dict:
+    """Market stats, the top 10 items of the last 30 days and the 5 biggest weekly movers"""
+    cur = conn.cursor(cursor_factory=RealDictCursor)
+    try:
+        cur.execute("""
+            SELECT 
+                (SELECT COUNT(*) FROM items) as total_items,
+                COALESCE(SUM(tick_count), 0) as total_price_points,
+                COALESCE(SUM(price_sum) / NULLIF(SUM(tick_count), 0), 0) as overall_avg_price
+            FROM price_candles_daily
+        """)
+        market_stats = cur.fetchone()
+
+        cur.execute("""
+            SELECT 
+                i.market_hash_name,
+                SUM(c.price_sum) / SUM(c.tick_count) as avg_price,
+                MIN(c.low) as min_price,
+                MAX(c.high) as max_price,
+                SUM(c.tick_count) as data_points
+            FROM price_candles_daily c
+            JOIN items i ON c.item_id = i.item_id
+            WHERE c.bucket >= NOW() - INTERVAL '30 days'
+            GROUP BY i.market_hash_name
+            ORDER BY avg_price DESC
+            LIMIT 10
+        """)
+        top_items = cur.fetchall() or []
+
+        cur.execute("""
+            WITH daily_prices AS (
+                SELECT 
+                    item_id,
+                    (bucket AT TIME ZONE 'UTC')::date as date,
+                    SUM(price_sum) / NULLIF(SUM(tick_count), 0) as avg_daily_price
+                FROM price_candles_daily
+                WHERE bucket >= NOW() - INTERVAL '30 days'
+                GROUP BY item_id, bucket
+            ),
+            price_changes AS (
+                SELECT 
+                    i.market_hash_name,
+                    COALESCE(
+                        (
+                            MAX(CASE WHEN date = (NOW() AT TIME ZONE 'UTC')::date THEN avg_daily_price END) -
+                            MIN(CASE WHEN date = ((NOW() - INTERVAL '7 days') AT TIME ZONE 'UTC')::date THEN avg_daily_price END)
+                        ) / NULLIF(MIN(CASE WHEN date = ((NOW() - INTERVAL '7 days') AT TIME ZONE 'UTC')::date THEN avg_daily_price END), 0) * 100,
+                        0
+                    ) as price_change
+                FROM daily_prices dp
+                JOIN items i ON dp.item_id = i.item_id
+                GROUP BY i.market_hash_name
+                HAVING COUNT(dp.avg_daily_price) > 0
+            )
+            SELECT 
+                market_hash_name,
+                CASE 
+                    WHEN price_change::text = 'NaN' OR price_change::text = 'infinity' 
+                    THEN 0 
+                    ELSE price_change 
+                END as price_change
+            FROM price_changes
+            WHERE price_change IS NOT NULL
+            ORDER BY ABS(price_change) DESC
+            LIMIT 5
+        """)
+        trending_items = cur.fetchall() or []
+    finally:
+        cur.close()
+    return {'market_stats': market_stats, 'top_items': top_items, 'trending_items': trending_items}
+
+
+def latest_snapshot(conn) -> Optional[Dict]:
+    """The newest snapshot: version (its snapshot_id), computed_at, duration_ms and data"""
+    cur = conn.cursor(cursor_factory=RealDictCursor)
+    try:
+        cur.execute("""
+            SELECT snapshot_id as version, computed_at, duration_ms, data
+            FROM analytics_snapshots
+            ORDER BY snapshot_id DESC
+            LIMIT 1
+        """)
+        return cur.fetchone()
+    finally:
+        cur.close()
+
+
+def refresh_snapshot(conn, min_interval: float = ANALYTICS_REFRESH_INTERVAL,
+                     keep: int = ANALYTICS_SNAPSHOTS_KEPT) -> Optional[int]:
+    """Compute and store a new snapshot, returning its version.
+
+    Skipped (returning None) when the latest snapshot is younger than min_interval seconds or
+    another process is already computing one. Only the newest keep snapshots are retained.
+    """
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT pg_try_advisory_xact_lock(%s)", (REFRESH_LOCK_KEY,))
+        if not cur.fetchone()[0]:
+            logger.info("Analytics snapshot already being computed elsewhere; skipping")
+            conn.rollback()
+            return None
+
+        cur.execute("SELECT MAX(computed_at) FROM analytics_snapshots")
+        last = cur.fetchone()[0]
+        if last and (datetime.now(timezone.utc) - last).total_seconds() < min_interval:
+            conn.rollback()
+            return None
+
+        started = time.perf_counter()
+        data = compute_analytics(conn)
+        duration_ms = (time.perf_counter() - started) * 1000
+        cur.execute("""
+            INSERT INTO analytics_snapshots (computed_at, duration_ms, data)
+            VALUES (NOW(), %s, %s)
+            RETURNING snapshot_id
+        """, (duration_ms, Json(data, dumps=lambda value: json.dumps(value, default=float))))
+        version = cur.fetchone()[0]
+        cur.execute("DELETE FROM analytics_snapshots WHERE snapshot_id <= %s", (version - keep,))
+        conn.commit()
+        logger.info(f"Stored analytics snapshot {version} in {duration_ms:.0f}ms")
+        return version
+    finally:
+        cur.close()
@@ -9,24 +9,96 @@ import os
 from dotenv import load_dotenv
 from typing import List, Dict, Optional
 import asyncio
-import logger
+import aiohttp
+import logging
+from .rate_limiter import get_rate_limiter
+from .response_cache import get_response_cache
+from .http_recorder import get_http_recorder
+from .price_writer import PriceWriter
+from .db_pool import get_db_params
 
 load_dotenv()
+logger = logging.getLogger(__name__)
 
 class BuffParser:
-    def __init__(self):
-        self.db_params = {
-            'host': os.getenv('DB_HOST', 'localhost'),
-            'database': os.getenv('DB_NAME', 'cs2skins'),
-            'user': os.getenv('DB_USER'),
-            'password': os.getenv('DB_PASSWORD'),
-            'port': os.getenv('DB_PORT', '5432')
-        }
+    def __init__(self, max_connections: int = 20, max_retries: int = 3):
+        self.db_params = get_db_params()
         
-        self.base_url = "https://buff.163.com/api/market/goods"
+        self.base_url = os.getenv('BUFF_BASE_URL', 'https://buff.163.com').rstrip('/') + "/api/market/goods"
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
+        self.max_connections = max_connections
+        self.max_retries = max_retries
+        self.rate_limiter = get_rate_limiter()
+        self.cache = get_response_cache()
+        self.recorder = get_http_recorder()
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def __aenter__(self):
+        await self._get_session()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Return the shared keep-alive HTTP session, creating it on first use"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                keepalive_timeout=60,
+                ttl_dns_cache=300
+            )
+            self._session = aiohttp.ClientSession(
+                headers=self.headers,
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=30)
+            )
+        return self._session
+
+    async def close(self):
+        """Close the shared HTTP session and persist the response cache"""
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self.cache.save()
+
+    async def _make_request(self, url: str, params: Dict) -> Optional[Dict]:
+        """Send a rate-limited GET over the shared session, retrying throttled responses"""
+        cached = self.cache.get(url, params)
+        if cached is not None:
+            return cached
+
+        session = await self._get_session()
+        for attempt in range(self.max_retries + 1):
+            await self.rate_limiter.acquire(url)
+            try:
+                started = time.perf_counter()
+                async with session.get(url, params=params) as response:
+                    body = await response.text()
+                    retry_after = response.headers.get('Retry-After')
+                    if self.recorder:
+                        self.recorder.record('GET', url, params, response.status, body,
+                                             {'Retry-After': retry_after}, time.perf_counter() - started)
+                    throttled = self.rate_limiter.record_response(url, response.status, retry_after)
+                    if throttled:
+                        continue
+                    if response.status != 200:
+                        logger.warning(f"HTTP {response.status} from {url} for {params.get('search')}")
+                        return None
+                    data = json.loads(body)
+                    if data and data.get('code') == 'OK':
+                        self.cache.set(url, params, data)
+                    return data
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.error(f"Request to {url} failed: {e}")
+                return None
+            except ValueError as e:
+                logger.error(f"Invalid JSON from {url}: {e}")
+                return None
+        logger.error(f"Giving up on {url} for {params.get('search')} after {self.max_retries} retries")
+        return None
 
     def connect_db(self):
         """Establish database connection"""
@@ -38,11 +110,86 @@ class BuffParser:
             print(f"Database connection failed: {e}")
             return None
 
+    @staticmethod
+    def _match_item(items: List[Dict], market_hash_name: str) -> Optional[Dict]:
+        """Pick the search result whose name matches exactly, ignoring fuzzy hits"""
+        for item in items:
+            if item.get('market_hash_name') == market_hash_name:
+                return item
+        if items:
+            logger.warning(f"No exact match for {market_hash_name} among {len(items)} search results")
+        return None
+
+    @staticmethod
+    def _steam_price_cny(item: Dict) -> Optional[str]:
+        return item.get('steam_price_cny') or (item.get('goods_info') or {}).get('steam_price_cny')
+
+    async def crawl_market(self, page_size: int = 80, max_pages: Optional[int] = None,
+                           concurrency: int = 4) -> Dict[str, Dict]:
+        """Page through the whole goods listing and map market_hash_name to its listing"""
+        market = {}
+        first_page = await self._fetch_goods_page(1, page_size)
+        if first_page is None:
+            logger.error("Market crawl failed on the first page")
+            return market
+        self._merge_goods_page(market, first_page)
+
+        total_pages = int(first_page.get('total_page') or 1)
+        if max_pages:
+            total_pages = min(total_pages, max_pages)
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch(page_num: int) -> Optional[Dict]:
+            async with semaphore:
+                return await self._fetch_goods_page(page_num, page_size)
+
+        pages = await asyncio.gather(*(fetch(page_num) for page_num in range(2, total_pages + 1)))
+        failed = 0
+        for page in pages:
+            if page is None:
+                failed += 1
+                continue
+            self._merge_goods_page(market, page)
+
+        logger.info(f"Crawled {total_pages - failed}/{total_pages} market pages, {len(market)} priced items")
+        return market
+
+    async def _fetch_goods_page(self, page_num: int, page_size: int) -> Optional[Dict]:
+        """Fetch one page of the goods listing and return its data block"""
+        params = {
+            'game': 'csgo',
+            'page_num': page_num,
+            'page_size': page_size
+        }
+        response = await self._make_request(self.base_url, params)
+        if response and response.get('code') == 'OK':
+            return response.get('data', {})
+        logger.warning(f"Failed to fetch market page {page_num}")
+        return None
+
+    def _merge_goods_page(self, market: Dict[str, Dict], page: Dict):
+        for item in page.get('items', []):
+            name = item.get('market_hash_name')
+            try:
+                price = float(item['sell_min_price'])
+                steam_price = self._steam_price_cny(item)
+                steam_price = float(steam_price) if steam_price else None
+                sell_num = int(item.get('sell_num') or 0)
+            except (KeyError, TypeError, ValueError):
+                logger.debug(f"Skipping market item with malformed prices: {name}")
+                continue
+            if not name or price <= 0:
+                continue
+            market[name] = {
+                'sell_min_price': price,
+                'sell_num': sell_num,
+                'steam_price_cny': steam_price
+            }
+
     async def get_item_price(self, market_hash_name: str) -> Optional[float]:
         """Get current price for a specific item"""
         try:
-            await asyncio.sleep(1)
-
             if not market_hash_name or not isinstance(market_hash_name, str):
                 logger.error(f"Invalid item name: {market_hash_name}")
                 return None
@@ -54,9 +201,9 @@ class BuffParser:
             }
             response = await self._make_request(self.base_url, params)
             if response and response.get('code') == 'OK':
-                items = response.get('data', {}).get('items', [])
-                if items:
-                    price = items[0].get('sell_min_price')
+                item = self._match_item(response.get('data', {}).get('items', []), market_hash_name)
+                if item:
+                    price = item.get('sell_min_price')
                     if price is not None and float(price) > 0:
                         return float(price)
                     logger.warning(f"Invalid price for {market_hash_name}: {price}")
@@ -69,8 +216,6 @@ class BuffParser:
     async def get_item_details(self, market_hash_name: str) -> Optional[Dict]:
         """Get detailed information about an item"""
         try:
-            await asyncio.sleep(1)
-            
             if not market_hash_name or not isinstance(market_hash_name, str):
                 logger.error(f"Invalid item name: {market_hash_name}")
                 return None
@@ -83,11 +228,10 @@ class BuffParser:
             
             response = await self._make_request(self.base_url, params)
             if response and response.get('code') == 'OK':
-                items = response.get('data', {}).get('items', [])
-                if items:
-                    item = items[0]
+                item = self._match_item(response.get('data', {}).get('items', []), market_hash_name)
+                if item:
                     sell_min_price = item.get('sell_min_price')
-                    steam_price = item.get('steam_price_cny')
+                    steam_price = self._steam_price_cny(item)
                     
                     if sell_min_price is not None and steam_price is not None:
                         return {
@@ -171,41 +315,31 @@ class BuffParser:
                 conn.close()
 
     async def update_prices(self):
-        """Update prices for all items in database"""
-        conn = self.connect_db()
-        if not conn:
-            return
-        
+        """Update prices for all items in database, then close the session and save the response cache"""
         try:
-            cur = conn.cursor()
-            cur.execute("SELECT item_id, market_hash_name FROM items")
-            items = cur.fetchall()
+            conn = self.connect_db()
+            if not conn:
+                return
             
-            for item_id, market_hash_name in items:
-                price = await self.get_item_price(market_hash_name)
-                if price:
-                    cur.execute("""
-                        UPDATE items 
-                        SET buff_price = %s 
-                        WHERE item_id = %s
-                    """, (price, item_id))
-                    
-                    cur.execute("""
-                        INSERT INTO price_history (item_id, price, source) 
-                        VALUES (%s, %s, 'buff')
-                    """, (item_id, price))
-                    
-                    conn.commit()
-                
-                time.sleep(1)
+            try:
+                cur = conn.cursor()
+                cur.execute("SELECT item_id, market_hash_name FROM items")
+                items = cur.fetchall()
                 
-        except psycopg2.Error as e:
-            print(f"Database error: {e}")
-            if conn:
+                writer = PriceWriter(conn)
+                for item_id, market_hash_name in items:
+                    price = await self.get_item_price(market_hash_name)
+                    if price:
+                        writer.add(item_id, price)
+                writer.flush()
+                    
+            except psycopg2.Error as e:
+                print(f"Database error: {e}")
                 conn.rollback()
-        finally:
-            if conn:
+            finally:
                 conn.close()
+        finally:
+            await self.close()
 
     async def add_item(self, market_hash_name: str, item_type: str) -> Optional[Dict]:
         """Add a new item to track"""
@@ -230,10 +364,9 @@ class BuffParser:
             new_item = cur.fetchone()
             
             if price:
-                cur.execute("""
-                    INSERT INTO price_history (item_id, price, source) 
-                    VALUES (%s, %s, 'buff')
-                """, (new_item['item_id'], price))
+                writer = PriceWriter(conn)
+                writer.add(new_item['item_id'], price)
+                writer.flush()
             
             conn.commit()
             return new_item
@@ -0,0 +1,74 @@
+import logging
+import threading
+import time
+from typing import Optional
+
+import psycopg2
+
+from .config import CACHE_VERSION_CHECK_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+# Rows of cache_versions: one per kind of cached data, bumped by whoever changes it
+CATALOG = 'catalog'
+QUERIES = 'queries'
+
+
+def bump_cache_versions(conn, *names: str):
+    """Tell the caches of every process that data behind the named caches changed.
+
+    Runs in the caller's transaction, so other processes see the new version only once
+    the change itself is committed.
+    """
+    cur = conn.cursor()
+    try:
+        cur.execute("""
+            INSERT INTO cache_versions (name, version, updated_at)
+            SELECT name, 1, NOW() FROM unnest(%s::text[]) AS name
+            ON CONFLICT (name) DO UPDATE
+            SET version = cache_versions.version + 1, updated_at = NOW()
+        """, (list(names),))
+    finally:
+        cur.close()
+
+
+class SharedVersion:
+    """This process's view of one row of cache_versions, re-read at most every check_interval seconds"""
+
+    def __init__(self, name: str, check_interval: float = CACHE_VERSION_CHECK_INTERVAL):
+        self.name = name
+        self.check_interval = check_interval
+        self.version: Optional[int] = None
+        self.changes = 0
+        self._checked_at = float('-inf')
+        self._lock = threading.Lock()
+
+    def due(self) -> bool:
+        return time.monotonic() - self._checked_at >= self.check_interval
+
+    def changed(self, conn) -> bool:
+        """Whether the version moved since the last check; True on the first successful read"""
+        with self._lock:
+            if not self.due():
+                return False
+            self._checked_at = time.monotonic()
+
+        cur = conn.cursor()
+        try:
+            cur.execute("SELECT version FROM cache_versions WHERE name = %s", (self.name,))
+            row = cur.fetchone()
+        except psycopg2.Error as e:
+            # e.g. a database not upgraded with scripts/create_indexes.py yet: rely on the TTL
+            conn.rollback()
+            logger.warning(f"Could not read cache version {self.name}: {e}")
+            return False
+        finally:
+            cur.close()
+
+        version = row[0] if row else 0
+        with self._lock:
+            changed = version != self.version
+            if changed and self.version is not None:
+                self.changes += 1
+            self.version = version
+        return changed
@@ -0,0 +1,167 @@
+import logging
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from psycopg2.extras import execute_values
+
+logger = logging.getLogger(__name__)
+
+# Candle interval -> (table, date_trunc unit)
+CANDLE_TABLES = {
+    'hourly': ('price_candles_hourly', 'hour'),
+    'daily': ('price_candles_daily', 'day'),
+}
+CANDLE_COLUMNS = ('item_id', 'source', 'bucket', 'open', 'high', 'low', 'close', 'open_at', 'close_at',
+                  'price_sum', 'tick_count', 'volume')
+
+
+def bucket_start(timestamp: datetime, interval: str) -> datetime:
+    """Start of the UTC hour or day a tick falls in"""
+    timestamp = timestamp.astimezone(timezone.utc)
+    if interval == 'hourly':
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def aggregate_candles(rows: List[Tuple], interval: str) -> Dict[Tuple[int, str, datetime], List]:
+    """Fold price_history rows into one partial candle per (item_id, source, bucket)"""
+    candles: Dict[Tuple[int, str, datetime], List] = {}
+    for item_id, price, volume, source, timestamp in rows:
+        key = (item_id, source, bucket_start(timestamp, interval))
+        candle = candles.get(key)
+        if candle is None:
+            candles[key] = [price, price, price, price, timestamp, timestamp, price, 1, volume]
+            continue
+        if timestamp < candle[4]:
+            candle[0], candle[4] = price, timestamp
+        candle[1] = max(candle[1], price)
+        candle[2] = min(candle[2], price)
+        if timestamp >= candle[5]:
+            candle[3], candle[5] = price, timestamp
+            candle[8] = volume if volume is not None else candle[8]
+        candle[6] += price
+        candle[7] += 1
+    return candles
+
+
+def upsert_candles(cur, interval: str, candles: Dict[Tuple[int, str, datetime], List]):
+    """Merge partial candles into the interval's table; open/close follow tick time, not arrival order"""
+    if not candles:
+        return
+    table = CANDLE_TABLES[interval][0]
+    # Sorted so concurrent writers lock keys in the same order
+    execute_values(cur, f"""
+        INSERT INTO {table} ({', '.join(CANDLE_COLUMNS)})
+        VALUES %s
+        ON CONFLICT (item_id, source, bucket) DO UPDATE
+        SET open = CASE WHEN EXCLUDED.open_at < {table}.open_at THEN EXCLUDED.open ELSE {table}.open END,
+            open_at = LEAST({table}.open_at, EXCLUDED.open_at),
+            high = GREATEST({table}.high, EXCLUDED.high),
+            low = LEAST({table}.low, EXCLUDED.low),
+            close = CASE WHEN EXCLUDED.close_at >= {table}.close_at THEN EXCLUDED.close ELSE {table}.close END,
+            volume = CASE WHEN EXCLUDED.close_at >= {table}.close_at
+                          THEN COALESCE(EXCLUDED.volume, {table}.volume) ELSE {table}.volume END,
+            close_at = GREATEST({table}.close_at, EXCLUDED.close_at),
+            price_sum = {table}.price_sum + EXCLUDED.price_sum,
+            tick_count = {table}.tick_count + EXCLUDED.tick_count
+    """, [(item_id, source, bucket, *candle) for (item_id, source, bucket), candle in sorted(candles.items())],
+        page_size=len(candles))
+
+
+def _merge_candles(conn, table: str, fresh_sql: str, window: str, params: List) -> Tuple[int, int]:
+    """Make table match fresh_sql within window: upsert changed candles, delete ones with no source rows.
+
+    Candles that are already correct are not rewritten, so rebuilding a window leaves no dead rows.
+    """
+    values = CANDLE_COLUMNS[3:]
+    current = ', '.join(f"{table}.{column}" for column in values)
+    excluded = ', '.join(f"EXCLUDED.{column}" for column in values)
+    cur = conn.cursor()
+    try:
+        cur.execute(f"""
+            WITH fresh AS ({fresh_sql}),
+            upserted AS (
+                INSERT INTO {table} ({', '.join(CANDLE_COLUMNS)})
+                SELECT {', '.join(CANDLE_COLUMNS)} FROM fresh
+                ON CONFLICT (item_id, source, bucket) DO UPDATE
+                SET ({', '.join(values)}) = ({excluded})
+                WHERE ({current}) IS DISTINCT FROM ({excluded})
+                RETURNING 1
+            ),
+            deleted AS (
+                DELETE FROM {table} c
+                WHERE TRUE{window}
+                AND NOT EXISTS (
+                    SELECT 1 FROM fresh f
+                    WHERE f.item_id = c.item_id AND f.source = c.source AND f.bucket = c.bucket
+                )
+                RETURNING 1
+            )
+            SELECT (SELECT COUNT(*) FROM upserted), (SELECT COUNT(*) FROM deleted)
+        """, params + params)
+        return cur.fetchone()
+    finally:
+        cur.close()
+
+
+def rebuild_candles(conn, interval: str, since: Optional[datetime] = None, until: Optional[datetime] = None) -> int:
+    """Recompute candles from raw price_history for [since, until) and return how many changed.
+
+    Bounds are rounded out to whole buckets so partially covered buckets are rebuilt completely.
+    The caller owns the transaction.
+    """
+    table, unit = CANDLE_TABLES[interval]
+    since = bucket_start(since, interval) if since else None
+    until = bucket_start(until, interval) if until else None
+    window, params = "", []
+    if since:
+        window += " AND {column} >= %s"
+        params.append(since)
+    if until:
+        window += " AND {column} < %s"
+        params.append(until)
+
+    written, deleted = _merge_candles(conn, table, f"""
+        SELECT
+            item_id,
+            source,
+            date_trunc('{unit}', timestamp AT TIME ZONE 'UTC') AT TIME ZONE 'UTC' AS bucket,
+            (array_agg(price ORDER BY timestamp))[1] AS open,
+            MAX(price) AS high,
+            MIN(price) AS low,
+            (array_agg(price ORDER BY timestamp DESC))[1] AS close,
+            MIN(timestamp) AS open_at,
+            MAX(timestamp) AS close_at,
+            SUM(price) AS price_sum,
+            COUNT(*) AS tick_count,
+            (array_agg(volume ORDER BY timestamp DESC) FILTER (WHERE volume IS NOT NULL))[1] AS volume
+        FROM price_history
+        WHERE item_id IS NOT NULL{window.format(column='timestamp')}
+        GROUP BY item_id, source, 3
+    """, window.format(column='c.bucket'), params)
+    logger.debug(f"Rebuilt {interval} candles: {written} written, {deleted} deleted")
+    return written
+
+
+def rollup_candles(conn, since: datetime, until: datetime) -> int:
+    """Recompute daily candles for [since, until) from the hourly ones, for windows whose raw ticks are gone"""
+    since, until = bucket_start(since, 'daily'), bucket_start(until, 'daily')
+    written, _ = _merge_candles(conn, 'price_candles_daily', """
+        SELECT
+            item_id,
+            source,
+            date_trunc('day', bucket AT TIME ZONE 'UTC') AT TIME ZONE 'UTC' AS bucket,
+            (array_agg(open ORDER BY open_at))[1] AS open,
+            MAX(high) AS high,
+            MIN(low) AS low,
+            (array_agg(close ORDER BY close_at DESC))[1] AS close,
+            MIN(open_at) AS open_at,
+            MAX(close_at) AS close_at,
+            SUM(price_sum) AS price_sum,
+            SUM(tick_count) AS tick_count,
+            (array_agg(volume ORDER BY close_at DESC) FILTER (WHERE volume IS NOT NULL))[1] AS volume
+        FROM price_candles_hourly
+        WHERE bucket >= %s AND bucket < %s
+        GROUP BY item_id, source, 3
+    """, " AND c.bucket >= %s AND c.bucket < %s", [since, until])
+    return written
@@ -0,0 +1,144 @@
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+
+from psycopg2.extras import RealDictCursor
+
+from .cache_versions import CATALOG, SharedVersion
+from .config import CATALOG_CACHE_TTL
+from .pagination import SortKey, sort_key
+
+logger = logging.getLogger(__name__)
+
+
+class Catalog:
+    """Immutable snapshot of the items table and its filter facets"""
+
+    def __init__(self, version: int, items: List[Dict], loaded_at: float):
+        self.version = version
+        self.loaded_at = loaded_at
+        self.items = tuple(items)                       # keyset order: created_at DESC, item_id DESC
+        self.by_id = {item['item_id']: item for item in self.items}
+        self._positions = {item['item_id']: position for position, item in enumerate(self.items)}
+        self.weapon_types = _facet(item['weapon_type'] for item in self.items)
+        self.wears = [wear for wear in _facet(item['wear'] for item in self.items) if wear is not None]
+
+    def page(self, after: Optional[SortKey] = None, limit: Optional[int] = None) -> List[Dict]:
+        """Items following the keyset position after, like WHERE (created_at, item_id) < after"""
+        start = 0
+        if after:
+            position = self._positions.get(after[1])
+            if position is not None and sort_key(self.items[position]) == after:
+                start = position + 1
+            else:
+                # The cursor's item is gone or changed; find where its key would sit
+                start = next((position for position, item in enumerate(self.items) if sort_key(item) < after),
+                             len(self.items))
+        return list(self.items[start:start + limit] if limit is not None else self.items[start:])
+
+
+def _facet(values) -> List:
+    """Distinct values sorted like ORDER BY (NULL last)"""
+    distinct = set(values)
+    return sorted(distinct - {None}) + ([None] if None in distinct else [])
+
+
+class CatalogCache:
+    """In-process cache of the item catalog, reloaded after invalidate() or once the TTL passes.
+
+    Every invalidation bumps the version, and a load that raced with one is served to its
+    caller but not kept. Writers in other processes, such as a collector run from
+    scripts/run_collection.py, are noticed through the shared version.
+    """
+
+    def __init__(self, ttl: float = CATALOG_CACHE_TTL, shared: Optional[SharedVersion] = None):
+        self.ttl = ttl
+        self.shared = shared
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self._catalog: Optional[Catalog] = None
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+
+    def _fresh(self) -> Optional[Catalog]:
+        catalog = self._catalog
+        if catalog and catalog.version == self.version and time.monotonic() - catalog.loaded_at < self.ttl:
+            return catalog
+        return None
+
+    def get(self, conn) -> Catalog:
+        """The current catalog, loading it on the given connection when missing or stale"""
+        if self.shared is not None and self.shared.changed(conn):
+            self.invalidate()
+        with self._lock:
+            catalog = self._fresh()
+            if catalog:
+                self.hits += 1
+                return catalog
+        # One loader at a time; the others reuse what it loaded
+        with self._load_lock:
+            with self._lock:
+                catalog = self._fresh()
+                if catalog:
+                    self.hits += 1
+                    return catalog
+                self.misses += 1
+                version = self.version
+            catalog = Catalog(version, _select_catalog(conn), time.monotonic())
+            with self._lock:
+                if version == self.version:
+                    self._catalog = catalog
+            logger.debug(f"Loaded catalog version {version} with {len(catalog.items)} items")
+            return catalog
+
+    def get_item(self, conn, item_id: int) -> Optional[Dict]:
+        """Item row by id; falls back to the database for items added by another process"""
+        item = self.get(conn).by_id.get(item_id)
+        if item is None:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+            cur.execute("SELECT * FROM items WHERE item_id = %s", (item_id,))
+            item = cur.fetchone()
+            cur.close()
+        return item
+
+    def invalidate(self):
+        """Drop the cached catalog; call after committing a change to items"""
+        with self._lock:
+            self.version += 1
+            self._catalog = None
+
+    def stats(self) -> Dict:
+        with self._lock:
+            catalog = self._catalog
+            stats = {
+                'version': self.version,
+                'items': len(catalog.items) if catalog else 0,
+                'age_seconds': round(time.monotonic() - catalog.loaded_at, 1) if catalog else None,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+        if self.shared is not None:
+            stats['shared_version'] = self.shared.version
+        return stats
+
+
+def _select_catalog(conn) -> List[Dict]:
+    cur = conn.cursor(cursor_factory=RealDictCursor)
+    try:
+        cur.execute("SELECT * FROM items ORDER BY created_at DESC, item_id DESC")
+        return cur.fetchall()
+    finally:
+        cur.close()
+
+
+_catalog_cache: Optional[CatalogCache] = None
+
+
+def get_catalog_cache() -> CatalogCache:
+    """Return the process-wide catalog cache"""
+    global _catalog_cache
+    if _catalog_cache is None:
+        _catalog_cache = CatalogCache(shared=SharedVersion(CATALOG))
+    return _catalog_cache
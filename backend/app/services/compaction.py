@@ -0,0 +1,219 @@
+import logging
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+
+from .candles import CANDLE_TABLES, bucket_start, rebuild_candles, rollup_candles
+from .config import HOURLY_CANDLE_RETENTION_DAYS, RAW_TICK_RETENTION_DAYS
+from .partitions import add_months, is_partitioned, list_partitions, month_start
+
+logger = logging.getLogger(__name__)
+
+HOURLY_STEP = timedelta(days=30)
+
+
+def day_start(value: datetime) -> datetime:
+    return bucket_start(value, 'daily')
+
+
+def month_bound(month: date) -> datetime:
+    return datetime(month.year, month.month, 1, tzinfo=timezone.utc)
+
+
+def get_watermark(conn, tier: str) -> Optional[datetime]:
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT watermark FROM compaction_state WHERE tier = %s", (tier,))
+        row = cur.fetchone()
+        return row[0] if row else None
+    finally:
+        cur.close()
+
+
+def set_watermark(conn, tier: str, watermark: datetime):
+    cur = conn.cursor()
+    try:
+        cur.execute("""
+            INSERT INTO compaction_state (tier, watermark, updated_at)
+            VALUES (%s, %s, NOW())
+            ON CONFLICT (tier) DO UPDATE
+            SET watermark = EXCLUDED.watermark, updated_at = NOW()
+        """, (tier, watermark))
+    finally:
+        cur.close()
+
+
+def table_sizes(conn) -> Dict[str, Tuple[int, float]]:
+    """On-disk bytes (heap, indexes and TOAST) and planner row estimate for raw history and each candle table"""
+    cur = conn.cursor()
+    try:
+        if is_partitioned(conn):
+            cur.execute("""
+                SELECT COALESCE(SUM(pg_total_relation_size(c.oid)), 0), COALESCE(SUM(GREATEST(c.reltuples, 0)), 0)
+                FROM pg_inherits JOIN pg_class c ON c.oid = pg_inherits.inhrelid
+                WHERE pg_inherits.inhparent = to_regclass('price_history')
+            """)
+        else:
+            cur.execute("SELECT pg_total_relation_size(oid), GREATEST(reltuples, 0) FROM pg_class "
+                        "WHERE oid = to_regclass('price_history')")
+        sizes = {'price_history': cur.fetchone()}
+        for table, _ in CANDLE_TABLES.values():
+            cur.execute("SELECT pg_total_relation_size(oid), GREATEST(reltuples, 0) FROM pg_class "
+                        "WHERE oid = to_regclass(%s)", (table,))
+            sizes[table] = cur.fetchone()
+        return {table: (int(size), float(rows)) for table, (size, rows) in sizes.items()}
+    finally:
+        cur.close()
+
+
+def bytes_per_row(sizes: Dict[str, Tuple[int, float]], table: str) -> float:
+    size, rows = sizes[table]
+    return size / rows if rows else 0.0
+
+
+def _next_start(conn, after: datetime, partitions: Dict[date, str]) -> Optional[datetime]:
+    """Where to continue after skipping ticks-free time: the next tick's day, or its partition's start"""
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT MIN(timestamp) FROM price_history WHERE timestamp >= %s", (after,))
+        oldest = cur.fetchone()[0]
+    finally:
+        cur.close()
+    if oldest is None:
+        return None
+    month = month_start(oldest.astimezone(timezone.utc))
+    if month in partitions and month_bound(month) >= after:
+        return month_bound(month)
+    return max(day_start(oldest), after)
+
+
+def _drop_partition(cur, name: str) -> int:
+    cur.execute("SELECT pg_total_relation_size(%s)", (name,))
+    size = cur.fetchone()[0]
+    cur.execute(f"DROP TABLE {name}")
+    return int(size)
+
+
+def compact_raw(conn, cutoff: datetime, row_bytes: float = 0.0) -> Dict:
+    """Fold raw ticks older than cutoff into candles and remove them, one day or partition at a time.
+
+    Each step rebuilds the candles covering its window from the raw ticks, deletes those ticks (or
+    drops the whole monthly partition when the step spans it) and advances the watermark in the
+    same transaction, so an interrupted run resumes exactly where it stopped. Freed space is exact
+    for dropped partitions and estimated from row_bytes for deleted rows.
+    """
+    cutoff = day_start(cutoff)
+    partitions = {month: name for name, month in list_partitions(conn)} if is_partitioned(conn) else {}
+    watermark = get_watermark(conn, 'raw') or _next_start(conn, datetime.min.replace(tzinfo=timezone.utc), partitions)
+    stats = {'rows_deleted': 0, 'partitions_dropped': 0, 'steps': 0, 'bytes_freed': 0}
+
+    while watermark is not None and watermark < cutoff:
+        month = month_start(watermark)
+        month_end = month_bound(add_months(month, 1))
+        whole_partition = month in partitions and watermark == month_bound(month) and month_end <= cutoff
+        step_end = month_end if whole_partition else min(watermark + timedelta(days=1), cutoff)
+
+        for interval in CANDLE_TABLES:
+            rebuild_candles(conn, interval, since=watermark, until=step_end)
+        cur = conn.cursor()
+        try:
+            if whole_partition:
+                stats['bytes_freed'] += _drop_partition(cur, partitions.pop(month))
+                stats['partitions_dropped'] += 1
+            else:
+                cur.execute("DELETE FROM price_history WHERE timestamp >= %s AND timestamp < %s",
+                            (watermark, step_end))
+                stats['rows_deleted'] += cur.rowcount
+                stats['bytes_freed'] += int(cur.rowcount * row_bytes)
+        finally:
+            cur.close()
+
+        # Skip empty stretches instead of stepping through them a day at a time
+        next_start = _next_start(conn, step_end, partitions)
+        watermark = min(next_start, cutoff) if next_start else cutoff
+        set_watermark(conn, 'raw', watermark)
+        conn.commit()
+        stats['steps'] += 1
+
+    # Partitions emptied a day at a time (the run started mid-month) can go as well
+    cur = conn.cursor()
+    try:
+        for month, name in sorted(partitions.items()):
+            if watermark is not None and month_bound(add_months(month, 1)) <= watermark:
+                stats['bytes_freed'] += _drop_partition(cur, name)
+                stats['partitions_dropped'] += 1
+    finally:
+        cur.close()
+    conn.commit()
+
+    return stats
+
+
+def compact_hourly(conn, cutoff: datetime, row_bytes: float = 0.0) -> Dict:
+    """Roll hourly candles older than cutoff up into daily candles and delete them, committing per step"""
+    cutoff = day_start(cutoff)
+    watermark = get_watermark(conn, 'hourly')
+    if watermark is None:
+        cur = conn.cursor()
+        cur.execute("SELECT MIN(bucket) FROM price_candles_hourly")
+        oldest = cur.fetchone()[0]
+        cur.close()
+        watermark = day_start(oldest) if oldest else None
+    stats = {'candles_deleted': 0, 'steps': 0, 'bytes_freed': 0}
+
+    while watermark is not None and watermark < cutoff:
+        step_end = min(watermark + HOURLY_STEP, cutoff)
+        rollup_candles(conn, watermark, step_end)
+        cur = conn.cursor()
+        try:
+            cur.execute("DELETE FROM price_candles_hourly WHERE bucket >= %s AND bucket < %s", (watermark, step_end))
+            stats['candles_deleted'] += cur.rowcount
+            stats['bytes_freed'] += int(cur.rowcount * row_bytes)
+        finally:
+            cur.close()
+        set_watermark(conn, 'hourly', step_end)
+        conn.commit()
+        watermark = step_end
+        stats['steps'] += 1
+
+    return stats
+
+
+def run_compaction(conn, raw_days: Optional[int] = None, hourly_days: Optional[int] = None,
+                   now: Optional[datetime] = None, vacuum: bool = False) -> Dict:
+    """Compact both tiers and report rows removed and space freed (commits as it goes).
+
+    Dropped partitions give space back immediately; deleted rows become reusable by new ticks after
+    VACUUM (run here when vacuum is set), so table files stop growing rather than shrinking.
+    """
+    raw_days = RAW_TICK_RETENTION_DAYS if raw_days is None else raw_days
+    hourly_days = HOURLY_CANDLE_RETENTION_DAYS if hourly_days is None else hourly_days
+    if hourly_days < raw_days:
+        raise ValueError("Hourly candles must be kept at least as long as raw ticks")
+    now = now or datetime.now(timezone.utc)
+
+    before = table_sizes(conn)
+    conn.commit()
+    report = {
+        'raw': compact_raw(conn, now - timedelta(days=raw_days), bytes_per_row(before, 'price_history')),
+        'hourly': compact_hourly(conn, now - timedelta(days=hourly_days), bytes_per_row(before, 'price_candles_hourly')),
+    }
+    if vacuum:
+        conn.autocommit = True
+        try:
+            cur = conn.cursor()
+            cur.execute(f"VACUUM (ANALYZE) price_history, {', '.join(table for table, _ in CANDLE_TABLES.values())}")
+            cur.close()
+        finally:
+            conn.autocommit = False
+    after = table_sizes(conn)
+    conn.commit()
+    report.update({
+        'bytes_on_disk_before': {table: size for table, (size, _) in before.items()},
+        'bytes_on_disk_after': {table: size for table, (size, _) in after.items()},
+        'bytes_freed': report['raw']['bytes_freed'] + report['hourly']['bytes_freed']
+    })
+    logger.info(f"Compaction finished: {report['raw']['rows_deleted']} raw rows deleted, "
+                f"{report['raw']['partitions_dropped']} partitions dropped, "
+                f"{report['hourly']['candles_deleted']} hourly candles rolled up, "
+                f"~{report['bytes_freed'] / 1024 / 1024:.1f}MB freed")
+    return report
@@ -1,3 +1,4 @@
+import os
 import requests
 
 URL_PURCHASE = 'https://buff.163.com/api/market/goods/buying'
@@ -42,6 +43,71 @@ PARAMS = {
     'page_num': '1',
 }
 
+# Ceiling requests/second and burst size per upstream host
+RATE_LIMITS = {
+    'buff.163.com': (float(os.getenv('BUFF_RATE_LIMIT', '4')), 8),
+    'steamcommunity.com': (float(os.getenv('STEAM_RATE_LIMIT', '0.33')), 2),
+}
+# Used for any other host, e.g. a local mock market server
+_default_rate = float(os.getenv('DEFAULT_RATE_LIMIT', '1'))
+DEFAULT_RATE_LIMIT = (_default_rate, max(1, int(_default_rate)))
+
+# Seconds a cached upstream response stays fresh, by URL prefix
+CACHE_TTLS = {
+    'https://buff.163.com/api/market/goods': 60,
+    'https://steamcommunity.com/market/priceoverview/': 300,
+}
+DEFAULT_CACHE_TTL = 60
+
+# Monthly price_history partitions: how many future months to pre-create, and how many past
+# months to keep (0 keeps everything) before old partitions are detached or dropped
+PARTITION_MONTHS_AHEAD = int(os.getenv('PARTITION_MONTHS_AHEAD', '3'))
+PRICE_HISTORY_RETENTION_MONTHS = int(os.getenv('PRICE_HISTORY_RETENTION_MONTHS', '0'))
+PRICE_HISTORY_RETENTION_MODE = os.getenv('PRICE_HISTORY_RETENTION_MODE', 'detach')
+
+# Compaction tiers: raw ticks older than this many days are folded into candles and deleted,
+# and hourly candles older than the second window are rolled up into daily ones
+RAW_TICK_RETENTION_DAYS = int(os.getenv('RAW_TICK_RETENTION_DAYS', '30'))
+HOURLY_CANDLE_RETENTION_DAYS = int(os.getenv('HOURLY_CANDLE_RETENTION_DAYS', '180'))
+
+# Directory of the Parquet archive of raw ticks (see services/parquet_archive.py)
+PARQUET_ARCHIVE_PATH = os.getenv('PARQUET_ARCHIVE_PATH', 'archive/price_history')
+
+# Seconds the in-process item catalog is trusted before reloading; writes from any process
+# invalidate it sooner through the cache_versions table (see CACHE_VERSION_CHECK_INTERVAL)
+CATALOG_CACHE_TTL = float(os.getenv('CATALOG_CACHE_TTL', '60'))
+
+# Page size of the item listing APIs when the client does not ask for one, and the most it may ask for
+API_PAGE_SIZE = int(os.getenv('API_PAGE_SIZE', '100'))
+API_MAX_PAGE_SIZE = int(os.getenv('API_MAX_PAGE_SIZE', '1000'))
+
+# Rows fetched from the server-side cursor per chunk of a streamed price history export
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', '5000'))
+
+# Exports hold a pooled connection until the client has read them: how many may run at once, and
+# how many seconds a client may stop reading before its export is abandoned
+EXPORT_MAX_CONCURRENT = int(os.getenv('EXPORT_MAX_CONCURRENT', '2'))
+EXPORT_SEND_TIMEOUT = float(os.getenv('EXPORT_SEND_TIMEOUT', '30'))
+
+# Most rows one /api/prices/{item_id}/history response returns (the newest ones)
+HISTORY_MAX_ROWS = int(os.getenv('HISTORY_MAX_ROWS', '10000'))
+
+# Most items one downsampled chart series request may ask for
+SERIES_MAX_ITEMS = int(os.getenv('SERIES_MAX_ITEMS', '100'))
+
+# Seconds cached page query results (/skins, /analytics, price analysis) stay fresh, and how many are kept;
+# writes from any process drop them within CACHE_VERSION_CHECK_INTERVAL through the cache_versions table
+QUERY_CACHE_TTL = float(os.getenv('QUERY_CACHE_TTL', '60'))
+QUERY_CACHE_MAX_ENTRIES = int(os.getenv('QUERY_CACHE_MAX_ENTRIES', '1000'))
+
+# Most seconds a cache serves hits before checking cache_versions for writes made by other processes
+# (such as scripts/run_collection.py); 0 checks before every hit
+CACHE_VERSION_CHECK_INTERVAL = float(os.getenv('CACHE_VERSION_CHECK_INTERVAL', '1'))
+
+# Analytics snapshots: minimum seconds between recomputations after collection runs, and how many to keep
+ANALYTICS_REFRESH_INTERVAL = float(os.getenv('ANALYTICS_REFRESH_INTERVAL', '300'))
+ANALYTICS_SNAPSHOTS_KEPT = int(os.getenv('ANALYTICS_SNAPSHOTS_KEPT', '24'))
+
 
 if __name__ == '__main__':
     response = requests.get(URL_PURCHASE, params=PARAMS, cookies=COOKIES, headers=HEADERS)
@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+import psycopg2
+from psycopg2 import pool
+from dotenv import load_dotenv
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+
+def get_db_params() -> Dict:
+    """Connection settings shared by the web app, the collector and the scripts"""
+    return {
+        'host': os.getenv('DB_HOST', 'localhost'),
+        'database': os.getenv('DB_NAME', 'cs2skins'),
+        'user': os.getenv('DB_USER'),
+        'password': os.getenv('DB_PASSWORD'),
+        'port': os.getenv('DB_PORT', '5432')
+    }
+
+
+class PoolTimeout(pool.PoolError):
+    pass
+
+
+class DatabasePool:
+    """Thread-safe psycopg2 connection pool with health checks and wait metrics"""
+
+    def __init__(self, minconn: Optional[int] = None, maxconn: Optional[int] = None,
+                 db_params: Optional[Dict] = None, acquire_timeout: float = 10.0,
+                 health_check_after: float = 30.0):
+        self.minconn = minconn or int(os.getenv('DB_POOL_MIN', '1'))
+        self.maxconn = maxconn or int(os.getenv('DB_POOL_MAX', '10'))
+        self.acquire_timeout = acquire_timeout
+        self.health_check_after = health_check_after
+        self._pool = pool.ThreadedConnectionPool(self.minconn, self.maxconn, **(db_params or get_db_params()))
+        # ThreadedConnectionPool raises when exhausted; the semaphore makes callers queue instead
+        self._slots = threading.BoundedSemaphore(self.maxconn)
+        self._last_used: Dict[int, float] = {}
+        self._lock = threading.Lock()
+        # One worker per connection: queries queue here rather than on the event loop
+        self._executor = ThreadPoolExecutor(max_workers=self.maxconn, thread_name_prefix='db')
+        self.metrics = {
+            'acquired': 0,
+            'waited': 0,
+            'wait_seconds_total': 0.0,
+            'wait_seconds_max': 0.0,
+            'timeouts': 0,
+            'health_check_failures': 0
+        }
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection; it is rolled back if left mid-transaction and returned on exit"""
+        started = time.perf_counter()
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            with self._lock:
+                self.metrics['timeouts'] += 1
+            raise PoolTimeout(f"No database connection available within {self.acquire_timeout}s")
+        waited = time.perf_counter() - started
+
+        conn = None
+        try:
+            conn = self._checkout()
+            with self._lock:
+                self.metrics['acquired'] += 1
+                self.metrics['wait_seconds_total'] += waited
+                self.metrics['wait_seconds_max'] = max(self.metrics['wait_seconds_max'], waited)
+                if waited > 0.001:
+                    self.metrics['waited'] += 1
+            yield conn
+        except Exception:
+            if conn is not None and not conn.closed:
+                conn.rollback()
+            raise
+        finally:
+            if conn is not None:
+                self._last_used[id(conn)] = time.monotonic()
+                self._pool.putconn(conn, close=conn.closed != 0)
+            self._slots.release()
+
+    async def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run func(conn, *args) on the database executor so blocking queries don't stall the event loop"""
+        def call():
+            with self.connection() as conn:
+                return func(conn, *args, **kwargs)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, call)
+
+    def _checkout(self):
+        """Get a pooled connection, replacing it if it went stale while idle"""
+        conn = self._pool.getconn()
+        idle_for = time.monotonic() - self._last_used.get(id(conn), 0.0)
+        if not conn.closed and idle_for < self.health_check_after:
+            return conn
+        try:
+            if conn.closed:
+                raise psycopg2.InterfaceError("connection already closed")
+            cur = conn.cursor()
+            cur.execute("SELECT 1")
+            cur.close()
+            conn.rollback()
+            return conn
+        except psycopg2.Error as e:
+            with self._lock:
+                self.metrics['health_check_failures'] += 1
+            logger.warning(f"Discarding unhealthy pooled connection: {e}")
+            self._last_used.pop(id(conn), None)
+            self._pool.putconn(conn, close=True)
+            return self._pool.getconn()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            metrics = dict(self.metrics)
+        metrics['avg_wait_ms'] = round(metrics['wait_seconds_total'] / metrics['acquired'] * 1000, 3) \
+            if metrics['acquired'] else 0.0
+        metrics.update({
+            'min_size': self.minconn,
+            'max_size': self.maxconn,
+            'in_use': len(self._pool._used),
+            'idle': len(self._pool._pool),
+            'queued_queries': self._executor._work_queue.qsize()
+        })
+        return metrics
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self._pool.closeall()
+
+
+_pool: Optional[DatabasePool] = None
+_pool_lock = threading.Lock()
+
+
+def init_pool(**kwargs) -> DatabasePool:
+    """Create the process-wide pool (called from the FastAPI lifespan)"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = DatabasePool(**kwargs)
+            logger.info(f"Database pool ready ({_pool.minconn}-{_pool.maxconn} connections)")
+        return _pool
+
+
+def get_pool() -> DatabasePool:
+    """Return the process-wide pool, creating it on first use outside the web app"""
+    return _pool or init_pool()
+
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
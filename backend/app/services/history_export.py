@@ -0,0 +1,85 @@
+import csv
+import io
+import json
+import logging
+from datetime import datetime
+from itertools import count
+from typing import Dict, Iterator, List, Optional
+
+from .catalog_cache import get_catalog_cache
+from .config import EXPORT_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+EXPORT_COLUMNS = ['item_id', 'market_hash_name', 'source', 'price', 'volume', 'timestamp']
+MEDIA_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv'
+}
+
+_cursor_ids = count()
+
+
+def _ndjson(rows: List[Dict]) -> str:
+    return ''.join(json.dumps(row, default=datetime.isoformat) + '\n' for row in rows)
+
+
+def _csv(rows: List[Dict]) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerows([row[column] if column != 'timestamp' else row[column].isoformat()
+                      for column in EXPORT_COLUMNS] for row in rows)
+    return buffer.getvalue()
+
+
+def stream_price_history(conn, since: datetime, item_ids: Optional[List[int]] = None,
+                         source: Optional[str] = None, export_format: str = 'ndjson',
+                         batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[str]:
+    """Yield raw price ticks as NDJSON or CSV text, batch_size rows at a time.
+
+    Rows come from a server-side (named) cursor, so only one batch is held in memory however
+    long the range is. Item names come from the catalog cache rather than a join.
+    """
+    encode = _csv if export_format == 'csv' else _ndjson
+    if export_format == 'csv':
+        yield ','.join(EXPORT_COLUMNS) + '\n'
+    names = get_catalog_cache().get(conn).by_id
+
+    query = """
+        SELECT item_id, source, price, volume, timestamp
+        FROM price_history
+        WHERE timestamp >= %s
+    """
+    params = [since]
+
+    if item_ids:
+        query += " AND item_id = ANY(%s)"
+        params.append(item_ids)
+
+    if source:
+        query += " AND source = %s"
+        params.append(source)
+
+    query += " ORDER BY item_id, timestamp"
+
+    # A named cursor DECLAREs on the server; the connection must stay in its transaction while it is read
+    cur = conn.cursor(name=f"price_history_export_{next(_cursor_ids)}")
+    try:
+        cur.execute(query, params)
+        rows_sent = 0
+        while True:
+            batch = cur.fetchmany(batch_size)
+            if not batch:
+                break
+            rows_sent += len(batch)
+            yield encode([{
+                'item_id': item_id,
+                'market_hash_name': names[item_id]['market_hash_name'] if item_id in names else None,
+                'source': row_source,
+                'price': price,
+                'volume': volume,
+                'timestamp': timestamp
+            } for item_id, row_source, price, volume, timestamp in batch])
+        logger.info(f"Exported {rows_sent} price ticks as {export_format}")
+    finally:
+        cur.close()
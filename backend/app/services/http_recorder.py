@@ -0,0 +1,60 @@
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class HttpRecorder:
+    """Appends upstream request/response pairs to a JSONL file for later replay"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.recorded = 0
+        self._lock = threading.Lock()
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def record(self, method: str, url: str, params: Optional[Dict], status: int, body: str,
+               headers: Optional[Dict[str, str]] = None, elapsed: Optional[float] = None):
+        """Append one exchange; JSON bodies are stored decoded, anything else as text"""
+        try:
+            payload: Any = json.loads(body)
+        except ValueError:
+            payload = body
+        line = json.dumps({
+            'ts': time.time(),
+            'method': method,
+            'url': url,
+            'params': {str(k): str(v) for k, v in (params or {}).items()},
+            'status': status,
+            'headers': {k: v for k, v in (headers or {}).items() if v is not None},
+            'elapsed_ms': round(elapsed * 1000, 1) if elapsed is not None else None,
+            'body': payload
+        }, separators=(',', ':'), ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + '\n')
+            self._file.flush()
+            self.recorded += 1
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+
+_recorder: Optional[HttpRecorder] = None
+
+
+def get_http_recorder() -> Optional[HttpRecorder]:
+    """Return the process-wide recorder when SCRAPER_RECORD_PATH is set"""
+    global _recorder
+    path = os.getenv('SCRAPER_RECORD_PATH')
+    if not path:
+        return None
+    if _recorder is None or _recorder.path != path:
+        _recorder = HttpRecorder(path)
+        logger.info(f"Recording upstream responses to {path}")
+    return _recorder
@@ -0,0 +1,25 @@
+from typing import Dict, Optional
+
+
+def parse_item_name(market_hash_name: str) -> Optional[Dict]:
+    """Parse item name to get components"""
+    parts = market_hash_name.split('|')
+    if len(parts) == 2:
+        weapon_type = parts[0].strip()
+        rest = parts[1].strip()
+
+        if '(' in rest:
+            skin_name = rest[:rest.rfind('(')].strip()
+            wear = rest[rest.rfind('(')+1:rest.rfind(')')].strip()
+        else:
+            skin_name = rest
+            wear = "Not Applicable"
+
+        return {
+            "market_hash_name": market_hash_name,
+            "weapon_type": weapon_type,
+            "skin_name": skin_name,
+            "wear": wear,
+            "item_type": "knife" if "★" in weapon_type else "weapon"
+        }
+    return None
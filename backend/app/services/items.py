@@ -0,0 +1,44 @@
+import logging
+from typing import Dict, Optional
+
+from psycopg2.extras import RealDictCursor
+
+from .cache_versions import CATALOG, QUERIES, bump_cache_versions
+from .catalog_cache import get_catalog_cache
+from .query_cache import get_query_cache
+
+logger = logging.getLogger(__name__)
+
+
+def insert_item(conn, item) -> Optional[Dict]:
+    """Insert an item and drop the cached catalog; None if its market_hash_name already exists"""
+    cur = conn.cursor(cursor_factory=RealDictCursor)
+
+    cur.execute("""
+        SELECT item_id FROM items 
+        WHERE market_hash_name = %s
+    """, (item.market_hash_name,))
+
+    if cur.fetchone():
+        return None
+
+    cur.execute("""
+        INSERT INTO items 
+        (market_hash_name, item_type, weapon_type, skin_name, wear, created_at)
+        VALUES (%s, %s, %s, %s, %s, CURRENT_TIMESTAMP)
+        RETURNING *
+    """, (
+        item.market_hash_name,
+        item.item_type,
+        item.weapon_type,
+        item.skin_name,
+        item.wear
+    ))
+
+    new_item = cur.fetchone()
+    bump_cache_versions(conn, CATALOG, QUERIES)
+    conn.commit()
+    get_catalog_cache().invalidate()
+    get_query_cache().invalidate([new_item['item_id']])
+    logger.info(f"Created item {new_item['item_id']}: {item.market_hash_name}")
+    return new_item
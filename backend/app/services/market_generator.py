@@ -0,0 +1,270 @@
+import logging
+import struct
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .item_names import parse_item_name
+
+logger = logging.getLogger(__name__)
+
+WEAPONS = [
+    'AK-47', 'M4A4', 'M4A1-S', 'AWP', 'Desert Eagle', 'USP-S', 'Glock-18', 'P250', 'Five-SeveN',
+    'Tec-9', 'CZ75-Auto', 'P2000', 'Dual Berettas', 'R8 Revolver', 'MAC-10', 'MP9', 'MP7', 'MP5-SD',
+    'UMP-45', 'P90', 'PP-Bizon', 'FAMAS', 'Galil AR', 'AUG', 'SG 553', 'SSG 08', 'SCAR-20', 'G3SG1',
+    'Nova', 'XM1014', 'MAG-7', 'Sawed-Off', 'M249', 'Negev',
+]
+SKINS = [
+    'Redline', 'Asiimov', 'Vulcan', 'Fire Serpent', 'Hyper Beast', 'Neo-Noir', 'Slate', 'Epicenter',
+    'Neon Rider', 'Bronze Deco', 'Check Engine', 'Printstream', 'Bloodsport', 'Fuel Injector',
+    'Kill Confirmed', 'Cyrex', 'Blaze', 'Howl', 'Dragon Lore', 'Medusa', 'Graphite', 'Atomic Alloy',
+    'Case Hardened', 'Safari Mesh', 'Sand Dune', 'Urban DDPAT', 'Boreal Forest', 'Forest Leaves',
+    'Candy Apple', 'Nightwish', 'Head Shot', 'Wild Lotus', 'Phantom Disruptor', 'Ice Coaled',
+    'Temukau', 'Duality', 'Chromatic Aberration', 'Wasteland Rebel', 'Fade', 'Ocean Drive',
+]
+KNIVES = [
+    'Karambit', 'M9 Bayonet', 'Bayonet', 'Butterfly Knife', 'Flip Knife', 'Gut Knife', 'Huntsman Knife',
+    'Falchion Knife', 'Bowie Knife', 'Shadow Daggers', 'Talon Knife', 'Ursus Knife', 'Navaja Knife',
+    'Stiletto Knife', 'Skeleton Knife', 'Nomad Knife', 'Paracord Knife', 'Survival Knife', 'Classic Knife',
+    'Kukri Knife',
+]
+KNIFE_FINISHES = [
+    'Fade', 'Doppler', 'Marble Fade', 'Tiger Tooth', 'Slaughter', 'Crimson Web', 'Case Hardened',
+    'Blue Steel', 'Stained', 'Night', 'Ultraviolet', 'Damascus Steel', 'Lore', 'Autotronic',
+    'Gamma Doppler', 'Freehand', 'Rust Coat', 'Scorched', 'Safari Mesh', 'Boreal Forest',
+]
+# Wear -> price multiplier relative to Factory New
+WEARS = {
+    'Factory New': 1.0,
+    'Minimal Wear': 0.75,
+    'Field-Tested': 0.55,
+    'Well-Worn': 0.45,
+    'Battle-Scarred': 0.4,
+}
+STICKERS = [
+    'Natus Vincere', 'G2 Esports', 'FaZe', 'Vitality', 'Team Spirit', 'MOUZ', 'Astralis', 'Cloud9',
+    'Heroic', 'Complexity Gaming', 'Liquid', 'ENCE', 'Eternal Fire', 'The MongolZ', 'FURIA', 'paiN Gaming',
+    'Crown (Foil)', 'Howling Dawn', 'Good Game', 'My Other Awp', 'Gutted', 'Hello FAMAS', 'Harlequins',
+    'Adeptus Custodes', 'Flammable', 'Drug War Veteran', 'Bish (Holo)', 'Bash (Holo)', 'Bosh (Holo)',
+    'Headhunter (Foil)',
+]
+# Sticker variant -> price multiplier relative to paper
+STICKER_VARIANTS = {'': 1.0, 'Holo': 6.0, 'Foil': 12.0, 'Gold': 40.0, 'Glitter': 3.0}
+CASES = [
+    'Revolution Case', 'Kilowatt Case', 'Recoil Case', 'Dreams & Nightmares Case', 'Fracture Case',
+    'Snakebite Case', 'Prisma 2 Case', 'Clutch Case', 'Danger Zone Case', 'Horizon Case', 'Spectrum 2 Case',
+    'Chroma 3 Case', 'Gamma 2 Case', 'Glove Case', 'Operation Breakout Weapon Case', 'Huntsman Weapon Case',
+    'Operation Bravo Case', 'CS:GO Weapon Case', 'eSports 2013 Case', 'Shadow Case',
+]
+# Share of the catalog per category; weapons absorb whatever the others cannot fill
+CATEGORY_SHARES = {'knife': 0.1, 'sticker': 0.12, 'case': 0.01}
+STEAM_PREMIUM = 1.15  # Steam listings trade above Buff by roughly the Steam fee
+
+# COPY BINARY framing: signature, flags, header extension length / end-of-data marker
+COPY_HEADER = b'PGCOPY\n\xff\r\n\x00' + struct.pack('>ii', 0, 0)
+COPY_TRAILER = struct.pack('>h', -1)
+PG_EPOCH = datetime(2000, 1, 1, tzinfo=timezone.utc)
+MICROS_PER_DAY = 86_400_000_000
+
+
+def _weapon_names() -> List[str]:
+    names = []
+    for stattrak in ('', 'StatTrak™ '):
+        for weapon in WEAPONS:
+            for skin in SKINS:
+                names.extend(f"{stattrak}{weapon} | {skin} ({wear})" for wear in WEARS)
+    return names
+
+
+def _knife_names() -> List[str]:
+    names = []
+    for stattrak in ('', 'StatTrak™ '):
+        for knife in KNIVES:
+            for finish in KNIFE_FINISHES:
+                names.extend(f"★ {stattrak}{knife} | {finish} ({wear})" for wear in WEARS)
+    return names
+
+
+def _sticker_names() -> List[str]:
+    names = []
+    for sticker in STICKERS:
+        if '(' in sticker:
+            names.append(f"Sticker | {sticker}")
+            continue
+        names.extend(f"Sticker | {sticker} ({variant})" if variant else f"Sticker | {sticker}"
+                     for variant in STICKER_VARIANTS)
+    return names
+
+
+def catalog_capacity() -> int:
+    return len(_weapon_names()) + len(_knife_names()) + len(_sticker_names()) + len(CASES)
+
+
+def build_catalog(count: int, seed: int = 0) -> List[str]:
+    """Pick count distinct market_hash_names with a realistic mix of weapons, knives, stickers and cases"""
+    if count > catalog_capacity():
+        raise ValueError(f"Catalog holds at most {catalog_capacity()} distinct items")
+    rng = np.random.default_rng(seed)
+    pools = {'knife': _knife_names(), 'sticker': _sticker_names(), 'case': list(CASES)}
+
+    names = []
+    for category, share in CATEGORY_SHARES.items():
+        pool = pools[category]
+        take = min(len(pool), int(round(count * share)))
+        names.extend(pool[i] for i in rng.permutation(len(pool))[:take])
+    weapons = _weapon_names()
+    names.extend(weapons[i] for i in rng.permutation(len(weapons))[:count - len(names)])
+    if len(names) < count:
+        # The weapon pool ran out; top up from the other categories' unused names
+        used = set(names)
+        names.extend(name for pool in pools.values() for name in pool if name not in used)
+    return [names[i] for i in rng.permutation(len(names))[:count]]
+
+
+def item_fields(market_hash_name: str) -> Dict:
+    """Columns for an items row; cases carry no '|' so parse_item_name leaves them to us"""
+    fields = parse_item_name(market_hash_name)
+    if fields is None:
+        return {
+            "market_hash_name": market_hash_name,
+            "weapon_type": "Container",
+            "skin_name": market_hash_name,
+            "wear": "Not Applicable",
+            "item_type": "case"
+        }
+    return fields
+
+
+def base_price(market_hash_name: str, rng: np.random.Generator) -> float:
+    """Plausible Buff price for an item, drawn around its category's typical range"""
+    fields = item_fields(market_hash_name)
+    if fields['item_type'] == 'case':
+        price = rng.lognormal(np.log(1.0), 1.0)
+    elif fields['weapon_type'] == 'Sticker':
+        variant = fields['wear'] if fields['wear'] in STICKER_VARIANTS else ''
+        price = rng.lognormal(np.log(0.3), 1.0) * STICKER_VARIANTS[variant]
+    elif fields['item_type'] == 'knife':
+        price = rng.lognormal(np.log(250.0), 0.8) * WEARS.get(fields['wear'], 1.0)
+    else:
+        price = rng.lognormal(np.log(4.0), 1.5) * WEARS.get(fields['wear'], 1.0)
+    if 'StatTrak™' in fields['weapon_type']:
+        price *= 1.8
+    return round(max(float(price), 0.03), 2)
+
+
+class MarketSimulator:
+    """Random-walk price ticks for a fixed set of items, generated one UTC day at a time.
+
+    Each item keeps its own log-price between days. Cheap items trade (and so tick) more often
+    than expensive ones, listing volume falls with price, and a steam_share of ticks are Steam
+    listings quoted at a premium over the Buff walk.
+    """
+
+    def __init__(self, item_ids: List[int], base_prices: List[float], volatility: float = 0.03,
+                 steam_share: float = 0.2, seed: int = 0):
+        self.rng = np.random.default_rng(seed)
+        self.item_ids = np.asarray(item_ids, dtype=np.int32)
+        self.base_prices = np.asarray(base_prices, dtype=np.float64)
+        self.log_prices = np.log(self.base_prices)
+        self.volatility = volatility
+        self.steam_share = steam_share
+        liquidity = 1.0 / np.sqrt(self.base_prices)
+        self.weights = liquidity / liquidity.sum()
+        self.listings = np.maximum(1.0, 3000.0 * liquidity / liquidity.max())
+
+    def day(self, day: datetime, ticks: int, until: Optional[datetime] = None) -> Tuple[np.ndarray, ...]:
+        """ticks rows for the UTC day starting at day, ordered by time: (item_id, price, volume, is_steam, micros).
+
+        Ticks fall before until when it cuts the day short, e.g. now on the current day.
+        """
+        rng = self.rng
+        span = MICROS_PER_DAY
+        if until is not None:
+            span = min(span, max(1, int((until - day).total_seconds() * 1_000_000)))
+        items = rng.choice(len(self.item_ids), size=ticks, p=self.weights)
+        offsets = rng.integers(0, span, size=ticks)
+
+        # Walk each item through its own ticks in time order; sigma scales so daily volatility
+        # does not depend on how many ticks an item happened to get
+        order = np.lexsort((offsets, items))
+        items, offsets = items[order], offsets[order]
+        expected = np.maximum(self.weights[items] * ticks, 1.0)
+        steps = rng.normal(0.0, self.volatility / np.sqrt(expected))
+        walked = np.cumsum(steps)
+        starts = np.flatnonzero(np.r_[True, items[1:] != items[:-1]])
+        walked -= np.repeat(walked[starts] - steps[starts], np.diff(np.r_[starts, ticks]))
+        log_prices = self.log_prices[items] + walked
+        ends = np.r_[starts[1:], ticks] - 1
+        self.log_prices[items[ends]] = log_prices[ends]
+
+        is_steam = rng.random(ticks) < self.steam_share
+        prices = np.exp(log_prices)
+        prices[is_steam] *= STEAM_PREMIUM * rng.normal(1.0, 0.01, size=int(is_steam.sum()))
+        prices = np.maximum(np.round(prices, 2), 0.03)
+        volumes = rng.poisson(self.listings[items]).astype(np.int32)
+
+        micros = int((day - PG_EPOCH).total_seconds()) * 1_000_000 + offsets
+        by_time = np.argsort(micros, kind='stable')
+        return (self.item_ids[items][by_time], prices[by_time], volumes[by_time],
+                is_steam[by_time], micros[by_time])
+
+
+def _binary_rows(item_ids: np.ndarray, prices: np.ndarray, volumes: np.ndarray, source: str,
+                 micros: np.ndarray) -> bytes:
+    encoded = source.encode()
+    dtype = np.dtype([
+        ('fields', '>i2'),
+        ('item_len', '>i4'), ('item_id', '>i4'),
+        ('price_len', '>i4'), ('price', '>f8'),
+        ('volume_len', '>i4'), ('volume', '>i4'),
+        ('source_len', '>i4'), ('source', f'S{len(encoded)}'),
+        ('ts_len', '>i4'), ('ts', '>i8'),
+    ])
+    rows = np.empty(len(item_ids), dtype=dtype)
+    rows['fields'] = 5
+    rows['item_len'], rows['item_id'] = 4, item_ids
+    rows['price_len'], rows['price'] = 8, prices
+    rows['volume_len'], rows['volume'] = 4, volumes
+    rows['source_len'], rows['source'] = len(encoded), encoded
+    rows['ts_len'], rows['ts'] = 8, micros
+    return rows.tobytes()
+
+
+def to_binary_copy(item_ids: np.ndarray, prices: np.ndarray, volumes: np.ndarray, is_steam: np.ndarray,
+                   micros: np.ndarray) -> bytes:
+    """Encode ticks for COPY price_history (item_id, price, volume, source, timestamp) FROM STDIN (FORMAT binary).
+
+    Rows are fixed width per source, so the whole batch is packed by numpy rather than formatted
+    row by row; Buff rows come first, then Steam rows.
+    """
+    parts = [COPY_HEADER]
+    for source, mask in (('buff', ~is_steam), ('steam', is_steam)):
+        parts.append(_binary_rows(item_ids[mask], prices[mask], volumes[mask], source, micros[mask]))
+    parts.append(COPY_TRAILER)
+    return b''.join(parts)
+
+
+def ticks_per_day(total: int, days: int) -> List[int]:
+    """Split total ticks over days as evenly as possible"""
+    share, extra = divmod(total, days)
+    return [share + (1 if day < extra else 0) for day in range(days)]
+
+
+def split_evenly(values: List, parts: int) -> List[List]:
+    parts = max(1, min(parts, len(values)))
+    size, extra = divmod(len(values), parts)
+    chunks, start = [], 0
+    for part in range(parts):
+        end = start + size + (1 if part < extra else 0)
+        chunks.append(values[start:end])
+        start = end
+    return chunks
+
+
+def tick_share(base_prices: List[float], chunk: List[float]) -> float:
+    """Fraction of all ticks that land on chunk's items under MarketSimulator's liquidity weights"""
+    if not chunk:
+        return 0.0
+    liquidity = 1.0 / np.sqrt(np.asarray(base_prices, dtype=np.float64))
+    return float(np.sum(1.0 / np.sqrt(np.asarray(chunk, dtype=np.float64))) / liquidity.sum())
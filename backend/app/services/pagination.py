@@ -0,0 +1,57 @@
+import base64
+import json
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Keyset order of item listings: newest first, item_id breaking ties between items created together
+SortKey = Tuple[datetime, int]
+
+
+def sort_key(row: Dict) -> SortKey:
+    return row['created_at'], row['item_id']
+
+
+def encode_cursor(row: Dict) -> str:
+    """Opaque cursor pointing just past the given row"""
+    created_at, item_id = sort_key(row)
+    payload = json.dumps([created_at.isoformat(), item_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> SortKey:
+    """Inverse of encode_cursor; raises ValueError on anything it did not produce"""
+    try:
+        created_at, item_id = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        return datetime.fromisoformat(created_at), int(item_id)
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def parse_fields(fields: Optional[str], allowed: Sequence[str]) -> Optional[List[str]]:
+    """Comma-separated field names, validated against the allowed ones; None means all"""
+    if not fields:
+        return None
+    names = list(dict.fromkeys(name.strip() for name in fields.split(',') if name.strip()))
+    unknown = [name for name in names if name not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}; allowed: {', '.join(allowed)}")
+    return names
+
+
+def project(rows: Sequence[Dict], fields: Optional[List[str]]) -> List[Dict]:
+    if fields is None:
+        return list(rows)
+    return [{name: row[name] for name in fields} for row in rows]
+
+
+def split_page(rows: Sequence[Dict], limit: int) -> Tuple[List[Dict], Optional[str]]:
+    """Trim rows fetched with limit + 1 to the page, returning the cursor of the next one if any"""
+    page = list(rows[:limit])
+    return page, encode_cursor(page[-1]) if len(rows) > limit else None
+
+
+def set_next_cursor(request, response, next_cursor: Optional[str]):
+    """Advertise the next page in X-Next-Cursor and a Link header, leaving the list body unchanged"""
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+        response.headers['Link'] = f'<{request.url.include_query_params(cursor=next_cursor)}>; rel="next"'
@@ -0,0 +1,198 @@
+import io
+import logging
+import os
+import shutil
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from .candles import bucket_start
+from .config import PARQUET_ARCHIVE_PATH
+
+logger = logging.getLogger(__name__)
+
+# One file per UTC day and source: <root>/date=YYYY-MM-DD/source=<source>/ticks.parquet
+TICK_SCHEMA = pa.schema([
+    ('item_id', pa.int32()),
+    ('price', pa.float64()),
+    ('volume', pa.int32()),
+    ('timestamp', pa.timestamp('us', tz='UTC')),
+])
+PARTITION_SCHEMA = pa.schema([('date', pa.string()), ('source', pa.string())])
+PARTITIONING = ds.partitioning(PARTITION_SCHEMA, flavor='hive')
+FILE_NAME = 'ticks.parquet'
+
+
+def day_dir(root: str, day: date) -> str:
+    return os.path.join(root, f"date={day.isoformat()}")
+
+
+def exported_days(root: str) -> List[date]:
+    """Days already present in the archive, oldest first"""
+    if not os.path.isdir(root):
+        return []
+    days = []
+    for name in os.listdir(root):
+        if name.startswith('date='):
+            try:
+                days.append(date.fromisoformat(name[len('date='):]))
+            except ValueError:
+                continue
+    return sorted(days)
+
+
+def _fetch_day(conn, start: datetime) -> pa.Table:
+    """One UTC day of ticks, streamed out of Postgres with COPY and parsed by Arrow"""
+    buffer = io.BytesIO()
+    cur = conn.cursor()
+    try:
+        # Epoch microseconds avoid any timestamp text parsing on either side
+        cur.copy_expert(cur.mogrify("""
+            COPY (
+                SELECT source, item_id, price, volume,
+                       (EXTRACT(EPOCH FROM timestamp) * 1000000)::bigint
+                FROM price_history
+                WHERE timestamp >= %s AND timestamp < %s AND item_id IS NOT NULL
+                ORDER BY source, item_id, timestamp
+            ) TO STDOUT WITH (FORMAT csv)
+        """, (start, start + timedelta(days=1))).decode(), buffer)
+    finally:
+        cur.close()
+    if not buffer.tell():
+        return pa.table({'source': pa.array([], type=pa.string())})
+    buffer.seek(0)
+    table = pa_csv.read_csv(
+        buffer,
+        read_options=pa_csv.ReadOptions(column_names=['source', 'item_id', 'price', 'volume', 'micros']),
+        convert_options=pa_csv.ConvertOptions(column_types={
+            'source': pa.string(), 'item_id': pa.int32(), 'price': pa.float64(),
+            'volume': pa.int32(), 'micros': pa.int64()
+        })
+    )
+    timestamps = table.column('micros').cast(pa.timestamp('us', tz='UTC'))
+    return table.drop_columns(['micros']).append_column('timestamp', timestamps)
+
+
+def write_day(root: str, day: date, table: pa.Table) -> Dict[str, int]:
+    """Replace the archive's files for day with table's (non-empty) rows, one file per source.
+
+    Files are written beside the target and renamed into place, and sources missing from table
+    are removed, so re-exporting a day (e.g. one that was still in progress) is idempotent.
+    """
+    target = day_dir(root, day)
+    os.makedirs(target, exist_ok=True)
+    rows = {}
+    sources = table.column('source').unique().to_pylist() if table.num_rows else []
+    for source in sorted(sources):
+        subset = table.filter(pc.equal(table.column('source'), source)).select(TICK_SCHEMA.names)
+        path = os.path.join(target, f"source={source}")
+        os.makedirs(path, exist_ok=True)
+        staging = os.path.join(path, f".{FILE_NAME}.tmp")
+        pq.write_table(subset.cast(TICK_SCHEMA), staging, compression='zstd')
+        os.replace(staging, os.path.join(path, FILE_NAME))
+        rows[source] = subset.num_rows
+
+    for name in os.listdir(target):
+        if name.startswith('source=') and name[len('source='):] not in rows:
+            shutil.rmtree(os.path.join(target, name))
+    return rows
+
+
+def export_history(conn, root: Optional[str] = None, since: Optional[date] = None,
+                   until: Optional[date] = None) -> Dict:
+    """Append whole UTC days [since, until) of price_history to the Parquet archive.
+
+    By default it resumes at the newest archived day (rewritten, since it may have been exported
+    while still in progress) and stops before today. Run it before compaction deletes raw ticks.
+    """
+    root = root or PARQUET_ARCHIVE_PATH
+    today = datetime.now(timezone.utc).date()
+    until = until or today
+    if since is None:
+        archived = exported_days(root)
+        if archived:
+            since = archived[-1]
+        else:
+            cur = conn.cursor()
+            cur.execute("SELECT MIN(timestamp) FROM price_history")
+            oldest = cur.fetchone()[0]
+            cur.close()
+            since = bucket_start(oldest, 'daily').date() if oldest else until
+
+    stats = {'days': 0, 'rows': 0}
+    day = since
+    while day < until:
+        start = datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+        table = _fetch_day(conn, start)
+        conn.rollback()  # Read-only; don't hold a snapshot open across days
+        # A day with no raw ticks left (e.g. compacted since it was archived) keeps its files
+        if table.num_rows:
+            rows = write_day(root, day, table)
+            stats['days'] += 1
+            stats['rows'] += sum(rows.values())
+            logger.debug(f"Archived {day}: {rows}")
+        day += timedelta(days=1)
+
+    logger.info(f"Archived {stats['rows']} ticks over {stats['days']} days into {root}")
+    return stats
+
+
+def read_history(root: Optional[str] = None, columns: Optional[Sequence[str]] = None,
+                 since: Optional[datetime] = None, until: Optional[datetime] = None,
+                 sources: Optional[Sequence[str]] = None, item_ids: Optional[Sequence[int]] = None) -> pa.Table:
+    """Read archived ticks as an Arrow table, touching only the days, sources and columns asked for.
+
+    columns may include the partition keys 'date' and 'source'; [since, until) bounds timestamps.
+    """
+    root = root or PARQUET_ARCHIVE_PATH
+    columns = list(columns) if columns else TICK_SCHEMA.names + ['source']
+    if not exported_days(root):
+        return pa.table({name: pa.array([], type=_column_type(name)) for name in columns})
+
+    dataset = ds.dataset(root, format='parquet', schema=pa.unify_schemas([TICK_SCHEMA, PARTITION_SCHEMA]),
+                         partitioning=PARTITIONING)
+    timestamp_type = TICK_SCHEMA.field('timestamp').type
+    predicate = None
+    # Day bounds prune whole directories; the timestamp bounds trim the edge days
+    if since is not None:
+        predicate = _and(predicate, ds.field('date') >= bucket_start(since, 'daily').date().isoformat())
+        predicate = _and(predicate, ds.field('timestamp') >= pa.scalar(since, type=timestamp_type))
+    if until is not None:
+        predicate = _and(predicate, ds.field('date') <= bucket_start(until, 'daily').date().isoformat())
+        predicate = _and(predicate, ds.field('timestamp') < pa.scalar(until, type=timestamp_type))
+    if sources:
+        predicate = _and(predicate, ds.field('source').isin(list(sources)))
+    if item_ids:
+        predicate = _and(predicate, ds.field('item_id').isin(list(item_ids)))
+    return dataset.to_table(columns=columns, filter=predicate)
+
+
+def load_history(root: Optional[str] = None, **filters):
+    """read_history as a pandas DataFrame"""
+    return read_history(root, **filters).to_pandas()
+
+
+def load_history_arrays(root: Optional[str] = None, **filters) -> Dict[str, np.ndarray]:
+    """read_history as one NumPy array per column (timestamps as datetime64[us], missing volume as -1)"""
+    table = read_history(root, **filters)
+    arrays = {}
+    for name in table.column_names:
+        column = table.column(name)
+        if name == 'volume':
+            column = pc.fill_null(column, -1)
+        arrays[name] = column.to_numpy()
+    return arrays
+
+
+def _and(predicate, condition):
+    return condition if predicate is None else predicate & condition
+
+
+def _column_type(name: str) -> pa.DataType:
+    return pa.unify_schemas([TICK_SCHEMA, PARTITION_SCHEMA]).field(name).type
@@ -0,0 +1,153 @@
+import logging
+import re
+from datetime import date, datetime, timezone
+from typing import Iterable, List, Optional, Tuple
+
+from .config import PARTITION_MONTHS_AHEAD, PRICE_HISTORY_RETENTION_MODE, PRICE_HISTORY_RETENTION_MONTHS
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = 'price_history'
+PARTITION_NAME = re.compile(r'^price_history_(\d{4})_(\d{2})$')
+
+
+def month_start(value) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT_TABLE}_{month:%Y_%m}"
+
+
+def is_partitioned(conn) -> bool:
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", (PARENT_TABLE,))
+        row = cur.fetchone()
+        return bool(row) and row[0] == 'p'
+    finally:
+        cur.close()
+
+
+def list_partitions(conn) -> List[Tuple[str, date]]:
+    """Monthly partitions currently attached to price_history, oldest first"""
+    cur = conn.cursor()
+    try:
+        cur.execute("""
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.oid = to_regclass(%s)
+        """, (PARENT_TABLE,))
+        partitions = []
+        for (name,) in cur.fetchall():
+            match = PARTITION_NAME.match(name)
+            if match:
+                partitions.append((name, date(int(match.group(1)), int(match.group(2)), 1)))
+        return sorted(partitions, key=lambda partition: partition[1])
+    finally:
+        cur.close()
+
+
+def ensure_partitions(conn, months_ahead: Optional[int] = None, start: Optional[date] = None,
+                      now: Optional[datetime] = None) -> List[str]:
+    """Create any missing monthly partitions from start (default: this month) through months_ahead.
+
+    Only missing partitions are created, so calling this before every collection run takes no
+    lock on price_history in the common case. The caller owns the transaction.
+    """
+    if not is_partitioned(conn):
+        logger.warning(f"{PARENT_TABLE} is not partitioned; run scripts/maintain_partitions.py --migrate")
+        return []
+
+    months_ahead = PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead
+    current = month_start(now or datetime.now(timezone.utc))
+    month = month_start(start) if start else current
+    months = []
+    while month <= add_months(current, months_ahead):
+        months.append(month)
+        month = add_months(month, 1)
+    return _create_partitions(conn, months)
+
+
+def create_partitions(conn, months: Iterable[date]) -> List[str]:
+    """Create the missing partitions of the given months, e.g. for late or backfilled ticks.
+
+    The caller owns the transaction.
+    """
+    if not is_partitioned(conn):
+        return []
+    return _create_partitions(conn, sorted(set(months)))
+
+
+def _create_partitions(conn, months: List[date]) -> List[str]:
+    existing = {name for name, _ in list_partitions(conn)}
+
+    created = []
+    cur = conn.cursor()
+    try:
+        for month in months:
+            name = partition_name(month)
+            if name not in existing:
+                # Bounds are UTC so partitions line up with how timestamps are written
+                cur.execute(f"""
+                    CREATE TABLE IF NOT EXISTS {name} PARTITION OF {PARENT_TABLE}
+                    FOR VALUES FROM (%s) TO (%s)
+                """, (f"{month.isoformat()} 00:00:00+00", f"{add_months(month, 1).isoformat()} 00:00:00+00"))
+                created.append(name)
+    finally:
+        cur.close()
+
+    if created:
+        logger.info(f"Created partitions: {', '.join(created)}")
+    return created
+
+
+def tick_month(timestamp: datetime) -> date:
+    """Month of the partition a tick's timestamp falls in (partition bounds are UTC)"""
+    return month_start(timestamp.astimezone(timezone.utc) if timestamp.tzinfo else timestamp)
+
+
+def retention_cutoff(retention_months: Optional[int] = None, now: Optional[datetime] = None) -> Optional[date]:
+    """First month inside the retention window, or None when everything is kept"""
+    retention_months = PRICE_HISTORY_RETENTION_MONTHS if retention_months is None else retention_months
+    if retention_months <= 0:
+        return None
+    return add_months(month_start(now or datetime.now(timezone.utc)), -retention_months)
+
+
+def apply_retention(conn, retention_months: Optional[int] = None, mode: Optional[str] = None,
+                    now: Optional[datetime] = None) -> List[str]:
+    """Detach or drop partitions that end before the retention window; 0 months keeps everything.
+
+    Detached partitions stay behind as ordinary tables for archiving; dropped ones are gone.
+    """
+    retention_months = PRICE_HISTORY_RETENTION_MONTHS if retention_months is None else retention_months
+    mode = mode or PRICE_HISTORY_RETENTION_MODE
+    if mode not in ('detach', 'drop'):
+        raise ValueError(f"Unknown retention mode: {mode}")
+    cutoff = retention_cutoff(retention_months, now)
+    if cutoff is None or not is_partitioned(conn):
+        return []
+
+    expired = [name for name, month in list_partitions(conn) if add_months(month, 1) <= cutoff]
+
+    cur = conn.cursor()
+    try:
+        for name in expired:
+            if mode == 'drop':
+                cur.execute(f"DROP TABLE {name}")
+            else:
+                cur.execute(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}")
+    finally:
+        cur.close()
+
+    if expired:
+        logger.info(f"Retention ({retention_months} months, {mode}): {', '.join(expired)}")
+    return expired
@@ -1,111 +1,235 @@
 import asyncio
 import logging
-from datetime import datetime
-#from .steam_market_scraper import SteamMarketPrices
+import time
+from .steam_market_scraper import AsyncSteamMarketPrices, parse_price, parse_volume
 from .buff_parser import BuffParser
-import psycopg2
-from psycopg2.extras import RealDictCursor
+from .price_writer import PriceWriter
+from .cache_versions import CATALOG, QUERIES, bump_cache_versions
+from .partitions import ensure_partitions
+from .db_pool import get_pool
+from psycopg2.extras import RealDictCursor, execute_values
 import os
 from dotenv import load_dotenv
+from typing import Dict, List, Optional, Set, Tuple
 
 load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Arbitrary pg_advisory lock key: one full sweep at a time across collector processes
+SWEEP_LOCK_KEY = 74231902
+
 class PriceCollector:
-    def __init__(self):
-        #self.steam_scraper = SteamMarketPrices()
-        self.buff_parser = BuffParser()
-        self.db_params = {
-            'host': os.getenv('DB_HOST'),
-            'database': os.getenv('DB_NAME'),
-            'user': os.getenv('DB_USER'),
-            'password': os.getenv('DB_PASSWORD'),
-            'port': os.getenv('DB_PORT')
-        }
+    def __init__(self, concurrency: Optional[int] = None, mode: Optional[str] = None,
+                 include_steam: Optional[bool] = None, chunk_size: Optional[int] = None,
+                 max_resume_age_hours: float = 6):
+        self.concurrency = concurrency or int(os.getenv('COLLECTOR_CONCURRENCY', '8'))
+        self.chunk_size = chunk_size or int(os.getenv('COLLECTOR_CHUNK_SIZE', '500'))
+        self.max_resume_age_hours = max_resume_age_hours
+        self.last_run_stats: Dict = {}
+        self.mode = mode or os.getenv('COLLECTOR_MODE', 'search')
+        if include_steam is None:
+            include_steam = os.getenv('COLLECT_STEAM', '0').lower() in ('1', 'true', 'yes')
+        self.buff_parser = BuffParser(max_connections=self.concurrency)
+        self.steam_scraper = AsyncSteamMarketPrices(max_connections=self.concurrency) if include_steam else None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def close(self):
+        """Close the Buff and Steam HTTP sessions; the next collection reopens them"""
+        await self.buff_parser.close()
+        if self.steam_scraper:
+            await self.steam_scraper.close()
+
+    async def _fetch_buff_price(self, semaphore: asyncio.Semaphore, item: Dict) -> Tuple[Dict, Optional[float]]:
+        """Fetch one Buff price while holding a concurrency slot"""
+        async with semaphore:
+            try:
+                return item, await self.buff_parser.get_item_price(item['market_hash_name'])
+            except Exception as e:
+                logger.error(f"Error getting Buff price for {item['market_hash_name']}: {e}")
+                return item, None
 
-    async def collect_and_store_prices(self):
-        """Collect prices from both Steam and Buff"""
-        conn = None
+    async def _fetch_steam_price(self, semaphore: asyncio.Semaphore, item: Dict) -> Tuple[Dict, Optional[Dict]]:
+        """Fetch one Steam price while holding a concurrency slot"""
+        async with semaphore:
+            try:
+                return item, await self.steam_scraper.get_item_price(item['market_hash_name'])
+            except Exception as e:
+                logger.error(f"Error getting Steam price for {item['market_hash_name']}: {e}")
+                return item, None
+
+    def _start_or_resume_run(self, conn) -> Tuple[int, Set[int]]:
+        """Resume the latest unfinished full sweep, or start a new one; call while holding the sweep lock"""
+        cur = conn.cursor(cursor_factory=RealDictCursor)
         try:
-            conn = psycopg2.connect(**self.db_params)
-            cur = conn.cursor(cursor_factory=RealDictCursor)
-            
-            cur.execute("BEGIN")
-
-            cur.execute("SELECT item_id, market_hash_name FROM items")
-            items = cur.fetchall()
-            
-            for item in items:
+            cur.execute("""
+                UPDATE collection_runs
+                SET status = 'abandoned', finished_at = NOW()
+                WHERE status = 'running'
+                AND started_at < NOW() - %s * INTERVAL '1 hour'
+            """, (self.max_resume_age_hours,))
+
+            cur.execute("""
+                SELECT run_id FROM collection_runs
+                WHERE status = 'running'
+                ORDER BY started_at DESC
+                LIMIT 1
+            """)
+            run = cur.fetchone()
+            if run:
+                cur.execute("SELECT item_id FROM collection_checkpoints WHERE run_id = %s", (run['run_id'],))
+                done = {row['item_id'] for row in cur.fetchall()}
+                logger.info(f"Resuming collection run {run['run_id']} with {len(done)} items already collected")
+                run_id = run['run_id']
+            else:
+                cur.execute("INSERT INTO collection_runs (status, started_at) VALUES ('running', NOW()) RETURNING run_id")
+                run_id = cur.fetchone()['run_id']
+                done = set()
+            conn.commit()
+            return run_id, done
+        finally:
+            cur.close()
+
+    def _try_lock_sweep(self, conn) -> bool:
+        """Claim full sweeps for this connection's session; released on unlock or disconnect"""
+        cur = conn.cursor()
+        try:
+            cur.execute("SELECT pg_try_advisory_lock(%s)", (SWEEP_LOCK_KEY,))
+            return cur.fetchone()[0]
+        finally:
+            cur.close()
+
+    def _unlock_sweep(self, conn):
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT pg_advisory_unlock(%s)", (SWEEP_LOCK_KEY,))
+            cur.close()
+            conn.commit()
+        except Exception as e:
+            # A broken connection is closed by the pool, which releases the lock with the session
+            logger.warning(f"Could not release the sweep lock: {e}")
+
+    async def collect_and_store_prices(self, items: Optional[List[Dict]] = None) -> bool:
+        """Collect prices from both Steam and Buff, for all items or just the given ones.
+
+        Work is committed every chunk_size items. Full sweeps also checkpoint finished items
+        so a crashed or restarted collector resumes where it stopped; only one collector runs
+        a sweep at a time, and the others return False without collecting. HTTP sessions stay
+        open between calls until the collector is closed.
+        """
+        try:
+            with get_pool().connection() as conn:
+                sweep = items is None
+                if sweep and not self._try_lock_sweep(conn):
+                    conn.rollback()
+                    logger.warning("Another collector is running a full sweep; skipping this one")
+                    return False
                 try:
-                    '''steam_price = self.steam_scraper.get_item_price(item['market_hash_name'])
-                    if steam_price:
-                        cur.execute("""
-                            INSERT INTO price_history (item_id, price, volume, source, timestamp)
-                            VALUES (%s, %s, %s, 'steam', CURRENT_TIMESTAMP)
-                        """, (item['item_id'], steam_price['lowest_price'], steam_price.get('volume')))
-                    '''
-                    buff_price = await self.buff_parser.get_item_price(item['market_hash_name'])
-                    if buff_price:
-                        cur.execute("""
-                            INSERT INTO price_history (item_id, price, source, timestamp)
-                            VALUES (%s, %s, 'buff', CURRENT_TIMESTAMP)
-                        """, (item['item_id'], buff_price))
-                    
-                    cur.execute("""
-                        UPDATE items 
-                        SET steam_price = %s, 
-                            buff_price = %s,
-                            volume = %s
-                        WHERE item_id = %s
-                    """, (
-                        #steam_price['lowest_price'] if steam_price else None,
-                        buff_price if buff_price else None,
-                        #steam_price.get('volume') if steam_price else None,
-                        item['item_id']
-                    ))
-                    
-                    logger.info(f"Collected prices for {item['market_hash_name']}")
-                    
-                except Exception as e:
-                    logger.error(f"Error collecting prices for {item['market_hash_name']}: {e}")
-                    continue
-            
-            cur.execute("COMMIT")
-            logger.info(f"Successfully collected prices for {len(items)} items")
-            
+                    await self._collect(conn, items)
+                finally:
+                    if sweep:
+                        self._unlock_sweep(conn)
+            return True
+
         except Exception as e:
-            if conn:
-                cur.execute("ROLLBACK")
             logger.error(f"Error in price collection: {e}")
             raise
-        finally:
-            if conn:
-                cur.close()
-                conn.close()
+
+    async def _collect(self, conn, items: Optional[List[Dict]]):
+        cur = conn.cursor(cursor_factory=RealDictCursor)
+        # Cheap when nothing is missing; keeps writes from landing outside every partition
+        ensure_partitions(conn)
+        conn.commit()
+
+        run_id = None
+        if items is None:
+            run_id, done = self._start_or_resume_run(conn)
+            cur.execute("SELECT item_id, market_hash_name FROM items ORDER BY item_id")
+            items = [item for item in cur.fetchall() if item['item_id'] not in done]
+            cur.execute("UPDATE collection_runs SET items_total = %s WHERE run_id = %s",
+                        (len(items) + len(done), run_id))
+            conn.commit()
+
+        market = await self.buff_parser.crawl_market(concurrency=self.concurrency) \
+            if self.mode == 'crawl' and items else None
+        writer = PriceWriter(conn)
+        commit_seconds = 0.0
+
+        async def drain(prices):
+            async for tick in prices:
+                writer.add(tick['item_id'], tick['price'], tick.get('volume'), tick['source'])
+
+        for offset in range(0, len(items), self.chunk_size):
+            chunk = items[offset:offset + self.chunk_size]
+            sources = [self.crawl_buff_prices(chunk, market) if market is not None
+                       else self.collect_buff_prices(chunk)]
+            if self.steam_scraper:
+                sources.append(self.collect_steam_prices(chunk))
+
+            await asyncio.gather(*(drain(prices) for prices in sources))
+            writer.flush()
+            commit_started = time.perf_counter()
+            if run_id:
+                execute_values(cur, """
+                    INSERT INTO collection_checkpoints (run_id, item_id)
+                    VALUES %s
+                    ON CONFLICT DO NOTHING
+                """, [(run_id, item['item_id']) for item in chunk], page_size=len(chunk))
+            # PriceWriter updated items.buff_price/volume and these items' prices; the web
+            # process drops its catalog and query results once this commits
+            bump_cache_versions(conn, CATALOG, QUERIES)
+            conn.commit()
+            commit_seconds += time.perf_counter() - commit_started
+            logger.info(f"Committed {min(offset + len(chunk), len(items))}/{len(items)} items")
+
+        if run_id:
+            cur.execute("""
+                UPDATE collection_runs
+                SET status = 'completed', finished_at = NOW()
+                WHERE run_id = %s
+            """, (run_id,))
+            cur.execute("DELETE FROM collection_checkpoints WHERE run_id = %s", (run_id,))
+            conn.commit()
+
+        self.last_run_stats = {
+            'items': len(items),
+            'prices_written': writer.rows_written,
+            'db_write_seconds': writer.flush_seconds + commit_seconds
+        }
+        logger.info(f"Successfully collected {writer.rows_written} prices for {len(items)} items")
 
     async def collect_steam_prices(self, items):
-        """Collect prices from Steam Market"""
-        for item in items:
-            try:
-                price_data = await self.steam_scraper.get_item_price(item['market_hash_name'])
-                if price_data:
-                    logger.info(f"Steam price for {item['market_hash_name']}: {price_data}")
+        """Collect prices from Steam Market, bounded by the concurrency limit"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+        tasks = [asyncio.create_task(self._fetch_steam_price(semaphore, item)) for item in items]
+        try:
+            for task in asyncio.as_completed(tasks):
+                item, price_data = await task
+                price = parse_price(price_data['lowest_price']) if price_data else None
+                if price:
+                    logger.info(f"Steam price for {item['market_hash_name']}: {price}")
                     yield {
                         'item_id': item['item_id'],
-                        'price': price_data['lowest_price'],
-                        'volume': price_data.get('volume'),
+                        'price': price,
+                        'volume': parse_volume(price_data.get('volume')),
                         'source': 'steam'
                     }
-            except Exception as e:
-                logger.error(f"Error getting Steam price for {item['market_hash_name']}: {e}")
-                continue
+        finally:
+            for task in tasks:
+                task.cancel()
 
     async def collect_buff_prices(self, items):
-        """Collect prices from Buff"""
-        for item in items:
-            try:
-                price = await self.buff_parser.get_item_price(item['market_hash_name'])
+        """Collect prices from Buff, one search per item, bounded by the concurrency limit"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+        tasks = [asyncio.create_task(self._fetch_buff_price(semaphore, item)) for item in items]
+        try:
+            for task in asyncio.as_completed(tasks):
+                item, price = await task
                 if price:
                     logger.info(f"Buff price for {item['market_hash_name']}: {price}")
                     yield {
@@ -113,6 +237,25 @@ class PriceCollector:
                         'price': price,
                         'source': 'buff'
                     }
-            except Exception as e:
-                logger.error(f"Error getting Buff price for {item['market_hash_name']}: {e}")
-                continue
\ No newline at end of file
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def crawl_buff_prices(self, items, market: Optional[Dict[str, Dict]] = None):
+        """Collect prices from Buff by crawling the whole market listing once"""
+        if market is None:
+            market = await self.buff_parser.crawl_market(concurrency=self.concurrency)
+        missing = 0
+        for item in items:
+            listing = market.get(item['market_hash_name'])
+            if not listing:
+                missing += 1
+                continue
+            yield {
+                'item_id': item['item_id'],
+                'price': listing['sell_min_price'],
+                'volume': listing['sell_num'],
+                'source': 'buff'
+            }
+        if missing:
+            logger.warning(f"{missing}/{len(items)} tracked items were not listed on the Buff market")
@@ -0,0 +1,87 @@
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .catalog_cache import get_catalog_cache
+from .config import HOURLY_CANDLE_RETENTION_DAYS
+
+logger = logging.getLogger(__name__)
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Indices of the points Largest-Triangle-Three-Buckets keeps to draw y(x) with threshold points.
+
+    The first and last points are always kept. In between, each bucket keeps the point forming the
+    largest triangle with the previously kept point and the average of the next bucket, which keeps
+    spikes and turns that a stride or mean would smooth away.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    every = (n - 2) / (threshold - 2)
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    a = 0
+    for bucket in range(threshold - 2):
+        start = int(bucket * every) + 1
+        end = int((bucket + 1) * every) + 1
+        next_end = min(int((bucket + 2) * every) + 1, n)
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        kept[bucket + 1] = a
+    return kept
+
+
+def candle_interval(days: int) -> str:
+    """Hourly candles while they are kept for the whole range, daily ones beyond"""
+    return 'hourly' if days <= HOURLY_CANDLE_RETENTION_DAYS else 'daily'
+
+
+def select_price_series(conn, item_ids: List[int], days: int, points: int, source: str = 'buff',
+                        now: Optional[datetime] = None) -> Dict:
+    """Closing prices of many items over the last days, downsampled to at most points each, in one query"""
+    interval = candle_interval(days)
+    since = (now or datetime.now(timezone.utc)) - timedelta(days=days)
+    cur = conn.cursor()
+    try:
+        cur.execute(f"""
+            SELECT item_id, EXTRACT(EPOCH FROM bucket)::float8, close
+            FROM price_candles_{interval}
+            WHERE item_id = ANY(%s)
+            AND source = %s
+            AND bucket >= %s
+            ORDER BY item_id, bucket
+        """, (item_ids, source, since))
+        rows = cur.fetchall()
+    finally:
+        cur.close()
+
+    names = get_catalog_cache().get(conn).by_id
+    series = {item_id: {'timestamps': [], 'prices': []} for item_id in item_ids}
+    if rows:
+        ids, epochs, prices = (np.array(column) for column in zip(*rows))
+        bounds = np.flatnonzero(np.diff(ids)) + 1
+        for start, end in zip(np.r_[0, bounds], np.r_[bounds, len(ids)]):
+            x, y = epochs[start:end], prices[start:end]
+            kept = lttb(x, y, points)
+            series[int(ids[start])] = {
+                'timestamps': (x[kept] * 1000).astype(np.int64).tolist(),   # epoch milliseconds
+                'prices': y[kept].tolist()
+            }
+
+    logger.debug(f"Downsampled {len(rows)} {interval} candles for {len(item_ids)} items to {points} points")
+    return {
+        'interval': interval,
+        'source': source,
+        'points': points,
+        'series': [{
+            'item_id': item_id,
+            'market_hash_name': names[item_id]['market_hash_name'] if item_id in names else None,
+            **values
+        } for item_id, values in series.items()]
+    }
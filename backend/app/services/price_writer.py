@@ -0,0 +1,176 @@
+import io
+import logging
+import time
+from datetime import date, datetime, timezone
+from typing import Dict, List, Optional, Set, Tuple
+
+from psycopg2.extras import execute_values
+
+from .candles import CANDLE_TABLES, aggregate_candles, upsert_candles
+from .compaction import get_watermark, month_bound
+from .partitions import create_partitions, retention_cutoff, tick_month
+
+logger = logging.getLogger(__name__)
+
+PRICE_HISTORY_COLUMNS = ('item_id', 'price', 'volume', 'source', 'timestamp')
+
+
+def _copy_value(value) -> str:
+    if value is None:
+        return '\\N'
+    if isinstance(value, datetime):
+        return value.isoformat()
+    text = str(value)
+    return text.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+def to_copy_buffer(rows: List[Tuple]) -> io.StringIO:
+    """Encode rows in COPY text format"""
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write('\t'.join(_copy_value(value) for value in row))
+        buffer.write('\n')
+    buffer.seek(0)
+    return buffer
+
+
+def latest_ticks(rows: List[Tuple]) -> Dict[Tuple[int, str], Tuple]:
+    """Newest (price, volume, timestamp) per (item_id, source) among price_history rows"""
+    latest: Dict[Tuple[int, str], Tuple] = {}
+    for item_id, price, volume, source, timestamp in rows:
+        current = latest.get((item_id, source))
+        if current is None or timestamp >= current[2]:
+            latest[(item_id, source)] = (price, volume, timestamp)
+    return latest
+
+
+def rebuild_latest_prices(conn):
+    """Backfill latest_prices from price_history, e.g. after upgrading an existing database"""
+    cur = conn.cursor()
+    try:
+        cur.execute("""
+            INSERT INTO latest_prices (item_id, source, price, volume, timestamp)
+            SELECT DISTINCT ON (item_id, source) item_id, source, price, volume, timestamp
+            FROM price_history
+            WHERE item_id IS NOT NULL
+            ORDER BY item_id, source, timestamp DESC
+            ON CONFLICT (item_id, source) DO UPDATE
+            SET price = EXCLUDED.price,
+                volume = EXCLUDED.volume,
+                timestamp = EXCLUDED.timestamp
+            WHERE latest_prices.timestamp <= EXCLUDED.timestamp
+        """)
+        return cur.rowcount
+    finally:
+        cur.close()
+
+
+class PriceWriter:
+    """Buffers price ticks and writes them to price_history, latest_prices and the candle tables in bulk"""
+
+    def __init__(self, conn, batch_size: int = 1000, flush_interval: float = 5.0):
+        self.conn = conn
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.rows_written = 0
+        self.flush_seconds = 0.0
+        self._buffer: List[Tuple] = []
+        self._last_flush = time.monotonic()
+        self._months: Set[date] = set()             # months whose partition is known to exist
+        self._raw_floor: Optional[datetime] = None
+        self._raw_floor_loaded = False
+
+    def add(self, item_id: int, price: float, volume: Optional[int] = None,
+            source: str = 'buff', timestamp: Optional[datetime] = None):
+        """Queue a tick, flushing once the size or time threshold is reached"""
+        self._buffer.append((item_id, price, volume, source, timestamp or datetime.now(timezone.utc)))
+        if len(self._buffer) >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> int:
+        """Write all buffered ticks; the caller owns the transaction"""
+        rows, self._buffer = self._buffer, []
+        self._last_flush = time.monotonic()
+        if not rows:
+            return 0
+
+        started = time.perf_counter()
+        history = self._history_rows(rows)
+        cur = self.conn.cursor()
+        try:
+            if history:
+                cur.copy_expert(
+                    f"COPY price_history ({', '.join(PRICE_HISTORY_COLUMNS)}) FROM STDIN",
+                    to_copy_buffer(history)
+                )
+            latest = latest_ticks(rows)
+            self._upsert_latest(cur, latest)
+            self._update_items(cur, latest)
+            for interval in CANDLE_TABLES:
+                upsert_candles(cur, interval, aggregate_candles(rows, interval))
+        finally:
+            cur.close()
+
+        elapsed = time.perf_counter() - started
+        self.rows_written += len(rows)
+        self.flush_seconds += elapsed
+        logger.debug(f"Flushed {len(rows)} price ticks in {elapsed * 1000:.1f}ms")
+        return len(rows)
+
+    def _history_rows(self, rows: List[Tuple]) -> List[Tuple]:
+        """The ticks to COPY into price_history, after creating any partition they are missing.
+
+        Late, backfilled or clock-skewed ticks may fall in a past month without a partition, which
+        would fail the whole COPY. Ticks before the compaction watermark or the retention window
+        only update the candles and latest prices, as compaction would have done with them.
+        """
+        if not self._raw_floor_loaded:
+            cutoff = retention_cutoff()
+            floors = [floor for floor in (get_watermark(self.conn, 'raw'), cutoff and month_bound(cutoff)) if floor]
+            self._raw_floor = max(floors) if floors else None
+            self._raw_floor_loaded = True
+
+        history = rows
+        if self._raw_floor is not None:
+            history = [row for row in rows if row[4] >= self._raw_floor]
+            if len(history) < len(rows):
+                logger.warning(f"{len(rows) - len(history)} ticks predate {self._raw_floor.isoformat()}; "
+                               "writing them to candles only")
+
+        months = {tick_month(row[4]) for row in history} - self._months
+        if months:
+            create_partitions(self.conn, months)
+            self._months |= months
+        return history
+
+    def _upsert_latest(self, cur, latest: Dict[Tuple[int, str], Tuple]):
+        """Advance latest_prices to the newest tick per item and source, never moving it backwards"""
+        # Rows are sorted so concurrent writers lock keys in the same order
+        execute_values(cur, """
+            INSERT INTO latest_prices (item_id, source, price, volume, timestamp)
+            VALUES %s
+            ON CONFLICT (item_id, source) DO UPDATE
+            SET price = EXCLUDED.price,
+                volume = EXCLUDED.volume,
+                timestamp = EXCLUDED.timestamp
+            WHERE latest_prices.timestamp <= EXCLUDED.timestamp
+        """, [(item_id, source, price, volume, timestamp)
+              for (item_id, source), (price, volume, timestamp) in sorted(latest.items())],
+            page_size=len(latest))
+
+    def _update_items(self, cur, latest: Dict[Tuple[int, str], Tuple]):
+        """Set items.buff_price/volume from the newest Buff tick per item in one statement"""
+        buff = [(item_id, price, volume) for (item_id, source), (price, volume, _) in sorted(latest.items())
+                if source == 'buff']
+        if not buff:
+            return
+
+        execute_values(cur, """
+            UPDATE items
+            SET buff_price = v.price,
+                volume = COALESCE(v.volume, items.volume)
+            FROM (VALUES %s) AS v (item_id, price, volume)
+            WHERE items.item_id = v.item_id
+        """, buff,
+            template="(%s::integer, %s::double precision, %s::integer)",
+            page_size=len(buff))
@@ -0,0 +1,121 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+from urllib.parse import urlencode
+
+from .cache_versions import QUERIES, SharedVersion
+from .config import QUERY_CACHE_MAX_ENTRIES, QUERY_CACHE_TTL
+from .db_pool import get_pool
+
+logger = logging.getLogger(__name__)
+
+
+class QueryCache:
+    """LRU cache of query results keyed by page and normalized parameters, with a TTL.
+
+    Entries are either about one item (tagged with its item_id) or aggregate over the catalog.
+    Writing prices for some items in this process drops their entries and every aggregate. Writes
+    from other processes are only known through the shared version, and drop everything.
+    """
+
+    def __init__(self, ttl: float = QUERY_CACHE_TTL, max_entries: int = QUERY_CACHE_MAX_ENTRIES,
+                 shared: Optional[SharedVersion] = None):
+        self.ttl = ttl
+        self.shared = shared
+        self.max_entries = max_entries
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries: "OrderedDict[str, Tuple[float, Optional[int], Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def make_key(namespace: str, params: Optional[Dict] = None) -> str:
+        """Parameters that are unset don't count, and their order doesn't matter"""
+        present = sorted((str(k), str(v)) for k, v in (params or {}).items() if v is not None)
+        return f"{namespace}?{urlencode(present)}" if present else namespace
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[2]
+
+    def set(self, key: str, value: Any, item_id: Optional[int] = None, version: Optional[int] = None):
+        """Store a result unless the cache was invalidated since version was read"""
+        with self._lock:
+            if version is not None and version != self.version:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, item_id, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    async def cached(self, namespace: str, params: Optional[Dict], load: Callable[[], Awaitable[Any]],
+                     item_id: Optional[int] = None) -> Any:
+        """Return the cached result, or await load() and cache what it returns"""
+        if self.shared is not None and self.shared.due():
+            await get_pool().run(self.sync)
+        key = self.make_key(namespace, params)
+        hit, value = self.get(key)
+        if hit:
+            return value
+        version = self.version
+        value = await load()
+        self.set(key, value, item_id, version)
+        return value
+
+    def invalidate(self, item_ids: Optional[Iterable[int]] = None):
+        """Drop everything, or the entries of the given items plus every aggregate entry"""
+        with self._lock:
+            self.version += 1
+            self.invalidations += 1
+            if item_ids is None:
+                self._entries.clear()
+                return
+            changed = set(item_ids)
+            for key in [key for key, (_, item_id, _) in self._entries.items()
+                        if item_id is None or item_id in changed]:
+                del self._entries[key]
+
+    def sync(self, conn):
+        """Drop everything if another process changed the data since the last check"""
+        if self.shared.changed(conn):
+            self.invalidate()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            stats = {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'invalidations': self.invalidations
+            }
+        if self.shared is not None:
+            stats['shared_version'] = self.shared.version
+        return stats
+
+
+_query_cache: Optional[QueryCache] = None
+
+
+def get_query_cache() -> QueryCache:
+    """Return the process-wide query result cache"""
+    global _query_cache
+    if _query_cache is None:
+        _query_cache = QueryCache(shared=SharedVersion(QUERIES))
+    return _query_cache
@@ -0,0 +1,170 @@
+import logging
+import re
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+EXPLAINABLE = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE', 'VALUES', 'TABLE')
+# price_history_2024_05 and its indexes (price_history_2024_05_item_id_timestamp_idx) -> price_history_*
+PARTITION_SUFFIX = re.compile(r'_\d{4}_\d{2}(?=_|$)')
+MAX_SQL_CHARS = 500
+LEADING_COMMENTS = re.compile(r'^(\s|--[^\n]*\n)*')
+
+
+class PlanCapture:
+    """Connection wrapper that runs EXPLAIN (ANALYZE, BUFFERS) on every statement before executing it.
+
+    Each plan is taken inside a savepoint that is rolled back, so writes are not applied twice;
+    the statement itself then runs normally and the caller sees its usual results. With
+    keep_writes=False, commit() rolls back instead so a scenario leaves the database unchanged.
+    """
+
+    def __init__(self, conn, keep_writes: bool = True):
+        self.conn = conn
+        self.keep_writes = keep_writes
+        self.scenario = 'default'
+        self.statements: List[Dict] = []
+
+    @contextmanager
+    def label(self, scenario: str):
+        previous, self.scenario = self.scenario, scenario
+        try:
+            yield self
+        finally:
+            self.scenario = previous
+
+    def cursor(self, *args, **kwargs):
+        return _CapturingCursor(self, self.conn.cursor(*args, **kwargs))
+
+    def commit(self):
+        if self.keep_writes:
+            self.conn.commit()
+        else:
+            self.conn.rollback()
+
+    def __getattr__(self, name):
+        return getattr(self.conn, name)
+
+    def explain(self, sql: str) -> Dict:
+        cur = self.conn.cursor()
+        try:
+            # Autocommit connections have no transaction to hold a savepoint in
+            wrap = self.conn.autocommit
+            cur.execute("BEGIN" if wrap else "SAVEPOINT plan_capture")
+            try:
+                cur.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}")
+                return cur.fetchone()[0][0]
+            finally:
+                cur.execute("ROLLBACK" if wrap else "ROLLBACK TO SAVEPOINT plan_capture")
+        finally:
+            cur.close()
+
+    def record(self, sql: str, plan: Optional[Dict], wall_ms: float):
+        index = sum(1 for statement in self.statements if statement['scenario'] == self.scenario)
+        entry = {'scenario': self.scenario, 'key': f"{self.scenario}#{index}", 'sql': ' '.join(sql.split())[:MAX_SQL_CHARS],
+                 'wall_ms': round(wall_ms, 3)}
+        if plan is not None:
+            entry.update(summarize_plan(plan))
+        self.statements.append(entry)
+
+
+class _CapturingCursor:
+    def __init__(self, capture: PlanCapture, cursor):
+        self._capture = capture
+        self._cursor = cursor
+
+    def execute(self, query, params=None):
+        sql = self._cursor.mogrify(query, params)
+        sql = sql.decode(self._cursor.connection.encoding) if isinstance(sql, bytes) else sql
+        statement = LEADING_COMMENTS.sub('', sql)
+        plan = self._capture.explain(sql) if statement.split(None, 1)[0].upper() in EXPLAINABLE else None
+        started = time.perf_counter()
+        try:
+            return self._cursor.execute(query, params)
+        finally:
+            self._capture.record(sql, plan, (time.perf_counter() - started) * 1000)
+
+    def copy_expert(self, sql, file, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return self._cursor.copy_expert(sql, file, *args, **kwargs)
+        finally:
+            self._capture.record(sql, None, (time.perf_counter() - started) * 1000)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+def _describe(node: Dict) -> str:
+    description = node['Node Type']
+    relation = node.get('Relation Name')
+    if relation:
+        description += f" on {PARTITION_SUFFIX.sub('_*', relation)}"
+    if node.get('Index Name'):
+        description += f" using {PARTITION_SUFFIX.sub('_*', node['Index Name'])}"
+    return description
+
+
+def _walk(node: Dict, depth: int = 0):
+    yield node, depth
+    for child in node.get('Plans', []):
+        yield from _walk(child, depth + 1)
+
+
+def summarize_plan(plan: Dict) -> Dict:
+    """Timings, buffer counts, a partition-agnostic shape and the sequential scans of an EXPLAIN JSON plan"""
+    shape: List[str] = []
+    seq_scans: Dict[str, int] = {}
+    for node, depth in _walk(plan['Plan']):
+        line = '  ' * depth + _describe(node)
+        # Appends over monthly partitions repeat one scan per partition; keep the shape stable
+        if not shape or shape[-1] != line:
+            shape.append(line)
+        if node['Node Type'] == 'Seq Scan':
+            loops = node.get('Actual Loops', 1)
+            scanned = (node.get('Actual Rows', 0) + node.get('Rows Removed by Filter', 0)) * loops
+            relation = PARTITION_SUFFIX.sub('', node.get('Relation Name', '?'))
+            seq_scans[relation] = seq_scans.get(relation, 0) + int(scanned)
+    top = plan['Plan']
+    return {
+        'execution_ms': round(plan.get('Execution Time', 0.0), 3),
+        'planning_ms': round(plan.get('Planning Time', 0.0), 3),
+        'rows': top.get('Actual Rows', 0),
+        'shared_hit_blocks': top.get('Shared Hit Blocks', 0),
+        'shared_read_blocks': top.get('Shared Read Blocks', 0),
+        'shape': shape,
+        'seq_scans': seq_scans,
+    }
+
+
+def find_plan_problems(statements: List[Dict], baseline: Optional[List[Dict]] = None,
+                       seq_scan_rows: int = 10000, threshold: float = 0.5, min_delta_ms: float = 5.0) -> List[str]:
+    """Flag large sequential scans and, against a baseline run, statements that got slower or changed plan.
+
+    A sequential scan already present in the baseline for the same statement is accepted.
+    Timing changes under min_delta_ms are ignored as noise.
+    """
+    previous = {statement['key']: statement for statement in (baseline or [])}
+    problems = []
+    for statement in statements:
+        if 'shape' not in statement:
+            continue
+        before = previous.get(statement['key'])
+        for relation, rows in statement['seq_scans'].items():
+            if rows >= seq_scan_rows and not (before and relation in before.get('seq_scans', {})):
+                problems.append(f"{statement['key']}: sequential scan of {relation} over {rows} rows")
+        if not before or 'shape' not in before:
+            continue
+        now, then = statement['execution_ms'], before['execution_ms']
+        if now - then > min_delta_ms and now > then * (1 + threshold):
+            problems.append(f"{statement['key']}: {then}ms -> {now}ms ({(now - then) / then:+.0%})" if then
+                            else f"{statement['key']}: {then}ms -> {now}ms")
+        if statement['shape'] != before['shape']:
+            problems.append(f"{statement['key']}: plan changed from [{'; '.join(line.strip() for line in before['shape'])}] "
+                            f"to [{'; '.join(line.strip() for line in statement['shape'])}]")
+    return problems
@@ -0,0 +1,148 @@
+import asyncio
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+from .config import RATE_LIMITS, DEFAULT_RATE_LIMIT
+
+logger = logging.getLogger(__name__)
+
+THROTTLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Convert a Retry-After header (seconds or HTTP date) into seconds"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class TokenBucket:
+    """Token bucket whose refill rate adapts to upstream throttling signals"""
+
+    def __init__(self, rate: float, capacity: float, min_rate: Optional[float] = None,
+                 max_backoff: float = 60.0):
+        self.max_rate = rate
+        self.min_rate = min_rate or rate / 16
+        self.rate = rate
+        self.capacity = capacity
+        self.max_backoff = max_backoff
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+        self._backoff = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Take one token and return how long the caller must wait before using it"""
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self.blocked_until)
+            if start > self.updated_at:
+                self.tokens = min(self.capacity, self.tokens + (start - self.updated_at) * self.rate)
+                self.updated_at = start
+            self.tokens -= 1
+            deficit = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            return max(0.0, self.updated_at - now) + deficit
+
+    def _remaining_block(self) -> float:
+        return max(0.0, self.blocked_until - time.monotonic())
+
+    async def acquire(self):
+        """Wait for a token without blocking the event loop"""
+        wait = self._reserve()
+        while wait > 0:
+            await asyncio.sleep(wait)
+            wait = self._remaining_block()
+
+    def acquire_sync(self):
+        """Wait for a token, blocking the calling thread"""
+        wait = self._reserve()
+        while wait > 0:
+            time.sleep(wait)
+            wait = self._remaining_block()
+
+    def on_success(self):
+        """Additively creep back towards the configured rate"""
+        with self._lock:
+            self._backoff = 0.0
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+    def on_throttle(self, retry_after: Optional[float] = None):
+        """Halve the rate and pause the bucket after a 429/5xx"""
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._backoff = min(self.max_backoff, self._backoff * 2 if self._backoff else 1.0)
+            delay = retry_after if retry_after is not None else self._backoff
+            self.blocked_until = max(self.blocked_until, time.monotonic() + delay)
+            self.tokens = min(self.tokens, 0.0)
+            return delay
+
+
+class RateLimiter:
+    """Per-host token buckets shared by every scraper in the process"""
+
+    def __init__(self, limits: Optional[Dict[str, Tuple[float, float]]] = None,
+                 default: Tuple[float, float] = DEFAULT_RATE_LIMIT):
+        self.limits = dict(RATE_LIMITS if limits is None else limits)
+        self.default = default
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, host: str, rate: float, capacity: float):
+        """Override the limit for a host, replacing any existing bucket"""
+        with self._lock:
+            self.limits[host] = (rate, capacity)
+            self._buckets.pop(host, None)
+
+    def bucket_for(self, url: str) -> TokenBucket:
+        host = urlparse(url).netloc or url
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                rate, capacity = self.limits.get(host, self.default)
+                bucket = TokenBucket(rate, capacity)
+                self._buckets[host] = bucket
+            return bucket
+
+    async def acquire(self, url: str):
+        await self.bucket_for(url).acquire()
+
+    def acquire_sync(self, url: str):
+        self.bucket_for(url).acquire_sync()
+
+    def record_response(self, url: str, status: int, retry_after: Optional[str] = None) -> bool:
+        """Feed a response status back into the host's bucket; returns True if throttled"""
+        bucket = self.bucket_for(url)
+        if status in THROTTLE_STATUSES:
+            delay = bucket.on_throttle(parse_retry_after(retry_after))
+            logger.warning(f"{urlparse(url).netloc} returned {status}, "
+                           f"backing off {delay:.1f}s at {bucket.rate:.2f} req/s")
+            return True
+        bucket.on_success()
+        return False
+
+
+_rate_limiter: Optional[RateLimiter] = None
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Return the process-wide rate limiter"""
+    global _rate_limiter
+    if _rate_limiter is None:
+        _rate_limiter = RateLimiter()
+    return _rate_limiter
@@ -0,0 +1,134 @@
+import heapq
+import logging
+import math
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from psycopg2.extras import RealDictCursor
+
+logger = logging.getLogger(__name__)
+
+
+class RefreshScheduler:
+    """Heap of items ordered by when their price is next worth refreshing"""
+
+    def __init__(self, min_interval: float = 300, max_interval: float = 6 * 3600,
+                 lookback_hours: int = 24, target_volatility: float = 0.05,
+                 liquid_volume: int = 1000, retry_delay: float = 60):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.lookback_hours = lookback_hours
+        self.target_volatility = target_volatility
+        self.liquid_volume = liquid_volume
+        self.retry_delay = retry_delay
+        self._heap: List[Tuple[float, int]] = []
+        self._due: Dict[int, float] = {}
+        self._items: Dict[int, Dict] = {}
+        self._failures: Dict[int, int] = {}
+
+    def __len__(self):
+        return len(self._due)
+
+    def refresh_interval(self, volatility: Optional[float], volume: Optional[int]) -> float:
+        """Seconds until an item should be re-priced; volatile, liquid items come back sooner"""
+        volatility_score = min(1.0, (volatility or 0.0) / self.target_volatility)
+        liquidity_score = min(1.0, math.log1p(volume or 0) / math.log1p(self.liquid_volume))
+        priority = 0.7 * volatility_score + 0.3 * liquidity_score
+        return self.max_interval * (self.min_interval / self.max_interval) ** priority
+
+    def load(self, conn, now: Optional[float] = None):
+        """Schedule every tracked item from its recent price movement, volume and last refresh"""
+        self._load(conn, None, time.time() if now is None else now, attempted=False)
+
+    def reschedule(self, conn, item_ids: Iterable[int], now: Optional[float] = None):
+        """Push refreshed items back one interval from now, using their updated statistics"""
+        self._load(conn, list(item_ids), time.time() if now is None else now, attempted=True)
+
+    def retry(self, items: Iterable[Dict], now: Optional[float] = None):
+        """Keep items whose refresh failed due, doubling retry_delay per consecutive failure up to max_interval"""
+        now = time.time() if now is None else now
+        for item in items:
+            failures = self._failures.get(item['item_id'], 0) + 1
+            self._failures[item['item_id']] = failures
+            due_at = now + min(self.retry_delay * 2 ** (failures - 1), self.max_interval)
+            self._items[item['item_id']] = item
+            self._due[item['item_id']] = due_at
+            heapq.heappush(self._heap, (due_at, item['item_id']))
+
+    def _load(self, conn, item_ids: Optional[List[int]], now: float, attempted: bool):
+        query = """
+            SELECT
+                i.item_id,
+                i.market_hash_name,
+                i.volume,
+                s.volatility,
+                EXTRACT(EPOCH FROM s.last_refreshed) AS last_refreshed
+            FROM items i
+            LEFT JOIN (
+                SELECT
+                    item_id,
+                    STDDEV_SAMP(price) / NULLIF(AVG(price), 0) AS volatility,
+                    MAX(timestamp) AS last_refreshed
+                FROM price_history
+                WHERE source = 'buff'
+                AND timestamp >= NOW() - %s * INTERVAL '1 hour'
+                GROUP BY item_id
+            ) s ON i.item_id = s.item_id
+        """
+        params = [self.lookback_hours]
+        if item_ids is not None:
+            query += " WHERE i.item_id = ANY(%s)"
+            params.append(item_ids)
+
+        cur = conn.cursor(cursor_factory=RealDictCursor)
+        try:
+            cur.execute(query, params)
+            rows = cur.fetchall()
+        finally:
+            cur.close()
+
+        for row in rows:
+            self.schedule(row, now, attempted)
+        logger.info(f"Scheduled {len(rows)} items, {len(self._due)} tracked")
+
+    def schedule(self, item: Dict, now: float, attempted: bool = False):
+        """Push an item one interval after its last refresh (or attempt); unpriced items are due now"""
+        interval = self.refresh_interval(item.get('volatility'), item.get('volume'))
+        last_refreshed = item.get('last_refreshed')
+        if attempted:
+            self._failures.pop(item['item_id'], None)
+            due_at = now + interval
+        elif last_refreshed is None:
+            due_at = now
+        else:
+            due_at = min(float(last_refreshed) + interval, now + interval)
+        self._items[item['item_id']] = {
+            'item_id': item['item_id'],
+            'market_hash_name': item['market_hash_name']
+        }
+        self._due[item['item_id']] = due_at
+        heapq.heappush(self._heap, (due_at, item['item_id']))
+
+    def pop_due(self, limit: int, now: Optional[float] = None) -> List[Dict]:
+        """Take up to limit items whose refresh is due, most overdue first"""
+        now = time.time() if now is None else now
+        batch = []
+        while self._heap and len(batch) < limit:
+            due_at, item_id = self._heap[0]
+            if due_at > now:
+                break
+            heapq.heappop(self._heap)
+            if self._due.get(item_id) != due_at:
+                continue
+            del self._due[item_id]
+            batch.append(self._items[item_id])
+        return batch
+
+    def next_due_in(self, now: Optional[float] = None) -> Optional[float]:
+        """Seconds until the earliest scheduled refresh"""
+        now = time.time() if now is None else now
+        while self._heap and self._due.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        if not self._heap:
+            return None
+        return max(0.0, self._heap[0][0] - now)
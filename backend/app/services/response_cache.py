@@ -0,0 +1,128 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlencode
+
+from .config import CACHE_TTLS, DEFAULT_CACHE_TTL
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """LRU cache of decoded upstream responses with per-endpoint TTLs, persisted to disk"""
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = 50000,
+                 ttls: Optional[Dict[str, float]] = None, default_ttl: float = DEFAULT_CACHE_TTL):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttls = CACHE_TTLS if ttls is None else ttls
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._dirty = False
+        self._lock = threading.Lock()
+        if self.path:
+            self.load()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def make_key(url: str, params: Optional[Dict] = None) -> str:
+        if not params:
+            return url
+        return f"{url}?{urlencode(sorted((str(k), str(v)) for k, v in params.items()))}"
+
+    def ttl_for(self, url: str) -> float:
+        """TTL of the longest configured endpoint prefix matching the URL"""
+        matches = [prefix for prefix in self.ttls if url.startswith(prefix)]
+        if not matches:
+            return self.default_ttl
+        return self.ttls[max(matches, key=len)]
+
+    def get(self, url: str, params: Optional[Dict] = None) -> Optional[Any]:
+        key = self.make_key(url, params)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, payload = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                self._dirty = True
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return payload
+
+    def set(self, url: str, params: Optional[Dict], payload: Any):
+        ttl = self.ttl_for(url)
+        if ttl <= 0:
+            return
+        key = self.make_key(url, params)
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._dirty = True
+
+    def load(self):
+        """Load unexpired entries, oldest first so LRU order survives restarts"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                rows = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable response cache {self.path}: {e}")
+            return
+        if not isinstance(rows, list):
+            return
+
+        now = time.time()
+        with self._lock:
+            for key, expires_at, payload in rows[-self.max_entries:]:
+                if expires_at > now:
+                    self._entries[key] = (expires_at, payload)
+        logger.info(f"Loaded {len(self._entries)} cached responses from {self.path}")
+
+    def save(self):
+        """Write the cache to disk if it changed since the last save"""
+        if not self.path or not self._dirty:
+            return
+        now = time.time()
+        with self._lock:
+            rows = [[key, expires_at, payload] for key, (expires_at, payload) in self._entries.items()
+                    if expires_at > now]
+            self._dirty = False
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(rows, f, separators=(',', ':'), ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.error(f"Failed to save response cache to {self.path}: {e}")
+
+
+_response_cache: Optional[ResponseCache] = None
+
+
+def get_response_cache() -> ResponseCache:
+    """Return the process-wide scraper response cache, saved again at exit"""
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = ResponseCache(
+            path=os.getenv('SCRAPER_CACHE_PATH', 'scraper_cache.json') or None,
+            max_entries=int(os.getenv('SCRAPER_CACHE_MAX_ENTRIES', '50000'))
+        )
+        atexit.register(_response_cache.save)
+    return _response_cache
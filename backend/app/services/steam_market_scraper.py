@@ -1,17 +1,73 @@
 import requests
 import json
+import os
 import time
+import asyncio
+import logging
+import re
+import aiohttp
 from typing import Dict, List, Optional
 
+from .rate_limiter import TokenBucket, get_rate_limiter
+from .response_cache import get_response_cache
+from .http_recorder import get_http_recorder
+
+logger = logging.getLogger(__name__)
+
+
+def parse_price(value: Optional[str]) -> Optional[float]:
+    """Turn a formatted Steam price such as '$1,234.56' or '1.234,56€' into a float"""
+    if not value:
+        return None
+    digits = re.sub(r'[^\d.,]', '', value)
+    if not digits:
+        return None
+    if ',' in digits and (digits.rfind(',') > digits.rfind('.')):
+        digits = digits.replace('.', '').replace(',', '.')
+    else:
+        digits = digits.replace(',', '')
+    try:
+        return float(digits)
+    except ValueError:
+        return None
+
+
+def parse_volume(value: Optional[str]) -> Optional[int]:
+    """Turn a Steam volume string such as '1,234' into an int"""
+    if not value:
+        return None
+    digits = re.sub(r'\D', '', str(value))
+    return int(digits) if digits else None
+
+
+def steam_base_url() -> str:
+    return os.getenv('STEAM_BASE_URL', 'https://steamcommunity.com').rstrip('/')
+
+
+def price_result(market_hash_name: str, data: Dict) -> Dict:
+    """Shape a successful priceoverview payload the way both clients return it"""
+    return {
+        'item_name': market_hash_name,
+        'success': True,
+        'lowest_price': data.get('lowest_price'),
+        'volume': data.get('volume'),
+        'median_price': data.get('median_price'),
+        'raw_data': data
+    }
+
 
 class SteamMarketPrices:
-    def __init__(self, rate_limit_delay: float = 1.0, country: str = "US", currency: int = 1):
-        self.price_url = "https://steamcommunity.com/market/priceoverview/"
-        self.search_url = "https://steamcommunity.com/market/search/render/"
-        self.rate_limit_delay = rate_limit_delay
+    def __init__(self, rate_limit_delay: Optional[float] = None, country: str = "US", currency: int = 1):
+        self.price_url = f"{steam_base_url()}/market/priceoverview/"
+        self.search_url = f"{steam_base_url()}/market/search/render/"
         self.country = country
         self.currency = currency
-        self.last_request_time = 0
+
+        self.rate_limiter = get_rate_limiter()
+        self.cache = get_response_cache()
+        self.recorder = get_http_recorder()
+        # Extra pacing for this client only; the shared per-host limit still applies on top
+        self.pacer = TokenBucket(1 / rate_limit_delay, 1) if rate_limit_delay else None
 
         self.session = requests.Session()
         self.session.headers.update({
@@ -23,13 +79,9 @@ class SteamMarketPrices:
         })
 
     def _wait_for_rate_limit(self):
-        if self.rate_limit_delay > 0:
-            time_since_last = time.time() - self.last_request_time
-            if time_since_last < self.rate_limit_delay:
-                wait_time = self.rate_limit_delay - time_since_last
-                print(f"Rate limiting: waiting {wait_time:.1f} seconds...")
-                time.sleep(wait_time)
-        self.last_request_time = time.time()
+        if self.pacer:
+            self.pacer.acquire_sync()
+        self.rate_limiter.acquire_sync(self.price_url)
 
     def get_item_price(self, market_hash_name: str, appid: int = 730) -> Optional[Dict]:
         """
@@ -42,8 +94,6 @@ class SteamMarketPrices:
         Returns:
             Dict with price data or None if failed
         """
-        self._wait_for_rate_limit()
-
         params = {
             'country': self.country,
             'currency': self.currency,
@@ -51,38 +101,44 @@ class SteamMarketPrices:
             'market_hash_name': market_hash_name
         }
 
+        cached = self.cache.get(self.price_url, params)
+        if cached is not None:
+            return price_result(market_hash_name, cached)
+
+        self._wait_for_rate_limit()
+
         try:
-            print(f"Fetching price for: {market_hash_name}")
+            logger.debug(f"Fetching Steam price for {market_hash_name}")
+            started = time.perf_counter()
             response = self.session.get(self.price_url, params = params)
+            if self.recorder:
+                self.recorder.record('GET', self.price_url, params, response.status_code, response.text,
+                                     {'Retry-After': response.headers.get('Retry-After')},
+                                     time.perf_counter() - started)
+            self.rate_limiter.record_response(
+                self.price_url, response.status_code, response.headers.get('Retry-After')
+            )
 
-            print(f"Status: {response.status_code}")
-            print(f"URL: {response.url}")
+            logger.debug(f"Steam HTTP {response.status_code} for {response.url}")
 
             if response.status_code == 200:
                 data = response.json()
-                print(f"Response: {json.dumps(data, indent = 2)}")
+                logger.debug(f"Steam response for {market_hash_name}: {json.dumps(data)}")
 
                 if data.get('success'):
-                    return {
-                        'item_name': market_hash_name,
-                        'success': True,
-                        'lowest_price': data.get('lowest_price'),
-                        'volume': data.get('volume'),
-                        'median_price': data.get('median_price'),
-                        'raw_data': data
-                    }
+                    self.cache.set(self.price_url, params, data)
+                    return price_result(market_hash_name, data)
                 else:
-                    print(f"Steam returned success=false: {data}")
+                    logger.warning(f"Steam returned success=false for {market_hash_name}: {data}")
             else:
-                print(f"HTTP Error {response.status_code}: {response.text[:500]}")
+                logger.warning(f"Steam HTTP {response.status_code} for {market_hash_name}: {response.text[:500]}")
 
         except requests.exceptions.RequestException as e:
-            print(f"Request failed: {e}")
+            logger.error(f"Steam request failed for {market_hash_name}: {e}")
         except json.JSONDecodeError as e:
-            print(f"JSON parsing failed: {e}")
-            print(f"Raw response: {response.text[:500]}")
+            logger.error(f"Invalid JSON from Steam for {market_hash_name}: {e}; raw response: {response.text[:500]}")
         except Exception as e:
-            print(f"Unexpected error: {e}")
+            logger.error(f"Unexpected error getting Steam price for {market_hash_name}: {e}")
 
         return None
 
@@ -127,6 +183,115 @@ class SteamMarketPrices:
                 print("✗ FAILED")
 
 
+class AsyncSteamMarketPrices:
+    """Async priceoverview client with a pooled keep-alive session"""
+
+    def __init__(self, country: str = "US", currency: int = 1, max_connections: int = 10,
+                 max_retries: int = 3):
+        self.price_url = f"{steam_base_url()}/market/priceoverview/"
+        self.country = country
+        self.currency = currency
+        self.max_connections = max_connections
+        self.max_retries = max_retries
+        self.rate_limiter = get_rate_limiter()
+        self.cache = get_response_cache()
+        self.recorder = get_http_recorder()
+        self.headers = {
+            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+            "Accept": "application/json, text/javascript, */*; q=0.01",
+            "Accept-Language": "en-US,en;q=0.9",
+            "Referer": "https://steamcommunity.com/market/",
+            "X-Requested-With": "XMLHttpRequest",
+        }
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def __aenter__(self):
+        await self._get_session()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                keepalive_timeout=60,
+                ttl_dns_cache=300
+            )
+            self._session = aiohttp.ClientSession(
+                headers=self.headers,
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=30)
+            )
+        return self._session
+
+    async def close(self):
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self.cache.save()
+
+    async def get_item_price(self, market_hash_name: str, appid: int = 730) -> Optional[Dict]:
+        """Async counterpart of SteamMarketPrices.get_item_price, returning the same shape"""
+        params = {
+            'country': self.country,
+            'currency': self.currency,
+            'appid': appid,
+            'market_hash_name': market_hash_name
+        }
+        cached = self.cache.get(self.price_url, params)
+        if cached is not None:
+            return price_result(market_hash_name, cached)
+
+        session = await self._get_session()
+
+        for attempt in range(self.max_retries + 1):
+            await self.rate_limiter.acquire(self.price_url)
+            try:
+                started = time.perf_counter()
+                async with session.get(self.price_url, params=params) as response:
+                    body = await response.text()
+                    retry_after = response.headers.get('Retry-After')
+                    if self.recorder:
+                        self.recorder.record('GET', self.price_url, params, response.status, body,
+                                             {'Retry-After': retry_after}, time.perf_counter() - started)
+                    throttled = self.rate_limiter.record_response(self.price_url, response.status, retry_after)
+                    if throttled:
+                        continue
+                    if response.status != 200:
+                        logger.warning(f"Steam HTTP {response.status} for {market_hash_name}")
+                        return None
+                    data = json.loads(body)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.error(f"Steam request failed for {market_hash_name}: {e}")
+                return None
+            except ValueError as e:
+                logger.error(f"Invalid JSON from Steam for {market_hash_name}: {e}")
+                return None
+
+            if not data or not data.get('success'):
+                logger.warning(f"Steam returned success=false for {market_hash_name}")
+                return None
+            self.cache.set(self.price_url, params, data)
+            return price_result(market_hash_name, data)
+
+        logger.error(f"Giving up on Steam price for {market_hash_name} after {self.max_retries} retries")
+        return None
+
+    async def get_multiple_prices(self, item_names: List[str], appid: int = 730,
+                                  concurrency: int = 4) -> Dict[str, Optional[Dict]]:
+        """Get prices for multiple items concurrently"""
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch(item_name: str) -> Optional[Dict]:
+            async with semaphore:
+                return await self.get_item_price(item_name, appid)
+
+        prices = await asyncio.gather(*(fetch(item_name) for item_name in item_names))
+        return dict(zip(item_names, prices))
+
+
 def test_manual_urls():
     """Test by manually constructing known working URLs"""
 
@@ -0,0 +1,149 @@
+import sys
+import os
+from contextlib import contextmanager
+from datetime import date, datetime
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.services import catalog_cache, query_cache
+
+
+def _literal(value) -> str:
+    if value is None:
+        return 'NULL'
+    if isinstance(value, (str, date, datetime)):
+        return f"'{value.isoformat() if isinstance(value, (date, datetime)) else value}'"
+    return str(value)
+
+
+class FakeCursor:
+    """Cursor of a FakeConnection; every statement is recorded and answered by the connection"""
+
+    def __init__(self, connection, name=None):
+        self.connection = connection
+        self.name = name
+        self.rows = []
+        self.rowcount = -1
+
+    def execute(self, query, params=None):
+        sql = ' '.join((query.decode() if isinstance(query, bytes) else query).split())
+        self.connection.executed.append((sql, params))
+        self.rows = list(self.connection.respond(sql, params))
+        self.rowcount = len(self.rows)
+
+    def mogrify(self, query, params=None):
+        return (query % tuple(_literal(param) for param in params) if params else query).encode()
+
+    def copy_expert(self, sql, file, *args, **kwargs):
+        sql = ' '.join((sql.decode() if isinstance(sql, bytes) else sql).split())
+        self.connection.executed.append((sql, None))
+        for chunk in self.connection.respond(sql, None):
+            file.write(chunk.encode())
+
+    def fetchone(self):
+        return self.rows.pop(0) if self.rows else None
+
+    def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+    def fetchmany(self, size):
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return rows
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def close(self):
+        self.connection.closed_cursors.append(self.name)
+
+
+class FakeConnection:
+    """psycopg2-style connection that answers statements from canned responses.
+
+    responses maps a fragment of the (whitespace-collapsed) SQL to what the first statement
+    containing it returns: a list of rows, a callable taking (sql, params) and returning rows,
+    or an exception to raise. Statements matching nothing return no rows. cache_versions is
+    simulated, so bump_cache_versions and SharedVersion work on any fake connection.
+    """
+    encoding = 'UTF8'
+
+    def __init__(self, responses=None, autocommit=False):
+        self.responses = dict(responses or {})
+        self.autocommit = autocommit
+        self.executed = []
+        self.closed_cursors = []
+        self.versions = {}
+        self.commits = 0
+        self.rollbacks = 0
+        self.closed = 0
+
+    def cursor(self, name=None, cursor_factory=None, **kwargs):
+        return FakeCursor(self, name)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = 1
+
+    def respond(self, sql, params):
+        for fragment, response in self.responses.items():
+            if fragment in sql:
+                if isinstance(response, Exception):
+                    raise response
+                return (response(sql, params) if callable(response) else response) or []
+        if 'cache_versions' in sql:
+            return self._cache_versions(sql, params)
+        return []
+
+    def _cache_versions(self, sql, params):
+        if sql.startswith('INSERT'):
+            for name in params[0]:
+                self.versions[name] = self.versions.get(name, 0) + 1
+            return []
+        return [(self.versions[params[0]],)] if params[0] in self.versions else []
+
+    def statements(self, fragment=''):
+        """SQL of the executed statements containing fragment, in order"""
+        return [sql for sql, _ in self.executed if fragment in sql]
+
+
+class FakePool:
+    """DatabasePool stand-in handing out one connection, or a new one from connect() per checkout"""
+
+    def __init__(self, conn=None, connect=None):
+        self.conn = conn
+        self.connect = connect
+
+    @contextmanager
+    def connection(self):
+        yield self.connect() if self.connect else self.conn
+
+    async def run(self, func, *args, **kwargs):
+        with self.connection() as conn:
+            return func(conn, *args, **kwargs)
+
+
+@pytest.fixture
+def fake_conn():
+    """FakeConnection factory: fake_conn({'FROM items': rows}, autocommit=False)"""
+    return FakeConnection
+
+
+@pytest.fixture
+def fake_pool():
+    """FakePool factory: fake_pool(conn) or fake_pool(connect=factory)"""
+    return FakePool
+
+
+@pytest.fixture(autouse=True)
+def fresh_caches(monkeypatch):
+    """Give each test empty process-wide caches that don't read cache_versions from its fake connections"""
+    monkeypatch.setattr(catalog_cache, '_catalog_cache', catalog_cache.CatalogCache())
+    monkeypatch.setattr(query_cache, '_query_cache', query_cache.QueryCache())
@@ -0,0 +1,47 @@
+import sys
+import os
+import json
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.services.analytics_snapshots import refresh_snapshot
+
+def snapshot_db(fake_conn, lock_free=True, last_computed=None):
+    """Snapshot tables answering like a database whose newest snapshot is number 30"""
+    stored, pruned = [], []
+    conn = fake_conn({
+        'pg_try_advisory_xact_lock': [(lock_free,)],
+        'MAX(computed_at)': [(last_computed,)],
+        'INSERT INTO analytics_snapshots': lambda sql, params: stored.append(params) or [(30,)],
+        'DELETE FROM analytics_snapshots': lambda sql, params: pruned.append(params[0]),
+        '(SELECT COUNT(*) FROM items)': [{'total_items': 3, 'total_price_points': 40, 'overall_avg_price': 12.5}],
+        'LIMIT 10': [{'market_hash_name': 'AWP | Asiimov (Field-Tested)', 'avg_price': 90.0,
+                      'min_price': 80.0, 'max_price': 99.0, 'data_points': 12}],
+        'price_changes': [{'market_hash_name': 'AWP | Asiimov (Field-Tested)', 'price_change': Decimal('4.5')}],
+    })
+    return conn, stored, pruned
+
+def test_refresh_stores_a_versioned_snapshot_and_prunes_old_ones(fake_conn):
+    conn, stored, pruned = snapshot_db(fake_conn, last_computed=datetime.now(timezone.utc) - timedelta(hours=1))
+    assert refresh_snapshot(conn, min_interval=300, keep=24) == 30
+    assert conn.commits == 1
+    assert pruned == [6]
+
+    insert, = stored
+    data = json.loads(insert[1].dumps(insert[1].adapted))
+    assert data['market_stats']['total_items'] == 3
+    assert data['top_items'][0]['data_points'] == 12
+    assert data['trending_items'][0]['price_change'] == 4.5
+
+def test_refresh_skips_a_fresh_snapshot(fake_conn):
+    conn, stored, pruned = snapshot_db(fake_conn, last_computed=datetime.now(timezone.utc) - timedelta(seconds=30))
+    assert refresh_snapshot(conn, min_interval=300) is None
+    assert (conn.commits, conn.rollbacks) == (0, 1)
+    assert (stored, pruned) == ([], [])
+
+def test_refresh_skips_while_another_process_computes(fake_conn):
+    conn, stored, pruned = snapshot_db(fake_conn, lock_free=False)
+    assert refresh_snapshot(conn, min_interval=0) is None
+    assert len(conn.executed) == 1
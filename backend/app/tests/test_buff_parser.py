@@ -0,0 +1,203 @@
+import sys
+import os
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))), 'scripts'))
+
+from aiohttp.test_utils import TestServer
+from mock_market_server import BUFF_GOODS_PATH, MockMarket, request_key
+from app.services import buff_parser
+from app.services.buff_parser import BuffParser
+from app.services.price_collector import PriceCollector
+from app.services.rate_limiter import RateLimiter
+from app.services.response_cache import ResponseCache
+
+def make_page(page_num, total_page, names):
+    return {
+        'code': 'OK',
+        'data': {
+            'page_num': page_num,
+            'total_page': total_page,
+            'items': [
+                {'market_hash_name': name, 'sell_min_price': '12.5', 'sell_num': 40,
+                 'goods_info': {'steam_price_cny': '20.1'}}
+                for name in names
+            ]
+        }
+    }
+
+@pytest.mark.asyncio
+async def test_crawl_market_builds_name_map_from_every_page():
+    pages = {
+        1: make_page(1, 3, ['AK-47 | Redline (Field-Tested)']),
+        2: make_page(2, 3, ['AWP | Asiimov (Field-Tested)']),
+        3: make_page(3, 3, ['Revolution Case']),
+    }
+    requested = []
+
+    async def fake_request(url, params):
+        requested.append(params['page_num'])
+        return pages[params['page_num']]
+
+    parser = BuffParser()
+    parser._make_request = fake_request
+    market = await parser.crawl_market()
+
+    assert sorted(requested) == [1, 2, 3]
+    assert set(market) == {'AK-47 | Redline (Field-Tested)', 'AWP | Asiimov (Field-Tested)', 'Revolution Case'}
+    assert market['Revolution Case'] == {'sell_min_price': 12.5, 'sell_num': 40, 'steam_price_cny': 20.1}
+
+@pytest.mark.asyncio
+async def test_get_item_price_ignores_fuzzy_search_hits():
+    async def fake_request(url, params):
+        response = make_page(1, 1, ['StatTrak™ AK-47 | Redline (Field-Tested)', 'AK-47 | Redline (Field-Tested)'])
+        response['data']['items'][0]['sell_min_price'] = '99'
+        return response
+
+    parser = BuffParser()
+    parser._make_request = fake_request
+    assert await parser.get_item_price('AK-47 | Redline (Field-Tested)') == 12.5
+    assert await parser.get_item_price('AK-47 | Redline (Minimal Wear)') is None
+
+def test_merge_goods_page_skips_rows_with_malformed_prices():
+    page = make_page(1, 1, ['Good', 'Bad steam price', 'Null sell price', 'Unparseable sell price', 'No sell price'])['data']
+    items = page['items']
+    items[1]['goods_info']['steam_price_cny'] = {'amount': '20.1'}
+    items[2]['sell_min_price'] = None
+    items[3]['sell_min_price'] = 'n/a'
+    del items[4]['sell_min_price']
+
+    market = {}
+    BuffParser()._merge_goods_page(market, page)
+
+    assert list(market) == ['Good']
+
+REDLINE = 'AK-47 | Redline (Field-Tested)'
+
+class CountingMarket(MockMarket):
+    """Mock market that records the most requests it served at once"""
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.in_flight = 0
+        self.peak = 0
+
+    async def handle(self, request):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            return await super().handle(request)
+        finally:
+            self.in_flight -= 1
+
+class SavingCache(ResponseCache):
+    def __init__(self):
+        super().__init__()
+        self.saves = 0
+
+    def save(self):
+        self.saves += 1
+
+@asynccontextmanager
+async def serving(market):
+    """Serve the mock market on a local port and yield its Buff goods URL"""
+    server = TestServer(market.create_app())
+    await server.start_server()
+    try:
+        yield str(server.make_url(BUFF_GOODS_PATH))
+    finally:
+        await server.close()
+
+def use_market(parser, url):
+    parser.base_url = url
+    parser.rate_limiter = RateLimiter(limits={}, default=(1000, 1000))
+    parser.cache = SavingCache()
+
+def search_key(name):
+    return request_key(BUFF_GOODS_PATH, {'game': 'csgo', 'page_num': 1, 'search': name})
+
+def test_make_request_retries_throttled_responses():
+    throttled = {'status': 429, 'body': '{"error": "slow down"}', 'headers': {'Retry-After': '0.01'}}
+    unavailable = {'status': 503, 'body': '{"error": "busy"}', 'headers': {'Retry-After': '0.01'}}
+    ok = {'status': 200, 'body': make_page(1, 1, [REDLINE]), 'headers': {}}
+    market = MockMarket(recordings={search_key(REDLINE): [throttled, unavailable, ok]})
+
+    async def run():
+        parser = BuffParser()
+        async with serving(market) as url:
+            use_market(parser, url)
+            price = await parser.get_item_price(REDLINE)
+            await parser.close()
+        return parser, price
+
+    parser, price = asyncio.run(run())
+    assert price == 12.5
+    assert market.stats['requests'] == 3
+    assert parser.rate_limiter.bucket_for(parser.base_url).rate < 1000
+
+def test_make_request_gives_up_after_max_retries():
+    market = MockMarket(throttle_rate=1, retry_after=0.01)
+
+    async def run():
+        parser = BuffParser(max_retries=2)
+        async with serving(market) as url:
+            use_market(parser, url)
+            price = await parser.get_item_price(REDLINE)
+            await parser.close()
+        return price
+
+    assert asyncio.run(run()) is None
+    assert market.stats['requests'] == 3
+    assert market.stats['throttled'] == 3
+
+def test_collect_buff_prices_fans_out_within_the_concurrency_limit():
+    names = [f'Sticker | Test {n}' for n in range(12)]
+    market = CountingMarket(latency_ms=20, seed=1)
+
+    async def run():
+        collector = PriceCollector(concurrency=3, mode='search')
+        async with serving(market) as url:
+            use_market(collector.buff_parser, url)
+            items = [{'item_id': n, 'market_hash_name': name} for n, name in enumerate(names)]
+            ticks = [tick async for tick in collector.collect_buff_prices(items)]
+            await collector.close()
+        return ticks
+
+    ticks = asyncio.run(run())
+    assert sorted(tick['item_id'] for tick in ticks) == list(range(12))
+    assert all(tick['source'] == 'buff' and tick['price'] > 0 for tick in ticks)
+    assert market.peak == 3
+
+def test_update_prices_closes_the_session_and_saves_the_cache(monkeypatch, fake_conn):
+    written = []
+
+    class FakeWriter:
+        def __init__(self, conn):
+            pass
+
+        def add(self, item_id, price):
+            written.append((item_id, price))
+
+        def flush(self):
+            pass
+
+    conn = fake_conn({'FROM items': [(1, REDLINE)]})
+    monkeypatch.setattr(buff_parser, 'PriceWriter', FakeWriter)
+    market = MockMarket(recordings={search_key(REDLINE): [{'status': 200, 'body': make_page(1, 1, [REDLINE])}]})
+
+    async def run():
+        parser = BuffParser()
+        parser.connect_db = lambda: conn
+        async with serving(market) as url:
+            use_market(parser, url)
+            await parser.update_prices()
+        return parser
+
+    parser = asyncio.run(run())
+    assert written == [(1, 12.5)]
+    assert conn.closed
+    assert parser._session is None
+    assert parser.cache.saves == 1
@@ -0,0 +1,36 @@
+import sys
+import os
+from datetime import datetime, timezone
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.services.candles import aggregate_candles, bucket_start
+
+def ts(hour, minute):
+    return datetime(2024, 5, 1, hour, minute, tzinfo=timezone.utc)
+
+def test_bucket_start_truncates_in_utc():
+    assert bucket_start(ts(13, 45), 'hourly') == ts(13, 0)
+    assert bucket_start(ts(13, 45), 'daily') == ts(0, 0)
+
+def test_ticks_fold_into_ohlc_by_tick_time_not_arrival_order():
+    rows = [
+        (1, 10.0, 5, 'buff', ts(13, 30)),
+        (1, 12.0, 6, 'buff', ts(13, 50)),
+        (1, 8.0, 4, 'buff', ts(13, 5)),    # arrives late but opens the hour
+        (1, 9.0, None, 'buff', ts(14, 1)),
+        (1, 1.5, 100, 'steam', ts(13, 10)),
+    ]
+    hourly = aggregate_candles(rows, 'hourly')
+
+    open_, high, low, close, open_at, close_at, price_sum, count, volume = hourly[(1, 'buff', ts(13, 0))]
+    assert (open_, high, low, close) == (8.0, 12.0, 8.0, 12.0)
+    assert (open_at, close_at) == (ts(13, 5), ts(13, 50))
+    assert (price_sum, count, volume) == (30.0, 3, 6)
+    assert hourly[(1, 'buff', ts(14, 0))][8] is None
+    assert (1, 'steam', ts(13, 0)) in hourly
+
+    daily = aggregate_candles(rows, 'daily')
+    candle = daily[(1, 'buff', ts(0, 0))]
+    assert (candle[0], candle[3], candle[7]) == (8.0, 9.0, 4)
+    assert candle[8] == 6  # closing tick has no volume, so the last reported one is kept
@@ -0,0 +1,105 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.services.cache_versions import CATALOG, SharedVersion, bump_cache_versions
+from app.services.catalog_cache import CatalogCache
+
+def item(item_id, weapon_type, wear):
+    return {'item_id': item_id, 'market_hash_name': f"{weapon_type} | Skin {item_id}",
+            'weapon_type': weapon_type, 'wear': wear}
+
+class CatalogDB:
+    """items table behind a fake connection, counting catalog loads and single-item lookups"""
+
+    def __init__(self, fake_conn, items):
+        self.items = items
+        self.loads = 0
+        self.lookups = []
+        self.conn = fake_conn({'WHERE item_id = %s': self.lookup, 'FROM items': self.load})
+
+    def load(self, sql, params):
+        self.loads += 1
+        return self.items
+
+    def lookup(self, sql, params):
+        self.lookups.append(params[0])
+        return [row for row in self.items if row['item_id'] == params[0]]
+
+def test_catalog_is_loaded_once_and_serves_facets_and_lookups(fake_conn):
+    db = CatalogDB(fake_conn, [item(3, 'M4A4', 'Field-Tested'), item(2, 'Sticker', None),
+                               item(1, 'AK-47', 'Factory New'), item(4, None, 'Field-Tested')])
+    conn = db.conn
+    cache = CatalogCache(ttl=60)
+
+    catalog = cache.get(conn)
+    assert catalog.weapon_types == ['AK-47', 'M4A4', 'Sticker', None]
+    assert catalog.wears == ['Factory New', 'Field-Tested']
+    assert [row['item_id'] for row in catalog.items] == [3, 2, 1, 4]
+    assert cache.get_item(conn, 1)['weapon_type'] == 'AK-47'
+    assert cache.get(conn) is catalog
+    assert (db.loads, db.lookups) == (1, [])
+    assert (cache.hits, cache.misses) == (2, 1)
+
+def test_invalidate_bumps_the_version_and_reloads(fake_conn):
+    db = CatalogDB(fake_conn, [item(1, 'AK-47', 'Factory New')])
+    conn = db.conn
+    cache = CatalogCache(ttl=60)
+    assert cache.get(conn).version == 0
+
+    db.items.insert(0, item(2, 'AWP', 'Minimal Wear'))
+    cache.invalidate()
+    catalog = cache.get(conn)
+    assert catalog.version == 1
+    assert catalog.weapon_types == ['AK-47', 'AWP']
+    assert cache.stats()['items'] == 2
+
+def test_load_racing_an_invalidation_is_not_kept(fake_conn):
+    db = CatalogDB(fake_conn, [item(1, 'AK-47', 'Factory New')])
+    conn = db.conn
+    cache = CatalogCache(ttl=60)
+    original = conn.cursor
+
+    def invalidating_cursor(*args, **kwargs):
+        cache.invalidate()
+        return original(*args, **kwargs)
+
+    conn.cursor = invalidating_cursor
+    assert len(cache.get(conn).items) == 1
+    assert cache.stats()['items'] == 0
+
+def test_expired_catalog_reloads(fake_conn):
+    db = CatalogDB(fake_conn, [item(1, 'AK-47', 'Factory New')])
+    conn = db.conn
+    cache = CatalogCache(ttl=0)
+    cache.get(conn)
+    cache.get(conn)
+    assert db.loads == 2
+
+def test_unknown_item_falls_back_to_the_database(fake_conn):
+    db = CatalogDB(fake_conn, [item(1, 'AK-47', 'Factory New')])
+    conn = db.conn
+    cache = CatalogCache(ttl=60)
+    cache.get(conn)
+    db.items.append(item(5, 'AWP', 'Minimal Wear'))
+
+    assert cache.get_item(conn, 5)['weapon_type'] == 'AWP'
+    assert cache.get_item(conn, 6) is None
+    assert (db.loads, db.lookups) == (1, [5, 6])
+
+def test_items_written_by_another_process_reload_the_catalog(fake_conn):
+    db = CatalogDB(fake_conn, [item(1, 'AK-47', 'Factory New')])
+    conn = db.conn
+    web = CatalogCache(ttl=60, shared=SharedVersion(CATALOG, check_interval=0))
+    other_web = CatalogCache(ttl=60, shared=SharedVersion(CATALOG, check_interval=0))
+    assert len(web.get(conn).items) == len(other_web.get(conn).items) == 1
+
+    db.items.insert(0, item(2, 'AWP', 'Minimal Wear'))
+    assert len(web.get(conn).items) == 1
+
+    bump_cache_versions(conn, CATALOG)     # the collector or another web worker committed items
+    assert [row['item_id'] for row in web.get(conn).items] == [2, 1]
+    assert [row['item_id'] for row in other_web.get(conn).items] == [2, 1]
+    assert web.stats()['shared_version'] == 1
+    assert db.loads == 4
@@ -0,0 +1,33 @@
+import sys
+import os
+from datetime import date, datetime, timezone
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.services.compaction import _next_start, run_compaction
+
+def ticks(fake_conn, *timestamps):
+    """price_history holding raw ticks at the given timestamps"""
+    return fake_conn({'MIN(timestamp) FROM price_history': lambda sql, params: [
+        (min((ts for ts in timestamps if ts >= params[0]), default=None),)]})
+
+def utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+def test_resumes_at_partition_start_so_whole_months_are_dropped(fake_conn):
+    partitions = {date(2024, 3, 1): 'price_history_2024_03'}
+    conn = ticks(fake_conn, utc(2024, 1, 20), utc(2024, 3, 9, 14))
+    assert _next_start(conn, utc(2024, 2, 2), partitions) == utc(2024, 3, 1)
+
+def test_resumes_at_next_tick_day_inside_a_started_month(fake_conn):
+    partitions = {date(2024, 3, 1): 'price_history_2024_03'}
+    conn = ticks(fake_conn, utc(2024, 3, 2), utc(2024, 3, 9, 14))
+    assert _next_start(conn, utc(2024, 3, 5), partitions) == utc(2024, 3, 9)
+    assert _next_start(conn, utc(2024, 3, 5), {}) == utc(2024, 3, 9)
+    assert _next_start(conn, utc(2024, 3, 10), partitions) is None
+
+def test_hourly_tier_cannot_be_shorter_than_raw_tier(fake_conn):
+    with pytest.raises(ValueError):
+        run_compaction(ticks(fake_conn), raw_days=30, hourly_days=7)
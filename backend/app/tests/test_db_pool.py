@@ -0,0 +1,129 @@
+import sys
+import asyncio
+import os
+import threading
+import time
+
+import psycopg2
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.services import db_pool
+from app.services.db_pool import DatabasePool, PoolTimeout
+
+class FakeThreadedPool:
+    def __init__(self, fake_conn):
+        self.fake_conn = fake_conn
+        self.broken = []
+        self._pool = []
+        self._used = {}
+        self.broken_next = 0
+        self.discarded = []
+
+    def getconn(self):
+        conn = self._pool.pop() if self._pool else self.connect(broken=self.broken_next > 0)
+        self.broken_next = max(0, self.broken_next - 1)
+        self._used[id(conn)] = conn
+        return conn
+
+    def connect(self, broken):
+        if not broken:
+            return self.fake_conn()
+        conn = self.fake_conn({'': psycopg2.OperationalError("server closed the connection unexpectedly")})
+        self.broken.append(conn)
+        return conn
+
+    def putconn(self, conn, close=False):
+        self._used.pop(id(conn), None)
+        if close:
+            self.discarded.append(conn)
+        else:
+            self._pool.append(conn)
+
+    def closeall(self):
+        self._pool.clear()
+
+@pytest.fixture
+def threaded_pool(monkeypatch, fake_conn):
+    monkeypatch.setattr(db_pool.pool, 'ThreadedConnectionPool',
+                        lambda minconn, maxconn, **kwargs: FakeThreadedPool(fake_conn))
+
+def test_connection_is_returned_and_reused(threaded_pool):
+    pool = DatabasePool(minconn=1, maxconn=2, db_params={})
+    with pool.connection() as first:
+        assert pool.stats()['in_use'] == 1
+    with pool.connection() as second:
+        assert second is first
+
+    stats = pool.stats()
+    assert (stats['acquired'], stats['in_use'], stats['idle']) == (2, 0, 1)
+
+def test_failed_request_rolls_back(threaded_pool):
+    pool = DatabasePool(minconn=1, maxconn=1, db_params={})
+    with pytest.raises(ValueError):
+        with pool.connection() as conn:
+            before = conn.rollbacks
+            raise ValueError("boom")
+    assert conn.rollbacks == before + 1
+    assert pool.stats()['in_use'] == 0
+
+def test_callers_queue_when_exhausted(threaded_pool):
+    pool = DatabasePool(minconn=1, maxconn=1, db_params={}, acquire_timeout=2)
+    released = threading.Event()
+
+    def hold():
+        with pool.connection():
+            released.wait(1)
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    time.sleep(0.05)
+    threading.Timer(0.1, released.set).start()
+    with pool.connection():
+        pass
+    holder.join()
+
+    stats = pool.stats()
+    assert stats['waited'] == 1
+    assert stats['wait_seconds_max'] > 0.05
+
+def test_acquire_times_out(threaded_pool):
+    pool = DatabasePool(minconn=1, maxconn=1, db_params={}, acquire_timeout=0.05)
+    with pool.connection():
+        with pytest.raises(PoolTimeout):
+            with pool.connection():
+                pass
+    assert pool.stats()['timeouts'] == 1
+
+def test_stale_connection_is_replaced(threaded_pool):
+    pool = DatabasePool(minconn=1, maxconn=2, db_params={}, health_check_after=0)
+    pool._pool.broken_next = 1
+    with pool.connection() as conn:
+        assert conn not in pool._pool.broken
+    assert pool.stats()['health_check_failures'] == 1
+    assert pool._pool.discarded == pool._pool.broken
+
+@pytest.mark.asyncio
+async def test_run_keeps_event_loop_free(threaded_pool):
+    pool = DatabasePool(minconn=1, maxconn=2, db_params={})
+
+    def slow_query(conn, value):
+        time.sleep(0.2)
+        return value
+
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    ticking = asyncio.create_task(ticker())
+    results = await asyncio.gather(pool.run(slow_query, 1), pool.run(slow_query, 2))
+    ticking.cancel()
+
+    assert results == [1, 2]
+    assert ticks >= 10
+    pool.close()
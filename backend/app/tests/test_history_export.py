@@ -0,0 +1,56 @@
+import sys
+import os
+import json
+from datetime import datetime, timezone
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.services.history_export import stream_price_history
+
+SINCE = datetime(2024, 5, 1, tzinfo=timezone.utc)
+TICKS = [
+    (1, 'buff', 10.5, 3, datetime(2024, 5, 1, 1, tzinfo=timezone.utc)),
+    (1, 'steam', 12.0, None, datetime(2024, 5, 1, 2, tzinfo=timezone.utc)),
+    (2, 'buff', 3.25, 8, datetime(2024, 5, 1, 3, tzinfo=timezone.utc)),
+]
+
+def export_db(fake_conn):
+    return fake_conn({
+        'FROM price_history': TICKS,
+        'FROM items': [{'item_id': 1, 'market_hash_name': 'AK-47 | Redline (Field-Tested)',
+                        'weapon_type': 'AK-47', 'wear': 'Field-Tested'}],
+    })
+
+def test_ndjson_streams_batches_from_a_named_cursor(fake_conn):
+    conn = export_db(fake_conn)
+    chunks = list(stream_price_history(conn, SINCE, item_ids=[1, 2], source='buff', batch_size=2))
+
+    query, params = conn.executed[-1]
+    assert query.endswith("WHERE timestamp >= %s AND item_id = ANY(%s) AND source = %s ORDER BY item_id, timestamp")
+    assert params == [SINCE, [1, 2], 'buff']
+    assert len(chunks) == 2
+    assert conn.closed_cursors[-1].startswith('price_history_export_')
+
+    rows = [json.loads(line) for chunk in chunks for line in chunk.splitlines()]
+    assert rows[0] == {'item_id': 1, 'market_hash_name': 'AK-47 | Redline (Field-Tested)', 'source': 'buff',
+                       'price': 10.5, 'volume': 3, 'timestamp': '2024-05-01T01:00:00+00:00'}
+    assert rows[2]['market_hash_name'] is None
+
+def test_csv_sends_its_header_before_querying(fake_conn):
+    conn = export_db(fake_conn)
+    stream = stream_price_history(conn, SINCE, export_format='csv')
+
+    assert next(stream) == 'item_id,market_hash_name,source,price,volume,timestamp\n'
+    assert conn.executed == []
+    assert ''.join(stream).splitlines() == [
+        '1,AK-47 | Redline (Field-Tested),buff,10.5,3,2024-05-01T01:00:00+00:00',
+        '1,AK-47 | Redline (Field-Tested),steam,12.0,,2024-05-01T02:00:00+00:00',
+        '2,,buff,3.25,8,2024-05-01T03:00:00+00:00',
+    ]
+
+def test_closing_the_stream_early_closes_the_cursor(fake_conn):
+    conn = export_db(fake_conn)
+    stream = stream_price_history(conn, SINCE, batch_size=1)
+    next(stream)
+    stream.close()
+    assert conn.closed_cursors[-1].startswith('price_history_export_')
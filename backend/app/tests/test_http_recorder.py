@@ -0,0 +1,26 @@
+import sys
+import os
+import json
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.services.http_recorder import HttpRecorder
+
+def test_recorder_writes_one_json_line_per_exchange(tmp_path):
+    path = str(tmp_path / 'recordings.jsonl')
+    recorder = HttpRecorder(path)
+    recorder.record('GET', 'https://buff.163.com/api/market/goods', {'page_num': 1}, 200,
+                    '{"code": "OK"}', {'Retry-After': None}, 0.0421)
+    recorder.record('GET', 'https://steamcommunity.com/market/priceoverview/', {}, 429,
+                    'Too Many Requests', {'Retry-After': '5'})
+    recorder.close()
+
+    with open(path, encoding='utf-8') as f:
+        lines = [json.loads(line) for line in f]
+    assert recorder.recorded == 2
+    assert lines[0]['params'] == {'page_num': '1'}
+    assert lines[0]['body'] == {'code': 'OK'}
+    assert lines[0]['headers'] == {}
+    assert lines[0]['elapsed_ms'] == 42.1
+    assert lines[1]['body'] == 'Too Many Requests'
+    assert lines[1]['headers'] == {'Retry-After': '5'}
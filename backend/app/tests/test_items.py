@@ -0,0 +1,37 @@
+import sys
+import os
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.api.routes import items as items_routes, prices as prices_routes
+from app.services.cache_versions import CATALOG, QUERIES
+from app.services.items import insert_item
+
+ITEM = items_routes.ItemCreate(market_hash_name='AK-47 | Redline (Field-Tested)', item_type='weapon',
+                               weapon_type='AK-47', skin_name='Redline', wear='Field-Tested')
+
+EXISTING = {'WHERE market_hash_name = %s': [{'item_id': 7}]}
+
+def test_insert_item_leaves_existing_names_alone(fake_conn):
+    conn = fake_conn(EXISTING)
+    assert insert_item(conn, ITEM) is None
+    assert conn.statements('INSERT') == []
+    assert (conn.commits, conn.versions) == (0, {})
+
+def test_insert_item_returns_the_new_row(fake_conn):
+    conn = fake_conn({'INSERT INTO items': [{'item_id': 8, 'market_hash_name': ITEM.market_hash_name}]})
+    assert insert_item(conn, ITEM)['item_id'] == 8
+    assert conn.versions == {CATALOG: 1, QUERIES: 1}
+    assert conn.commits == 1
+
+@pytest.mark.parametrize('module, endpoint', [(items_routes, 'create_item'), (prices_routes, 'add_item')])
+def test_creating_a_duplicate_item_is_a_400(monkeypatch, fake_conn, fake_pool, module, endpoint):
+    monkeypatch.setattr(module, 'get_pool', lambda: fake_pool(fake_conn(EXISTING)))
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(getattr(module, endpoint)(ITEM))
+    assert raised.value.status_code == 400
+    assert raised.value.detail == "Item already exists"
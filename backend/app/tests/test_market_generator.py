@@ -0,0 +1,110 @@
+import sys
+import os
+import struct
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.services.item_names import parse_item_name
+from app.services.market_generator import (
+    COPY_HEADER, PG_EPOCH, MarketSimulator, base_price, build_catalog, item_fields, split_evenly, ticks_per_day,
+    to_binary_copy
+)
+
+def decode_binary_copy(payload: bytes):
+    assert payload.startswith(COPY_HEADER)
+    rows, offset = [], len(COPY_HEADER)
+    while True:
+        (fields,) = struct.unpack_from('>h', payload, offset)
+        offset += 2
+        if fields == -1:
+            assert offset == len(payload)
+            return rows
+        values = []
+        for fmt in ('>i', '>d', '>i', None, '>q'):
+            (length,) = struct.unpack_from('>i', payload, offset)
+            raw = payload[offset + 4:offset + 4 + length]
+            offset += 4 + length
+            values.append(raw.decode() if fmt is None else struct.unpack(fmt, raw)[0])
+        rows.append(tuple(values))
+
+def test_parse_item_name_splits_weapon_skin_and_wear():
+    assert parse_item_name("★ Karambit | Case Hardened (Field-Tested)") == {
+        "market_hash_name": "★ Karambit | Case Hardened (Field-Tested)",
+        "weapon_type": "★ Karambit",
+        "skin_name": "Case Hardened",
+        "wear": "Field-Tested",
+        "item_type": "knife"
+    }
+    assert parse_item_name("Sticker | Gutted")["wear"] == "Not Applicable"
+    assert parse_item_name("Revolution Case") is None
+
+def test_catalog_is_distinct_deterministic_and_parseable():
+    names = build_catalog(2000, seed=7)
+    assert len(set(names)) == 2000
+    assert names == build_catalog(2000, seed=7)
+
+    types = [item_fields(name)['item_type'] for name in names]
+    assert {'weapon', 'knife', 'case'} <= set(types)
+    assert any(name.startswith('Sticker | ') for name in names)
+    assert any('StatTrak™' in name for name in names)
+    for name in names:
+        assert parse_item_name(name) is not None or name.endswith('Case')
+
+def test_base_prices_follow_category():
+    rng = np.random.default_rng(0)
+    knives = [base_price("★ Karambit | Fade (Factory New)", rng) for _ in range(200)]
+    stickers = [base_price("Sticker | Gutted", rng) for _ in range(200)]
+    assert min(knives + stickers) >= 0.03
+    assert np.median(knives) > 50 * np.median(stickers)
+
+def test_simulated_day_is_time_ordered_and_inside_the_day():
+    day = datetime(2024, 3, 1, tzinfo=timezone.utc)
+    simulator = MarketSimulator([10, 11, 12], [1.0, 20.0, 300.0], steam_share=0.3, seed=1)
+    item_ids, prices, volumes, is_steam, micros = simulator.day(day, 5000)
+
+    start = int((day - PG_EPOCH).total_seconds()) * 1_000_000
+    assert len(item_ids) == 5000
+    assert set(item_ids.tolist()) == {10, 11, 12}
+    assert np.all(np.diff(micros) >= 0)
+    assert start <= micros.min() and micros.max() < start + 86_400_000_000
+    assert prices.min() >= 0.03 and volumes.min() >= 0
+    assert 0.2 < is_steam.mean() < 0.4
+    # The cheapest item is the most liquid
+    assert np.sum(item_ids == 10) > np.sum(item_ids == 12)
+
+def test_no_tick_is_generated_after_the_end_time():
+    simulator = MarketSimulator([10, 11], [1.0, 20.0], seed=2)
+    end = datetime(2024, 3, 3, 9, 30, tzinfo=timezone.utc)
+    days = [datetime(2024, 3, 1, tzinfo=timezone.utc) + timedelta(days=offset) for offset in range(3)]
+    micros = np.concatenate([simulator.day(day, 2000, until=end)[4] for day in days])
+
+    end_micros = int((end - PG_EPOCH).total_seconds() * 1_000_000)
+    assert micros.max() < end_micros
+    assert micros.max() > end_micros - 3_600_000_000
+
+def test_walk_carries_over_between_days():
+    simulator = MarketSimulator([1], [100.0], volatility=0.05, steam_share=0.0, seed=3)
+    first = simulator.day(datetime(2024, 3, 1, tzinfo=timezone.utc), 50)
+    assert simulator.log_prices[0] != np.log(100.0)
+    assert abs(simulator.log_prices[0] - np.log(first[1][-1])) < 0.001
+    second = simulator.day(datetime(2024, 3, 2, tzinfo=timezone.utc), 50)
+    assert abs(np.log(second[1][0]) - np.log(first[1][-1])) < 0.05
+
+def test_binary_copy_round_trips():
+    payload = to_binary_copy(
+        np.array([1, 2, 3], dtype=np.int32), np.array([1.5, 2.25, 3.0]), np.array([7, 0, 9], dtype=np.int32),
+        np.array([False, True, False]), np.array([10, 20, 30], dtype=np.int64)
+    )
+    assert decode_binary_copy(payload) == [
+        (1, 1.5, 7, 'buff', 10),
+        (3, 3.0, 9, 'buff', 30),
+        (2, 2.25, 0, 'steam', 20),
+    ]
+
+def test_ticks_and_items_split_evenly():
+    assert ticks_per_day(10, 4) == [3, 3, 2, 2]
+    assert split_evenly(list(range(5)), 2) == [[0, 1, 2], [3, 4]]
+    assert split_evenly([1], 4) == [[1]]
@@ -0,0 +1,95 @@
+import sys
+import os
+import asyncio
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))), 'scripts'))
+
+from aiohttp.test_utils import TestClient, TestServer
+from mock_market_server import BUFF_GOODS_PATH, STEAM_PRICE_PATH, MockMarket, request_key
+
+def fetch(market, path, params=None, times=1):
+    """Send the same GET to the market's app times times and return (status, headers, body) of each"""
+    async def run():
+        async with TestClient(TestServer(market.create_app())) as client:
+            responses = []
+            for _ in range(times):
+                response = await client.get(path, params=params)
+                responses.append((response.status, dict(response.headers), await response.json()))
+            return responses
+    return asyncio.run(run())
+
+def test_replays_recordings_in_order_and_cycles():
+    key = request_key(BUFF_GOODS_PATH, {'page_num': 1})
+    market = MockMarket(recordings={key: [
+        {'status': 200, 'body': {'code': 'OK', 'data': {'page_num': 1}}, 'headers': {}},
+        {'status': 429, 'body': '{"error": "slow down"}', 'headers': {'Retry-After': '5'}},
+    ]})
+
+    responses = fetch(market, BUFF_GOODS_PATH, {'page_num': 1}, times=3)
+
+    assert [status for status, _, _ in responses] == [200, 429, 200]
+    assert responses[0][2] == {'code': 'OK', 'data': {'page_num': 1}}
+    assert responses[1][1]['Retry-After'] == '5'
+    assert responses[1][2] == {'error': 'slow down'}
+    assert market.stats['replayed'] == 3
+
+def test_unrecorded_request_is_404_without_synthesis():
+    market = MockMarket(recordings={request_key(BUFF_GOODS_PATH, {'page_num': 1}): [
+        {'status': 200, 'body': {'code': 'OK'}}
+    ]}, synthesize=False)
+
+    [(status, _, body)] = fetch(market, BUFF_GOODS_PATH, {'page_num': 2})
+
+    assert status == 404
+    assert market.stats['missing'] == 1
+
+def test_throttles_with_retry_after():
+    market = MockMarket(throttle_rate=1, retry_after=7, seed=1)
+
+    responses = fetch(market, STEAM_PRICE_PATH, {'market_hash_name': 'AK-47 | Redline (Field-Tested)'}, times=2)
+
+    assert all(status == 429 and headers['Retry-After'] == '7' for status, headers, _ in responses)
+    assert market.stats['throttled'] == 2
+
+def test_injects_server_errors():
+    market = MockMarket(error_rate=1, seed=1)
+
+    [(status, headers, body)] = fetch(market, BUFF_GOODS_PATH, {'page_num': 1})
+
+    assert status == 500
+    assert 'Retry-After' not in headers
+    assert market.stats['errors'] == 1
+
+def test_delays_responses_by_latency():
+    market = MockMarket(latency_ms=50, catalog=['a'])
+
+    started = time.perf_counter()
+    fetch(market, BUFF_GOODS_PATH, {'page_num': 1}, times=2)
+
+    assert time.perf_counter() - started >= 0.1
+
+def test_synthesizes_paginated_crawl_pages():
+    catalog = [f"Item {i}" for i in range(5)]
+    market = MockMarket(catalog=catalog, page_size=2, seed=1)
+
+    pages = [fetch(market, BUFF_GOODS_PATH, {'page_num': page_num})[0][2]['data'] for page_num in (1, 2, 3, 4)]
+
+    assert [[item['market_hash_name'] for item in page['items']] for page in pages] == [
+        ['Item 0', 'Item 1'], ['Item 2', 'Item 3'], ['Item 4'], []
+    ]
+    assert all(page['total_count'] == 5 and page['total_page'] == 3 for page in pages)
+    assert float(pages[0]['items'][0]['sell_min_price']) > 0
+    assert market.stats['synthesized'] == 4
+
+def test_synthesizes_search_and_steam_prices():
+    market = MockMarket(catalog=['Item 0', 'Item 1'], seed=1)
+
+    [(_, _, search)] = fetch(market, BUFF_GOODS_PATH, {'search': 'Item 1', 'page_size': 10})
+    [(_, _, steam)] = fetch(market, STEAM_PRICE_PATH, {'market_hash_name': 'Item 1'})
+
+    assert [item['market_hash_name'] for item in search['data']['items']] == ['Item 1']
+    assert search['data']['total_page'] == 1
+    assert steam['success'] is True
+    assert steam['lowest_price'].startswith('$')
@@ -0,0 +1,56 @@
+import sys
+import os
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.api.routes.prices import _select_items
+from app.services.catalog_cache import Catalog
+from app.services.pagination import decode_cursor, encode_cursor, parse_fields, project, split_page
+
+CREATED = datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=timezone.utc)
+
+def row(item_id, minutes=0):
+    return {'item_id': item_id, 'created_at': CREATED + timedelta(minutes=minutes),
+            'market_hash_name': f"Item {item_id}", 'weapon_type': 'AK-47', 'wear': 'Field-Tested'}
+
+def test_cursor_round_trips_and_rejects_garbage():
+    cursor = encode_cursor(row(42))
+    assert decode_cursor(cursor) == (CREATED, 42)
+    for bad in ('not-a-cursor', encode_cursor(row(1))[:-3], 'WzEsMiwzXQ'):
+        with pytest.raises(ValueError):
+            decode_cursor(bad)
+
+def test_fields_are_validated_and_projected():
+    assert parse_fields(None, ['item_id']) is None
+    assert parse_fields(' wear,item_id,wear ', ['item_id', 'wear']) == ['wear', 'item_id']
+    with pytest.raises(ValueError, match='password'):
+        parse_fields('item_id,password', ['item_id', 'wear'])
+    assert project([row(1)], ['wear']) == [{'wear': 'Field-Tested'}]
+
+def test_split_page_only_returns_a_cursor_when_more_rows_exist():
+    rows = [row(3), row(2), row(1)]
+    assert split_page(rows, 3) == (rows, None)
+    page, cursor = split_page(rows, 2)
+    assert page == rows[:2]
+    assert decode_cursor(cursor) == (CREATED, 2)
+
+def test_catalog_pages_follow_the_keyset_order():
+    catalog = Catalog(0, [row(5, 2), row(4, 1), row(3), row(2), row(1)], 0.0)
+    assert [item['item_id'] for item in catalog.page(limit=2)] == [5, 4]
+    assert [item['item_id'] for item in catalog.page((CREATED + timedelta(minutes=1), 4), 2)] == [3, 2]
+    # The cursor's item was deleted: resume at the first key after it
+    assert [item['item_id'] for item in catalog.page((CREATED, 6), 2)] == [3, 2]
+    assert catalog.page((CREATED, 1)) == []
+
+def test_price_listing_joins_only_what_the_projection_needs(fake_conn):
+    conn = fake_conn({'FROM items': [row(6)]})
+    assert _select_items(conn, limit=11, after=(CREATED, 7), fields=['market_hash_name', 'buff_price']) == [row(6)]
+    (query, params), = conn.executed
+    assert query.startswith("SELECT i.item_id as item_id, i.created_at as created_at, "
+                            "i.market_hash_name as market_hash_name, COALESCE(buff.price, i.buff_price) as buff_price")
+    assert "steam" not in query
+    assert "WHERE (i.created_at, i.item_id) < (%s, %s) ORDER BY i.created_at DESC, i.item_id DESC LIMIT %s" in query
+    assert params == [CREATED, 7, 11]
@@ -0,0 +1,94 @@
+import sys
+import os
+from datetime import date, datetime, timezone
+
+import pyarrow as pa
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.services.parquet_archive import (
+    _fetch_day, export_history, exported_days, load_history, load_history_arrays, read_history, write_day
+)
+
+def ticks(rows):
+    source, item_id, price, volume, timestamp = zip(*rows)
+    return pa.table({
+        'source': list(source), 'item_id': pa.array(item_id, pa.int32()), 'price': list(price),
+        'volume': pa.array(volume, pa.int32()), 'timestamp': pa.array(timestamp, pa.timestamp('us', tz='UTC'))
+    })
+
+def at(day, hour):
+    return datetime(2024, 5, day, hour, tzinfo=timezone.utc)
+
+def copy_db(fake_conn, csv_by_day):
+    """price_history answering COPY of one day with that day's CSV"""
+    return fake_conn({'COPY': lambda sql, params: [
+        csv for day, csv in csv_by_day.items() if f"timestamp >= '{day.isoformat()}T" in sql]})
+
+def test_write_day_partitions_by_date_and_source(tmp_path):
+    root = str(tmp_path)
+    assert write_day(root, date(2024, 5, 1), ticks([
+        ('buff', 1, 10.0, 5, at(1, 1)),
+        ('steam', 1, 11.5, None, at(1, 2)),
+        ('buff', 2, 3.0, 7, at(1, 3)),
+    ])) == {'buff': 2, 'steam': 1}
+    write_day(root, date(2024, 5, 2), ticks([('buff', 1, 10.5, 6, at(2, 1))]))
+
+    assert exported_days(root) == [date(2024, 5, 1), date(2024, 5, 2)]
+    assert sorted(os.listdir(os.path.join(root, 'date=2024-05-01'))) == ['source=buff', 'source=steam']
+    assert read_history(root).num_rows == 4
+
+def test_rewriting_a_day_replaces_it(tmp_path):
+    root = str(tmp_path)
+    write_day(root, date(2024, 5, 1), ticks([('buff', 1, 10.0, 5, at(1, 1)), ('steam', 1, 11.0, 1, at(1, 1))]))
+    write_day(root, date(2024, 5, 1), ticks([('buff', 1, 10.0, 5, at(1, 1)), ('buff', 1, 10.2, 5, at(1, 9))]))
+
+    table = read_history(root, columns=['source', 'price'])
+    assert table.column('source').to_pylist() == ['buff', 'buff']
+    assert table.column('price').to_pylist() == [10.0, 10.2]
+
+def test_read_filters_days_sources_items_and_columns(tmp_path):
+    root = str(tmp_path)
+    for day in (1, 2, 3):
+        write_day(root, date(2024, 5, day), ticks([
+            ('buff', 1, float(day), 1, at(day, 6)),
+            ('buff', 2, float(day) * 10, 1, at(day, 18)),
+            ('steam', 1, float(day) + 0.5, None, at(day, 6)),
+        ]))
+
+    frame = load_history(root, columns=['item_id', 'price', 'date'], since=at(1, 12), until=at(3, 12),
+                         sources=['buff'])
+    assert list(frame.columns) == ['item_id', 'price', 'date']
+    assert frame['price'].tolist() == [10.0, 2.0, 20.0, 3.0]
+
+    arrays = load_history_arrays(root, columns=['price', 'volume'], sources=['steam'], item_ids=[1])
+    assert arrays['price'].tolist() == [1.5, 2.5, 3.5]
+    assert arrays['volume'].tolist() == [-1, -1, -1]
+
+def test_read_empty_archive(tmp_path):
+    table = read_history(str(tmp_path / 'missing'), columns=['price', 'source'])
+    assert table.num_rows == 0
+    assert table.schema.names == ['price', 'source']
+
+def test_export_appends_from_the_newest_archived_day(tmp_path, fake_conn):
+    root = str(tmp_path)
+    write_day(root, date(2024, 5, 1), ticks([('buff', 1, 9.0, 1, at(1, 1))]))
+    conn = copy_db(fake_conn, {
+        date(2024, 5, 2): 'buff,1,10.0,5,1714608000000000\nbuff,2,3.5,,1714611600000000\n',
+        date(2024, 5, 4): 'steam,1,11.0,2,1714780800000000\n',
+    })
+
+    stats = export_history(conn, root=root, until=date(2024, 5, 5))
+
+    assert stats == {'days': 2, 'rows': 3}
+    assert exported_days(root) == [date(2024, 5, 1), date(2024, 5, 2), date(2024, 5, 4)]
+    assert conn.rollbacks == 4
+    frame = load_history(root, since=at(2, 0))
+    assert frame['volume'].isna().sum() == 1
+    assert frame['timestamp'].iloc[0] == at(2, 0)
+
+def test_fetch_day_parses_copy_output(fake_conn):
+    table = _fetch_day(copy_db(fake_conn, {date(2024, 5, 2): 'buff,7,1.25,,1714608000000000\n'}), at(2, 0))
+    assert table.column('item_id').to_pylist() == [7]
+    assert table.column('volume').to_pylist() == [None]
+    assert table.column('timestamp').to_pylist() == [at(2, 0)]
@@ -0,0 +1,69 @@
+import sys
+import os
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.services.partitions import (add_months, apply_retention, create_partitions, ensure_partitions, partition_name,
+                                     retention_cutoff, tick_month)
+
+NOW = datetime(2024, 3, 15, tzinfo=timezone.utc)
+
+def price_history(fake_conn, partitions, partitioned=True):
+    return fake_conn({'relkind': [('p' if partitioned else 'r',)],
+                      'pg_inherits': [(name,) for name in partitions]})
+
+def ddl(conn):
+    return [sql for sql in conn.statements() if not sql.startswith('SELECT')]
+
+def test_month_arithmetic_crosses_years():
+    assert add_months(date(2024, 11, 1), 3) == date(2025, 2, 1)
+    assert add_months(date(2024, 1, 1), -1) == date(2023, 12, 1)
+    assert partition_name(date(2024, 2, 1)) == 'price_history_2024_02'
+
+def test_only_missing_partitions_are_created(fake_conn):
+    conn = price_history(fake_conn, ['price_history_2024_03', 'price_history_2024_04'])
+    created = ensure_partitions(conn, months_ahead=2, now=NOW)
+
+    assert created == ['price_history_2024_05']
+    sql, params = [s for s in conn.executed if s[0].startswith('CREATE')][0]
+    assert 'PARTITION OF price_history' in sql
+    assert params == ('2024-05-01 00:00:00+00', '2024-06-01 00:00:00+00')
+
+def test_unpartitioned_table_is_left_alone(fake_conn):
+    conn = price_history(fake_conn, [], partitioned=False)
+    assert ensure_partitions(conn, now=NOW) == []
+    assert apply_retention(conn, retention_months=1, now=NOW) == []
+    assert ddl(conn) == []
+
+def test_retention_detaches_partitions_older_than_window(fake_conn):
+    conn = price_history(fake_conn, ['price_history_2023_12', 'price_history_2024_01',
+                                      'price_history_2024_02', 'price_history_2024_03', 'price_history_x'])
+    expired = apply_retention(conn, retention_months=1, mode='detach', now=NOW)
+
+    assert expired == ['price_history_2023_12', 'price_history_2024_01']
+    assert ddl(conn) == [
+        'ALTER TABLE price_history DETACH PARTITION price_history_2023_12',
+        'ALTER TABLE price_history DETACH PARTITION price_history_2024_01',
+    ]
+
+def test_retention_can_drop_and_defaults_to_keeping_everything(fake_conn):
+    conn = price_history(fake_conn, ['price_history_2023_01'])
+    assert apply_retention(conn, retention_months=0, now=NOW) == []
+    assert apply_retention(conn, retention_months=12, mode='drop', now=NOW) == ['price_history_2023_01']
+    assert ddl(conn) == ['DROP TABLE price_history_2023_01']
+    with pytest.raises(ValueError):
+        apply_retention(conn, retention_months=1, mode='truncate', now=NOW)
+
+def test_partitions_of_past_months_are_created_on_demand(fake_conn):
+    conn = price_history(fake_conn, ['price_history_2024_03'])
+    months = [tick_month(datetime(2023, 11, 30, 23, tzinfo=timezone(timedelta(hours=-2)))), date(2024, 3, 1)]
+
+    assert create_partitions(conn, months) == ['price_history_2023_12']
+    assert create_partitions(price_history(fake_conn, [], partitioned=False), months) == []
+
+def test_retention_cutoff_is_the_first_kept_month():
+    assert retention_cutoff(0, now=NOW) is None
+    assert retention_cutoff(2, now=NOW) == date(2024, 1, 1)
@@ -0,0 +1,151 @@
+import sys
+import os
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.services import price_collector
+from app.services.price_collector import SWEEP_LOCK_KEY, PriceCollector
+
+NOW = datetime(2024, 3, 15, 12, tzinfo=timezone.utc)
+
+class RunsDatabase:
+    """Just enough of collection_runs, collection_checkpoints, items and advisory locks for a sweep"""
+    def __init__(self, fake_conn, item_ids, runs=(), checkpoints=()):
+        self.fake_conn = fake_conn
+        self.items = [{'item_id': item_id, 'market_hash_name': f"Item {item_id}"} for item_id in item_ids]
+        self.runs = [dict(run) for run in runs]
+        self.checkpoints = set(checkpoints)
+        self.locks = {}
+        self.sessions = 0
+
+    def connect(self):
+        self.sessions += 1
+        session_id = self.sessions
+        conn = self.fake_conn({'': lambda sql, params: self.execute(session_id, sql, params)})
+        conn.session_id = session_id
+        return conn
+
+    def run(self, run_id):
+        return next(run for run in self.runs if run['run_id'] == run_id)
+
+    def execute(self, session_id, sql, params):
+        if sql.startswith('SELECT pg_try_advisory_lock'):
+            holder = self.locks.setdefault(params[0], session_id)
+            return [(holder == session_id,)]
+        if sql.startswith('SELECT pg_advisory_unlock'):
+            return [(self.locks.pop(params[0], None) is not None,)]
+        if sql.startswith("UPDATE collection_runs SET status = 'abandoned'"):
+            for run in self.runs:
+                if run['status'] == 'running' and run['started_at'] < NOW - timedelta(hours=params[0]):
+                    run['status'] = 'abandoned'
+        elif sql.startswith('SELECT run_id FROM collection_runs'):
+            running = sorted((run for run in self.runs if run['status'] == 'running'), key=lambda run: run['started_at'])
+            return [{'run_id': running[-1]['run_id']}] if running else []
+        elif sql.startswith('SELECT item_id FROM collection_checkpoints'):
+            return [{'item_id': item_id} for run_id, item_id in self.checkpoints if run_id == params[0]]
+        elif sql.startswith('INSERT INTO collection_runs'):
+            run_id = max((run['run_id'] for run in self.runs), default=0) + 1
+            self.runs.append({'run_id': run_id, 'status': 'running', 'started_at': NOW})
+            return [{'run_id': run_id}]
+        elif sql.startswith('SELECT item_id, market_hash_name FROM items'):
+            return list(self.items)
+        elif sql.startswith('UPDATE collection_runs SET items_total'):
+            self.run(params[1])['items_total'] = params[0]
+        elif sql.startswith("UPDATE collection_runs SET status = 'completed'"):
+            self.run(params[0])['status'] = 'completed'
+        elif sql.startswith('DELETE FROM collection_checkpoints'):
+            self.checkpoints = {(run_id, item_id) for run_id, item_id in self.checkpoints if run_id != params[0]}
+        else:
+            raise AssertionError(f"Unexpected statement: {sql}")
+        return []
+
+@pytest.fixture
+def runs_db(monkeypatch, fake_conn, fake_pool):
+    """Factory for a RunsDatabase that the collector's pool connects to"""
+    def make(*args, **kwargs):
+        db = RunsDatabase(fake_conn, *args, **kwargs)
+        monkeypatch.setattr(price_collector, 'get_pool', lambda: fake_pool(connect=db.connect))
+        return db
+    return make
+
+class FakeWriter:
+    def __init__(self, conn):
+        self.rows_written = 0
+        self.flush_seconds = 0.0
+
+    def add(self, item_id, price, volume=None, source='buff'):
+        self.rows_written += 1
+
+    def flush(self):
+        pass
+
+def make_collector(monkeypatch, db, fail_after=None, **kwargs):
+    """A collector over db whose Buff source prices every item, raising after fail_after items"""
+    monkeypatch.setattr(price_collector, 'ensure_partitions', lambda conn: [])
+    monkeypatch.setattr(price_collector, 'bump_cache_versions', lambda conn, *names: None)
+    monkeypatch.setattr(price_collector, 'PriceWriter', FakeWriter)
+    monkeypatch.setattr(price_collector, 'execute_values',
+                        lambda cur, sql, rows, page_size: db.checkpoints.update(rows))
+    collector = PriceCollector(chunk_size=2, **kwargs)
+    collector.collected = []
+
+    async def collect_buff_prices(items):
+        for item in items:
+            if fail_after is not None and len(collector.collected) >= fail_after:
+                raise ConnectionError("Buff went away")
+            collector.collected.append(item['item_id'])
+            yield {'item_id': item['item_id'], 'price': 1.0, 'source': 'buff'}
+
+    collector.collect_buff_prices = collect_buff_prices
+    return collector
+
+def test_crashed_sweep_is_resumed_without_recollecting_checkpointed_items(monkeypatch, runs_db):
+    db = runs_db([1, 2, 3, 4, 5])
+    crashed = make_collector(monkeypatch, db, fail_after=3)
+    try:
+        asyncio.run(crashed.collect_and_store_prices())
+    except ConnectionError:
+        pass
+    assert db.runs[0]['status'] == 'running'
+    assert db.checkpoints == {(1, 1), (1, 2)}
+    assert db.locks == {}
+
+    resumed = make_collector(monkeypatch, db)
+    assert asyncio.run(resumed.collect_and_store_prices()) is True
+    assert resumed.collected == [3, 4, 5]
+    assert db.runs == [{'run_id': 1, 'status': 'completed', 'started_at': NOW, 'items_total': 5}]
+    assert db.checkpoints == set()
+
+def test_runs_older_than_max_resume_age_are_abandoned(monkeypatch, runs_db):
+    db = runs_db([1, 2, 3], runs=[{'run_id': 1, 'status': 'running', 'started_at': NOW - timedelta(hours=7)}],
+                 checkpoints=[(1, 1), (1, 2)])
+    collector = make_collector(monkeypatch, db, max_resume_age_hours=6)
+
+    asyncio.run(collector.collect_and_store_prices())
+    assert collector.collected == [1, 2, 3]
+    assert [(run['run_id'], run['status']) for run in db.runs] == [(1, 'abandoned'), (2, 'completed')]
+
+def test_only_one_collector_sweeps_at_a_time(monkeypatch, runs_db):
+    db = runs_db([1, 2])
+    other = db.connect()
+    other.cursor().execute("SELECT pg_try_advisory_lock(%s)", (SWEEP_LOCK_KEY,))
+    collector = make_collector(monkeypatch, db)
+
+    assert asyncio.run(collector.collect_and_store_prices()) is False
+    assert collector.collected == []
+    assert db.runs == []
+    assert db.locks == {SWEEP_LOCK_KEY: other.session_id}
+
+def test_due_item_refreshes_do_not_take_the_sweep_lock(monkeypatch, runs_db):
+    db = runs_db([1, 2, 3])
+    other = db.connect()
+    other.cursor().execute("SELECT pg_try_advisory_lock(%s)", (SWEEP_LOCK_KEY,))
+    collector = make_collector(monkeypatch, db)
+
+    assert asyncio.run(collector.collect_and_store_prices(db.items[1:])) is True
+    assert collector.collected == [2, 3]
+    assert db.runs == []
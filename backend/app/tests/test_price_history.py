@@ -0,0 +1,92 @@
+import sys
+import os
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.api.routes import prices
+from app.api.routes.prices import ExportResponse, _select_price_history, export_price_history, history_interval
+from app.services.config import HOURLY_CANDLE_RETENTION_DAYS, RAW_TICK_RETENTION_DAYS
+
+def test_history_past_the_raw_retention_comes_from_candles(fake_conn):
+    assert history_interval(RAW_TICK_RETENTION_DAYS) == 'raw'
+    assert history_interval(RAW_TICK_RETENTION_DAYS + 1) == 'hourly'
+    assert history_interval(HOURLY_CANDLE_RETENTION_DAYS + 1) == 'daily'
+
+    for days, table in ((7, 'FROM price_history ph'), (90, 'FROM price_candles_hourly ph'),
+                        (365, 'FROM price_candles_daily ph')):
+        conn = fake_conn()
+        _select_price_history(conn, '1', days, 'buff')
+        assert conn.statements(table)
+
+def test_export_past_the_raw_retention_points_at_series():
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(export_price_history(item_id=[1], days=RAW_TICK_RETENTION_DAYS + 1, source=None, format='csv'))
+    assert raised.value.status_code == 400
+    assert '/api/prices/series' in raised.value.detail
+
+def test_history_is_bounded_and_measured_in_utc(fake_conn):
+    conn = fake_conn()
+    _select_price_history(conn, '1', 7, None, limit=50)
+    (query, params), = conn.executed
+    assert query.endswith('ORDER BY ph.timestamp DESC LIMIT %s')
+    assert params[1].tzinfo is not None
+    assert params[-1] == 50
+
+def test_exports_beyond_the_limit_are_refused(monkeypatch):
+    slots = threading.BoundedSemaphore(1)
+    slots.acquire()
+    monkeypatch.setattr(prices, '_export_slots', slots)
+
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(export_price_history(item_id=[1], days=1, source=None, format='csv'))
+    assert raised.value.status_code == 503
+
+class Export:
+    """Sync chunk generator that records whether it was closed"""
+    def __init__(self, chunks):
+        self.closed = False
+        self.stream = self.run(chunks)
+
+    def run(self, chunks):
+        try:
+            yield from chunks
+        finally:
+            self.closed = True
+
+def serve(response, send):
+    async def receive():
+        await asyncio.Event().wait()
+
+    asyncio.run(response({'type': 'http'}, receive, send))
+
+def test_export_releases_its_slot_when_done():
+    slots = threading.BoundedSemaphore(1)
+    slots.acquire()
+    export = Export(['a\n', 'b\n'])
+    sent = []
+
+    async def send(message):
+        sent.append(message.get('body'))
+
+    serve(ExportResponse(export.stream, slots), send)
+    assert sent == [None, b'a\n', b'b\n', b'']
+    assert export.closed
+    assert slots.acquire(blocking=False)
+
+def test_stalled_export_is_dropped():
+    slots = threading.BoundedSemaphore(1)
+    slots.acquire()
+    export = Export(['a\n', 'b\n'])
+
+    async def send(message):
+        if message.get('body'):
+            await asyncio.Event().wait()
+
+    serve(ExportResponse(export.stream, slots, send_timeout=0.05), send)
+    assert export.closed
+    assert slots.acquire(blocking=False)
@@ -0,0 +1,50 @@
+import sys
+import os
+from datetime import datetime, timezone
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.services.price_series import candle_interval, lttb, select_price_series
+
+NOW = datetime(2024, 5, 31, tzinfo=timezone.utc)
+
+def test_lttb_keeps_endpoints_and_spikes():
+    x = np.arange(1000, dtype=float)
+    y = np.sin(x / 50)
+    y[437] = 25.0
+    kept = lttb(x, y, 50)
+    assert len(kept) == 50
+    assert kept[0] == 0 and kept[-1] == 999
+    assert np.all(np.diff(kept) > 0)
+    assert 437 in kept
+
+def test_lttb_returns_everything_when_under_threshold():
+    x = np.arange(10, dtype=float)
+    assert lttb(x, x, 10).tolist() == list(range(10))
+    assert lttb(x, x, 2).tolist() == list(range(10))
+
+def test_interval_follows_hourly_retention():
+    assert candle_interval(7) == 'hourly'
+    assert candle_interval(365) == 'daily'
+
+def test_series_are_split_per_item_and_downsampled_from_one_query(fake_conn):
+    candles = [(1, 3600.0 * hour, 100.0 + hour % 7) for hour in range(500)] + [(3, 7200.0, 5.5), (3, 10800.0, 6.0)]
+    candle_queries = []
+    conn = fake_conn({
+        'price_candles_hourly': lambda sql, params: candle_queries.append(params) or candles,
+        'FROM items': [{'item_id': 1, 'market_hash_name': 'AWP | Asiimov (Field-Tested)',
+                        'weapon_type': 'AWP', 'wear': 'Field-Tested'}],
+    })
+
+    result = select_price_series(conn, [1, 2, 3], days=30, points=20, now=NOW)
+
+    assert candle_queries == [([1, 2, 3], 'buff', datetime(2024, 5, 1, tzinfo=timezone.utc))]
+    assert (result['interval'], result['source'], result['points']) == ('hourly', 'buff', 20)
+    first, missing, short = result['series']
+    assert first['market_hash_name'] == 'AWP | Asiimov (Field-Tested)'
+    assert len(first['timestamps']) == len(first['prices']) == 20
+    assert first['timestamps'][0] == 0 and first['timestamps'][-1] == 499 * 3600 * 1000
+    assert missing == {'item_id': 2, 'market_hash_name': None, 'timestamps': [], 'prices': []}
+    assert short['timestamps'] == [7200000, 10800000] and short['prices'] == [5.5, 6.0]
@@ -0,0 +1,91 @@
+import sys
+import os
+from datetime import datetime, timedelta, timezone
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.services import price_writer
+from app.services.price_writer import PriceWriter, latest_ticks, to_copy_buffer
+
+def test_copy_buffer_escapes_values_and_nulls():
+    ts = datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+    buffer = to_copy_buffer([(1, 12.5, None, 'buff', ts), (2, 3.0, 7, 'we\tird', ts)])
+    assert buffer.read().splitlines() == [
+        '1\t12.5\t\\N\tbuff\t2024-01-02T03:04:05+00:00',
+        '2\t3.0\t7\twe\\tird\t2024-01-02T03:04:05+00:00',
+    ]
+
+def test_writer_flushes_when_batch_is_full():
+    flushed = []
+    writer = PriceWriter(conn=None, batch_size=3, flush_interval=3600)
+    writer.flush = lambda: flushed.append(list(writer._buffer)) or writer._buffer.clear()
+
+    for item_id in range(7):
+        writer.add(item_id, 1.0)
+
+    assert [len(batch) for batch in flushed] == [3, 3]
+    assert len(writer._buffer) == 1
+
+def test_writer_flushes_when_interval_elapses():
+    flushed = []
+    writer = PriceWriter(conn=None, batch_size=1000, flush_interval=0)
+    writer.flush = lambda: flushed.append(list(writer._buffer)) or writer._buffer.clear()
+
+    writer.add(1, 1.0)
+    assert len(flushed) == 1
+
+def test_latest_ticks_keeps_newest_per_item_and_source():
+    early = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    late = datetime(2024, 1, 2, tzinfo=timezone.utc)
+    latest = latest_ticks([
+        (1, 10.0, 5, 'buff', late),
+        (1, 9.0, 4, 'buff', early),
+        (1, 1.5, None, 'steam', early),
+        (2, 3.0, 1, 'buff', early),
+    ])
+    assert latest == {
+        (1, 'buff'): (10.0, 5, late),
+        (1, 'steam'): (1.5, None, early),
+        (2, 'buff'): (3.0, 1, early),
+    }
+
+def partitioned(fake_conn, partitions, watermark=None):
+    """price_history partitioned by month, with a raw compaction watermark; returns (conn, created)"""
+    created = []
+
+    def create(sql, params):
+        name = sql.split('EXISTS')[1].split()[0]
+        partitions.append(name)
+        created.append(name)
+
+    conn = fake_conn({
+        'relkind': [('p',)],
+        'pg_inherits': lambda sql, params: [(name,) for name in partitions],
+        'compaction_state': [(watermark,)] if watermark else [],
+        'PARTITION OF': create,
+    })
+    return conn, created
+
+def test_ticks_for_a_past_month_get_their_partition_created(monkeypatch, fake_conn):
+    monkeypatch.setattr(price_writer, 'retention_cutoff', lambda: None)
+    conn, created = partitioned(fake_conn, ['price_history_2024_03'])
+    writer = PriceWriter(conn)
+    now = datetime(2024, 3, 15, tzinfo=timezone.utc)
+    late = datetime(2024, 1, 31, 23, 30, tzinfo=timezone.utc)
+    rows = [(1, 10.0, None, 'buff', now), (2, 5.0, None, 'buff', late)]
+
+    assert writer._history_rows(rows) == rows
+    assert created == ['price_history_2024_01']
+
+    writer._history_rows(rows)
+    assert created == ['price_history_2024_01']
+
+def test_ticks_before_the_compaction_watermark_skip_raw_history(monkeypatch, fake_conn):
+    monkeypatch.setattr(price_writer, 'retention_cutoff', lambda: None)
+    watermark = datetime(2024, 2, 14, tzinfo=timezone.utc)
+    conn, created = partitioned(fake_conn, ['price_history_2024_02', 'price_history_2024_03'], watermark=watermark)
+    writer = PriceWriter(conn)
+    rows = [(1, 10.0, None, 'buff', watermark), (2, 5.0, None, 'buff', watermark - timedelta(days=20))]
+
+    assert writer._history_rows(rows) == rows[:1]
+    assert created == []
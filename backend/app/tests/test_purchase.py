@@ -1,32 +1,15 @@
+import sys
+import os
 import pandas as pd
 import requests
 import json
 from pathlib import Path
 
-BASE_URL = "http://localhost:8000/api"
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
-def parse_item_name(market_hash_name: str):
-    """Parse item name to get components"""
-    parts = market_hash_name.split('|')
-    if len(parts) == 2:
-        weapon_type = parts[0].strip()
-        rest = parts[1].strip()
-        
-        if '(' in rest:
-            skin_name = rest[:rest.rfind('(')].strip()
-            wear = rest[rest.rfind('(')+1:rest.rfind(')')].strip()
-        else:
-            skin_name = rest
-            wear = "Not Applicable"
-            
-        return {
-            "market_hash_name": market_hash_name,
-            "weapon_type": weapon_type,
-            "skin_name": skin_name,
-            "wear": wear,
-            "item_type": "knife" if "★" in weapon_type else "weapon"
-        }
-    return None
+from app.services.item_names import parse_item_name
+
+BASE_URL = "http://localhost:8000/api"
 
 def test_with_csv_data():
     """Test backend with real CS2 skin data"""
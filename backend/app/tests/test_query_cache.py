@@ -0,0 +1,103 @@
+import sys
+import os
+import asyncio
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.services import cache_versions, query_cache
+from app.services.cache_versions import QUERIES, SharedVersion, bump_cache_versions
+from app.services.query_cache import QueryCache
+
+def test_key_ignores_param_order_and_unset_params():
+    assert QueryCache.make_key('skins', {'wear': 'Field-Tested', 'sort_by': 'name', 'weapon_type': None}) == \
+        QueryCache.make_key('skins', {'sort_by': 'name', 'wear': 'Field-Tested'})
+    assert QueryCache.make_key('analytics') == 'analytics'
+
+def test_cached_loads_once_and_counts_hits():
+    cache = QueryCache(ttl=60)
+    loads = []
+
+    async def load():
+        loads.append(1)
+        return {'rows': len(loads)}
+
+    async def run():
+        first = await cache.cached('analytics', None, load)
+        second = await cache.cached('analytics', None, load)
+        return first, second
+
+    assert asyncio.run(run()) == ({'rows': 1}, {'rows': 1})
+    assert len(loads) == 1
+    assert cache.stats() == {'entries': 1, 'hits': 1, 'misses': 1, 'hit_rate': 0.5, 'invalidations': 0}
+
+def test_item_writes_drop_that_item_and_aggregates_only():
+    cache = QueryCache(ttl=60)
+    cache.set('price_analysis?item_id=1', 'one', item_id=1)
+    cache.set('price_analysis?item_id=2', 'two', item_id=2)
+    cache.set('skins', 'all')
+
+    cache.invalidate([1, 3])
+    assert cache.get('price_analysis?item_id=1') == (False, None)
+    assert cache.get('skins') == (False, None)
+    assert cache.get('price_analysis?item_id=2') == (True, 'two')
+
+    cache.invalidate()
+    assert len(cache) == 0
+
+def test_result_loaded_across_an_invalidation_is_not_stored():
+    cache = QueryCache(ttl=60)
+
+    async def load():
+        cache.invalidate([7])
+        return 'stale'
+
+    assert asyncio.run(cache.cached('skins', None, load)) == 'stale'
+    assert len(cache) == 0
+
+def test_entries_expire_and_least_recently_used_is_evicted():
+    cache = QueryCache(ttl=0)
+    cache.set('skins', 'all')
+    assert cache.get('skins') == (False, None)
+
+    cache = QueryCache(ttl=60, max_entries=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    assert cache.get('b') == (False, None)
+    assert cache.get('a') == (True, 1)
+
+def test_writes_from_another_process_drop_cached_results(monkeypatch, fake_conn, fake_pool):
+    table = fake_conn()     # cache_versions shared by the simulated processes
+    monkeypatch.setattr(query_cache, 'get_pool', lambda: fake_pool(table))
+    web = QueryCache(ttl=60, shared=SharedVersion(QUERIES, check_interval=0))
+    other_web = QueryCache(ttl=60, shared=SharedVersion(QUERIES, check_interval=0))
+    rows = ['before']
+
+    async def load():
+        return list(rows)
+
+    async def run():
+        first = [await web.cached('skins', None, load), await other_web.cached('skins', None, load)]
+        rows[0] = 'after'
+        unchanged = [await web.cached('skins', None, load), await other_web.cached('skins', None, load)]
+        bump_cache_versions(table, QUERIES)     # a collector committing a chunk
+        changed = [await web.cached('skins', None, load), await other_web.cached('skins', None, load)]
+        return first, unchanged, changed
+
+    first, unchanged, changed = asyncio.run(run())
+    assert first == unchanged == [['before'], ['before']]
+    assert changed == [['after'], ['after']]
+    assert web.shared.changes == other_web.shared.changes == 1
+    assert web.stats()['shared_version'] == 1
+
+def test_shared_version_is_only_reread_after_the_check_interval(monkeypatch, fake_conn):
+    table = fake_conn()
+    shared = SharedVersion(QUERIES, check_interval=60)
+    assert shared.changed(table)
+    bump_cache_versions(table, QUERIES)
+    assert not shared.changed(table)
+
+    monkeypatch.setattr(cache_versions.time, 'monotonic', lambda: float('inf'))
+    assert shared.changed(table)
+    assert shared.version == 1
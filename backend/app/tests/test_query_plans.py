@@ -0,0 +1,105 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.services.query_plans import PlanCapture, find_plan_problems, summarize_plan
+
+def scan(node_type, relation, rows, removed=0, index=None, loops=1):
+    node = {'Node Type': node_type, 'Relation Name': relation, 'Actual Rows': rows,
+            'Rows Removed by Filter': removed, 'Actual Loops': loops}
+    if index:
+        node['Index Name'] = index
+    return node
+
+def explain(*children, time_ms=1.0):
+    return {
+        'Plan': {'Node Type': 'Append', 'Actual Rows': 10, 'Shared Hit Blocks': 7, 'Shared Read Blocks': 3,
+                 'Plans': list(children)},
+        'Planning Time': 0.2,
+        'Execution Time': time_ms,
+    }
+
+def planned(fake_conn, autocommit=False):
+    return fake_conn({'EXPLAIN': [([explain(scan('Seq Scan', 'items', 5))],)]}, autocommit=autocommit)
+
+def test_summary_collapses_partitions_and_counts_seq_scan_rows():
+    summary = summarize_plan(explain(
+        scan('Index Scan', 'price_history_2024_04', 5, index='price_history_2024_04_item_id_timestamp_idx'),
+        scan('Index Scan', 'price_history_2024_05', 9, index='price_history_2024_05_item_id_timestamp_idx'),
+        scan('Seq Scan', 'price_candles_daily', 100, removed=900, loops=2),
+        time_ms=12.5,
+    ))
+    assert summary['shape'] == [
+        'Append',
+        '  Index Scan on price_history_* using price_history_*_item_id_timestamp_idx',
+        '  Seq Scan on price_candles_daily',
+    ]
+    assert summary['seq_scans'] == {'price_candles_daily': 2000}
+    assert summary['execution_ms'] == 12.5
+    assert summary['shared_hit_blocks'] + summary['shared_read_blocks'] == 10
+
+def test_capture_explains_in_a_savepoint_then_runs_the_statement(fake_conn):
+    conn = planned(fake_conn)
+    capture = PlanCapture(conn)
+    with capture.label('web.items'):
+        cur = capture.cursor()
+        cur.execute("SELECT * FROM items WHERE item_id = %s", (4,))
+        cur.copy_expert("COPY price_history FROM STDIN", None)
+
+    assert conn.statements() == [
+        'SAVEPOINT plan_capture',
+        'EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) SELECT * FROM items WHERE item_id = 4',
+        'ROLLBACK TO SAVEPOINT plan_capture',
+        'SELECT * FROM items WHERE item_id = %s',
+        'COPY price_history FROM STDIN',
+    ]
+    assert [statement['key'] for statement in capture.statements] == ['web.items#0', 'web.items#1']
+    assert capture.statements[0]['seq_scans'] == {'items': 5}
+    assert 'shape' not in capture.statements[1]
+
+def test_capture_on_autocommit_wraps_plan_in_a_transaction_and_skips_utility_statements(fake_conn):
+    conn = planned(fake_conn, autocommit=True)
+    cur = PlanCapture(conn).cursor()
+    cur.execute("-- refresh\nUPDATE items SET volume = 1")
+    cur.execute("CREATE TABLE IF NOT EXISTS t (x int)")
+    assert conn.statements() == [
+        'BEGIN',
+        'EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) -- refresh UPDATE items SET volume = 1',
+        'ROLLBACK',
+        '-- refresh UPDATE items SET volume = 1',
+        'CREATE TABLE IF NOT EXISTS t (x int)',
+    ]
+
+def test_commit_rolls_back_unless_writes_are_kept(fake_conn):
+    conn = planned(fake_conn)
+    PlanCapture(conn, keep_writes=False).commit()
+    PlanCapture(conn).commit()
+    assert (conn.rollbacks, conn.commits) == (1, 1)
+
+def statement(key, ms, shape, seq_scans=None):
+    return {'key': key, 'execution_ms': ms, 'shape': shape, 'seq_scans': seq_scans or {}}
+
+def test_problems_flag_new_seq_scans_slowdowns_and_plan_changes():
+    baseline = [
+        statement('a#0', 10.0, ['Index Scan on items']),
+        statement('b#0', 10.0, ['Seq Scan on items'], {'items': 200000}),
+        statement('c#0', 10.0, ['Index Scan on latest_prices']),
+    ]
+    current = [
+        statement('a#0', 11.0, ['Index Scan on items']),
+        statement('b#0', 12.0, ['Seq Scan on items'], {'items': 200000}),
+        statement('c#0', 40.0, ['Seq Scan on latest_prices'], {'latest_prices': 60000}),
+        statement('d#0', 1.0, ['Seq Scan on price_history'], {'price_history': 10}),
+        {'key': 'copy#0', 'wall_ms': 5.0},
+    ]
+    problems = find_plan_problems(current, baseline, seq_scan_rows=50000)
+    assert problems == [
+        'c#0: sequential scan of latest_prices over 60000 rows',
+        'c#0: 10.0ms -> 40.0ms (+300%)',
+        'c#0: plan changed from [Index Scan on latest_prices] to [Seq Scan on latest_prices]',
+    ]
+
+def test_problems_without_baseline_only_flag_large_seq_scans():
+    problems = find_plan_problems([statement('b#0', 500.0, ['Seq Scan on items'], {'items': 200000})])
+    assert problems == ['b#0: sequential scan of items over 200000 rows']
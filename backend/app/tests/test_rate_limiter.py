@@ -0,0 +1,42 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.services.rate_limiter import RateLimiter, TokenBucket, parse_retry_after
+
+def test_bucket_allows_burst_then_spaces_requests():
+    bucket = TokenBucket(rate=2.0, capacity=3)
+    waits = [bucket._reserve() for _ in range(5)]
+    assert waits[:3] == [0.0, 0.0, 0.0]
+    assert 0.4 < waits[3] <= 0.5
+    assert 0.9 < waits[4] <= 1.0
+
+def test_throttle_halves_rate_and_blocks():
+    bucket = TokenBucket(rate=4.0, capacity=4)
+    delay = bucket.on_throttle(retry_after=2.0)
+    assert delay == 2.0
+    assert bucket.rate == 2.0
+    assert bucket._reserve() > 1.5
+
+def test_success_recovers_rate_up_to_ceiling():
+    bucket = TokenBucket(rate=4.0, capacity=4)
+    bucket.on_throttle(retry_after=0)
+    for _ in range(100):
+        bucket.on_success()
+    assert bucket.rate == 4.0
+
+def test_limiter_uses_one_bucket_per_host():
+    limiter = RateLimiter(limits={'buff.163.com': (5.0, 10)})
+    buff = limiter.bucket_for('https://buff.163.com/api/market/goods')
+    assert buff is limiter.bucket_for('https://buff.163.com/api/market/goods/buying')
+    assert buff.capacity == 10
+    assert limiter.bucket_for('https://steamcommunity.com/market/') is not buff
+    assert limiter.record_response('https://buff.163.com/api/market/goods', 429, '1')
+    assert not limiter.record_response('https://buff.163.com/api/market/goods', 200)
+
+def test_parse_retry_after():
+    assert parse_retry_after('7') == 7.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') == 0.0
+    assert parse_retry_after('garbage') is None
@@ -0,0 +1,66 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.services.refresh_scheduler import RefreshScheduler
+
+def make_item(item_id, volatility=None, volume=None, last_refreshed=None):
+    return {
+        'item_id': item_id,
+        'market_hash_name': f'item {item_id}',
+        'volatility': volatility,
+        'volume': volume,
+        'last_refreshed': last_refreshed
+    }
+
+def test_volatile_liquid_items_refresh_sooner():
+    scheduler = RefreshScheduler(min_interval=300, max_interval=21600)
+    knife = scheduler.refresh_interval(volatility=0.08, volume=5000)
+    sticker = scheduler.refresh_interval(volatility=0.001, volume=2)
+    assert knife == 300
+    assert sticker > 10000
+    assert scheduler.refresh_interval(None, None) == 21600
+
+def test_pop_due_returns_most_overdue_first_within_budget():
+    scheduler = RefreshScheduler(min_interval=300, max_interval=21600)
+    now = 100000.0
+    scheduler.schedule(make_item(1, volatility=0.001, volume=1, last_refreshed=now - 600), now)
+    scheduler.schedule(make_item(2, volatility=0.1, volume=5000, last_refreshed=now - 600), now)
+    scheduler.schedule(make_item(3), now)
+    scheduler.schedule(make_item(4, volatility=0.1, volume=5000, last_refreshed=now - 400), now)
+
+    batch = scheduler.pop_due(limit=2, now=now)
+    assert [item['item_id'] for item in batch] == [2, 4]
+    assert [item['item_id'] for item in scheduler.pop_due(limit=10, now=now)] == [3]
+    assert scheduler.pop_due(limit=10, now=now) == []
+    assert len(scheduler) == 1
+
+def test_rescheduling_replaces_the_previous_due_time():
+    scheduler = RefreshScheduler(min_interval=300, max_interval=21600)
+    now = 100000.0
+    scheduler.schedule(make_item(1), now)
+    scheduler.schedule(make_item(1, volatility=0.1, volume=5000), now, attempted=True)
+
+    assert scheduler.pop_due(limit=10, now=now) == []
+    assert scheduler.next_due_in(now) == 300
+    assert [item['item_id'] for item in scheduler.pop_due(limit=10, now=now + 300)] == [1]
+
+def test_failed_refreshes_back_off_until_one_succeeds():
+    scheduler = RefreshScheduler(min_interval=300, max_interval=21600, retry_delay=60)
+    now = 100000.0
+    scheduler.schedule(make_item(1), now)
+    item = scheduler.pop_due(limit=10, now=now)[0]
+
+    delays = []
+    for _ in range(10):
+        scheduler.retry([item], now)
+        delays.append(scheduler.next_due_in(now))
+        assert scheduler.pop_due(limit=10, now=now + delays[-1]) == [item]
+    assert delays[:4] == [60, 120, 240, 480]
+    assert delays[-1] == 21600
+
+    scheduler.schedule(make_item(1, volatility=0.1, volume=5000), now, attempted=True)
+    scheduler.pop_due(limit=10, now=now + 300)
+    scheduler.retry([item], now)
+    assert scheduler.next_due_in(now) == 60
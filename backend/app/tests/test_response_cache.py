@@ -0,0 +1,46 @@
+import sys
+import os
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.services.response_cache import ResponseCache
+
+GOODS_URL = 'https://buff.163.com/api/market/goods'
+
+def test_key_ignores_param_order():
+    cache = ResponseCache(ttls={GOODS_URL: 60})
+    cache.set(GOODS_URL, {'game': 'csgo', 'search': 'Prisma Case'}, {'code': 'OK'})
+    assert cache.get(GOODS_URL, {'search': 'Prisma Case', 'game': 'csgo'}) == {'code': 'OK'}
+    assert cache.get(GOODS_URL, {'search': 'Revolution Case', 'game': 'csgo'}) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_entries_expire_per_endpoint_ttl():
+    cache = ResponseCache(ttls={GOODS_URL: 60, 'https://steamcommunity.com/': 0})
+    cache.set('https://steamcommunity.com/market/priceoverview/', {'a': 1}, {'success': True})
+    assert len(cache) == 0
+
+    cache.set(GOODS_URL, {'page_num': 1}, {'code': 'OK'})
+    key = cache.make_key(GOODS_URL, {'page_num': 1})
+    cache._entries[key] = (time.time() - 1, {'code': 'OK'})
+    assert cache.get(GOODS_URL, {'page_num': 1}) is None
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache(max_entries=2, ttls={GOODS_URL: 60})
+    cache.set(GOODS_URL, {'page_num': 1}, 1)
+    cache.set(GOODS_URL, {'page_num': 2}, 2)
+    cache.get(GOODS_URL, {'page_num': 1})
+    cache.set(GOODS_URL, {'page_num': 3}, 3)
+
+    assert cache.get(GOODS_URL, {'page_num': 2}) is None
+    assert cache.get(GOODS_URL, {'page_num': 1}) == 1
+    assert cache.get(GOODS_URL, {'page_num': 3}) == 3
+
+def test_round_trips_through_disk(tmp_path):
+    path = str(tmp_path / 'cache.json')
+    cache = ResponseCache(path=path, ttls={GOODS_URL: 60})
+    cache.set(GOODS_URL, {'page_num': 1}, {'code': 'OK', 'data': {'items': []}})
+    cache.save()
+
+    reloaded = ResponseCache(path=path, ttls={GOODS_URL: 60})
+    assert reloaded.get(GOODS_URL, {'page_num': 1}) == {'code': 'OK', 'data': {'items': []}}
@@ -0,0 +1,97 @@
+import sys
+import os
+import asyncio
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))), 'scripts'))
+
+from app.services.refresh_scheduler import RefreshScheduler
+
+ITEMS = [{'item_id': 1, 'market_hash_name': 'AK-47 | Redline (Field-Tested)'},
+         {'item_id': 2, 'market_hash_name': 'AWP | Asiimov (Field-Tested)'}]
+
+class Scheduler(RefreshScheduler):
+    """Schedules ITEMS without a database and retries failures immediately"""
+    rescheduled = []
+
+    def __init__(self):
+        super().__init__(retry_delay=0)
+
+    def load(self, conn, now=None):
+        for item in ITEMS:
+            self.schedule(dict(item), 0)
+
+    def reschedule(self, conn, item_ids, now=None):
+        Scheduler.rescheduled.append(list(item_ids))
+
+class FakeCollector:
+    """Fails, then loses the sweep, then collects"""
+    instances = []
+
+    def __init__(self):
+        self.results = [RuntimeError('buff is down'), False, True]
+        self.batches = []
+        self.closed = 0
+        FakeCollector.instances.append(self)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def close(self):
+        self.closed += 1
+
+    async def collect_and_store_prices(self, items=None):
+        self.batches.append([item['item_id'] for item in items])
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+class StopLoop(Exception):
+    pass
+
+@pytest.fixture
+def run_collection(tmp_path, monkeypatch):
+    # Importing the script opens price_collection.log in the working directory
+    monkeypatch.chdir(tmp_path)
+    import run_collection
+    return run_collection
+
+def test_refresh_loop_keeps_failed_batches_due_and_reuses_one_collector(run_collection, monkeypatch,
+                                                                       fake_conn, fake_pool):
+    sleeps = []
+
+    async def sleep(seconds):
+        sleeps.append(seconds)
+        if len(sleeps) == 3:
+            raise StopLoop()
+
+    # Another process holds the analytics refresh lock, so successful batches skip the snapshot
+    pool = fake_pool(fake_conn({'pg_try_advisory_xact_lock': [(False,)]}))
+    monkeypatch.setattr(run_collection, 'get_pool', lambda: pool)
+    monkeypatch.setattr(run_collection, 'verify_collection', lambda: True)
+    monkeypatch.setattr(run_collection, 'RefreshScheduler', Scheduler)
+    monkeypatch.setattr(run_collection, 'PriceCollector', FakeCollector)
+    monkeypatch.setattr(run_collection.asyncio, 'sleep', sleep)
+    Scheduler.rescheduled = []
+    FakeCollector.instances = []
+
+    with pytest.raises(StopLoop):
+        asyncio.run(run_collection.run_refresh_loop())
+
+    collector, = FakeCollector.instances
+    assert collector.batches == [[1, 2], [1, 2], [1, 2]]
+    assert Scheduler.rescheduled == [[1, 2]]
+    assert collector.closed == 1
+
+def test_scheduled_collection_reports_failure_and_closes_its_own_collector(run_collection, monkeypatch):
+    monkeypatch.setattr(run_collection, 'PriceCollector', FakeCollector)
+    FakeCollector.instances = []
+
+    assert asyncio.run(run_collection.run_scheduled_collection(ITEMS)) is False
+    assert FakeCollector.instances[0].closed == 1
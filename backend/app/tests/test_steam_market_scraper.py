@@ -0,0 +1,45 @@
+import sys
+import os
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.services.rate_limiter import RateLimiter
+from app.services.steam_market_scraper import AsyncSteamMarketPrices, SteamMarketPrices, parse_price, parse_volume
+
+def test_parse_price_handles_steam_currency_formats():
+    assert parse_price('$1,234.56') == 1234.56
+    assert parse_price('1.234,56€') == 1234.56
+    assert parse_price('12,34€') == 12.34
+    assert parse_price('¥ 15.20') == 15.2
+    assert parse_price(None) is None
+    assert parse_price('--') is None
+
+def test_parse_volume():
+    assert parse_volume('1,234') == 1234
+    assert parse_volume(None) is None
+
+@pytest.mark.asyncio
+async def test_get_multiple_prices_keeps_input_names_as_keys():
+    async def fake_price(name, appid=730):
+        return None if name == 'missing' else {'item_name': name, 'success': True, 'lowest_price': '$1.00'}
+
+    client = AsyncSteamMarketPrices()
+    client.get_item_price = fake_price
+    prices = await client.get_multiple_prices(['Prisma Case', 'missing'])
+
+    assert list(prices) == ['Prisma Case', 'missing']
+    assert prices['Prisma Case']['lowest_price'] == '$1.00'
+    assert prices['missing'] is None
+
+def test_rate_limit_delay_paces_only_its_own_client(monkeypatch):
+    limiter = RateLimiter(limits={}, default=(10, 10))
+    monkeypatch.setattr('app.services.steam_market_scraper.get_rate_limiter', lambda: limiter)
+    fast = SteamMarketPrices()
+    shared = limiter.bucket_for(fast.price_url)
+    slow = SteamMarketPrices(rate_limit_delay=2)
+
+    assert limiter.bucket_for(slow.price_url) is shared
+    assert shared.rate == 10
+    assert slow.pacer.rate == 0.5
+    assert fast.pacer is None
@@ -5,10 +5,16 @@ from tabulate import tabulate
 def view_database_content():
     """View all items in the database in a formatted table"""
     try:
-        response = requests.get("http://localhost:8000/api/items")
+        items = []
+        url = "http://localhost:8000/api/items?limit=1000"
+        while url:
+            response = requests.get(url)
+            if response.status_code != 200:
+                break
+            items.extend(response.json())
+            url = response.links.get('next', {}).get('url')
+
         if response.status_code == 200:
-            items = response.json()
-            
             if not items:
                 print("No items found in database!")
                 return
@@ -0,0 +1,244 @@
+import os
+import sys
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(Path(__file__).parent))
+
+import argparse
+import asyncio
+import io
+import json
+import logging
+import platform
+import resource
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from multiprocessing import get_context
+from typing import Dict, List, Optional
+
+import psycopg2
+
+logging.basicConfig(
+    level=logging.WARNING,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger('benchmark_collector')
+
+WEARS = ['Factory New', 'Minimal Wear', 'Field-Tested', 'Well-Worn', 'Battle-Scarred']
+
+
+def bench_db_params() -> Dict:
+    """Benchmark database; it is truncated on every scenario, so it must not be the app database"""
+    return {
+        'host': os.getenv('BENCH_DB_HOST', os.getenv('DB_HOST', 'localhost')),
+        'database': os.getenv('BENCH_DB_NAME', 'cs2skins_bench'),
+        'user': os.getenv('BENCH_DB_USER', os.getenv('DB_USER')),
+        'password': os.getenv('BENCH_DB_PASSWORD', os.getenv('DB_PASSWORD')),
+        'port': os.getenv('BENCH_DB_PORT', os.getenv('DB_PORT', '5432'))
+    }
+
+
+def catalog_names(count: int) -> List[str]:
+    return [f"Bench-{n // len(WEARS):06d} | Skin {n % 97} ({WEARS[n % len(WEARS)]})" for n in range(count)]
+
+
+def seed_items(conn, names: List[str]):
+    """Reset the benchmark tables and bulk-load the item catalog"""
+    from backend.app.models.database import Base
+    from sqlalchemy import create_engine
+
+    params = bench_db_params()
+    engine = create_engine(
+        f"postgresql://{params['user']}:{params['password'] or ''}@{params['host']}:{params['port']}/{params['database']}"
+    )
+    Base.metadata.create_all(engine)
+    engine.dispose()
+
+    cur = conn.cursor()
+    cur.execute("TRUNCATE items, price_history, collection_runs RESTART IDENTITY CASCADE")
+    rows = io.StringIO()
+    created_at = datetime.now(timezone.utc).isoformat()
+    for name in names:
+        weapon, rest = name.split(' | ')
+        skin, wear = rest[:-1].split(' (')
+        rows.write(f"{name}\tweapon\t{weapon}\t{skin}\t{wear}\t{created_at}\n")
+    rows.seek(0)
+    cur.copy_expert(
+        "COPY items (market_hash_name, item_type, weapon_type, skin_name, wear, created_at) FROM STDIN",
+        rows
+    )
+    conn.commit()
+    cur.close()
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def _run_scenario(items: int, mode: str, concurrency: int, latency_ms: float,
+                        error_rate: float, throttle_rate: float, rate: float, port: int) -> Dict:
+    from mock_market_server import MockMarket, start_server
+
+    names = catalog_names(items)
+    conn = psycopg2.connect(**bench_db_params())
+    try:
+        seed_items(conn, names)
+    finally:
+        conn.close()
+
+    market = MockMarket(catalog=names, latency_ms=latency_ms, jitter_ms=latency_ms / 4,
+                        error_rate=error_rate, throttle_rate=throttle_rate, retry_after=0.05, seed=42)
+    runner = await start_server(market, port=port)
+
+    from backend.app.services.price_collector import PriceCollector
+    from backend.app.services.rate_limiter import get_rate_limiter
+    get_rate_limiter().configure(f"127.0.0.1:{port}", rate, max(1, int(rate)))
+
+    collector = PriceCollector(concurrency=concurrency, mode=mode)
+    latencies: List[float] = []
+    make_request = collector.buff_parser._make_request
+
+    async def timed_request(url, params):
+        started = time.perf_counter()
+        try:
+            return await make_request(url, params)
+        finally:
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    collector.buff_parser._make_request = timed_request
+
+    started = time.perf_counter()
+    try:
+        await collector.collect_and_store_prices()
+    finally:
+        await collector.close()
+        await runner.cleanup()
+    elapsed = time.perf_counter() - started
+
+    stats = collector.last_run_stats
+    return {
+        'items': items,
+        'mode': mode,
+        'elapsed_seconds': round(elapsed, 3),
+        'items_per_sec': round(stats.get('items', 0) / elapsed, 1) if elapsed else None,
+        'prices_written': stats.get('prices_written'),
+        'upstream_requests': len(latencies),
+        'fetch_latency_ms': {
+            'p50': round(percentile(latencies, 50) or 0, 2),
+            'p99': round(percentile(latencies, 99) or 0, 2)
+        },
+        'db_write_seconds': round(stats.get('db_write_seconds', 0), 3),
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'mock_market': dict(market.stats)
+    }
+
+
+def run_scenario(*args) -> Dict:
+    """Run one scenario in a fresh process so peak memory is not shared between sizes"""
+    os.environ['SCRAPER_CACHE_PATH'] = ''
+    os.environ['BUFF_BASE_URL'] = f"http://127.0.0.1:{args[-1]}"
+    params = bench_db_params()
+    os.environ.update({
+        'DB_HOST': params['host'],
+        'DB_NAME': params['database'],
+        'DB_USER': params['user'] or '',
+        'DB_PASSWORD': params['password'] or '',
+        'DB_PORT': str(params['port'])
+    })
+    return asyncio.run(_run_scenario(*args))
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=project_root,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def find_regressions(results: List[Dict], baseline: Dict, threshold: float) -> List[str]:
+    """Compare against a previous results file; lower throughput or higher latency/write time is worse"""
+    previous = {(r['items'], r['mode']): r for r in baseline.get('results', [])}
+    regressions = []
+    for result in results:
+        before = previous.get((result['items'], result['mode']))
+        if not before:
+            continue
+        checks = [
+            ('items_per_sec', result['items_per_sec'], before['items_per_sec'], False),
+            ('fetch p99 ms', result['fetch_latency_ms']['p99'], before['fetch_latency_ms']['p99'], True),
+            ('db_write_seconds', result['db_write_seconds'], before['db_write_seconds'], True),
+        ]
+        for name, now, then, higher_is_worse in checks:
+            if not now or not then:
+                continue
+            change = (now - then) / then
+            if (change > threshold) if higher_is_worse else (change < -threshold):
+                regressions.append(f"{result['mode']} x{result['items']}: {name} {then} -> {now} ({change:+.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PriceCollector against a local mock market and Postgres")
+    parser.add_argument('--items', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--modes', nargs='+', default=['search', 'crawl'], choices=['search', 'crawl'])
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--latency-ms', type=float, default=20)
+    parser.add_argument('--error-rate', type=float, default=0)
+    parser.add_argument('--throttle-rate', type=float, default=0)
+    parser.add_argument('--rate', type=float, default=2000, help="Requests/second allowed against the mock market")
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--output', default='collector_benchmark.json')
+    parser.add_argument('--baseline', help="Previous results file to compare against")
+    parser.add_argument('--threshold', type=float, default=0.1, help="Relative change counted as a regression")
+    args = parser.parse_args()
+
+    # Read the baseline up front: the report may not overwrite the file it is compared against
+    baseline = None
+    if args.baseline:
+        if os.path.realpath(args.baseline) == os.path.realpath(args.output):
+            parser.error("--output must differ from --baseline, or the baseline is overwritten before comparing")
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    results = []
+    for items in args.items:
+        for mode in args.modes:
+            print(f"Running {mode} collection over {items} items...")
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as pool:
+                result = pool.submit(run_scenario, items, mode, args.concurrency, args.latency_ms,
+                                     args.error_rate, args.throttle_rate, args.rate, args.port).result()
+            results.append(result)
+            print(f"  {result['items_per_sec']} items/s, fetch p50 {result['fetch_latency_ms']['p50']}ms "
+                  f"p99 {result['fetch_latency_ms']['p99']}ms, db write {result['db_write_seconds']}s, "
+                  f"peak {result['peak_rss_mb']}MB")
+
+    report = {
+        'revision': git_revision(),
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'config': {k: v for k, v in vars(args).items() if k not in ('output', 'baseline')},
+        'results': results
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if baseline is not None:
+        regressions = find_regressions(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
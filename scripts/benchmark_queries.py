@@ -0,0 +1,331 @@
+import os
+import sys
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+backend_root = project_root / 'backend'
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(backend_root))
+sys.path.insert(0, str(Path(__file__).parent))
+
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import subprocess
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+import psycopg2
+
+logging.basicConfig(
+    level=logging.WARNING,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger('benchmark_queries')
+
+
+def bench_db_params() -> Dict:
+    """Benchmark database; generating data truncates it, so it must not be the app database"""
+    return {
+        'host': os.getenv('BENCH_DB_HOST', os.getenv('DB_HOST', 'localhost')),
+        'database': os.getenv('BENCH_DB_NAME', 'cs2skins_bench'),
+        'user': os.getenv('BENCH_DB_USER', os.getenv('DB_USER')),
+        'password': os.getenv('BENCH_DB_PASSWORD', os.getenv('DB_PASSWORD')),
+        'port': os.getenv('BENCH_DB_PORT', os.getenv('DB_PORT', '5432'))
+    }
+
+
+def use_bench_db(port: int):
+    """Point every module (app pool, collector, scripts) at the benchmark database and mock market"""
+    params = bench_db_params()
+    os.environ.update({
+        'BUFF_BASE_URL': f"http://127.0.0.1:{port}",
+        'DB_HOST': params['host'],
+        'DB_NAME': params['database'],
+        'DB_USER': params['user'] or '',
+        'DB_PASSWORD': params['password'] or '',
+        'DB_PORT': str(params['port']),
+        'SCRAPER_CACHE_PATH': ''
+    })
+
+
+def generate(items: int, ticks: int, days: int, workers: int):
+    subprocess.run([sys.executable, str(project_root / 'scripts' / 'generate_market_data.py'),
+                    '--items', str(items), '--ticks', str(ticks), '--days', str(days),
+                    '--workers', str(workers), '--reset'], check=True)
+
+
+def sample_items(conn) -> Dict:
+    """A busy item, a quiet one, and filter values that exist in the data"""
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT item_id FROM price_candles_daily
+        GROUP BY item_id ORDER BY SUM(tick_count) DESC LIMIT 1
+    """)
+    busy = cur.fetchone()
+    cur.execute("""
+        SELECT item_id FROM price_candles_daily
+        GROUP BY item_id ORDER BY SUM(tick_count) ASC LIMIT 1
+    """)
+    quiet = cur.fetchone()
+    cur.execute("SELECT weapon_type, wear FROM items WHERE wear <> 'Not Applicable' ORDER BY item_id LIMIT 1")
+    weapon_type, wear = cur.fetchone() or ('AK-47', 'Field-Tested')
+    cur.close()
+    conn.rollback()
+    if not busy:
+        raise SystemExit("The benchmark database has no price data; run with --generate first")
+    return {'busy': busy[0], 'quiet': quiet[0], 'weapon_type': weapon_type, 'wear': wear}
+
+
+@contextmanager
+def capturing_pools(capture):
+    """Hand out the capture wrapper from every pool instance (app.* and backend.app.* import paths)"""
+    import app.services.db_pool as app_db_pool
+    import backend.app.services.db_pool as script_db_pool
+
+    @contextmanager
+    def connection():
+        yield capture
+
+    pools = [app_db_pool.get_pool(), script_db_pool.get_pool()]
+    for pool in pools:
+        pool.connection = connection
+    try:
+        yield
+    finally:
+        for pool in pools:
+            del pool.connection
+
+
+def web_scenarios(sample: Dict) -> List:
+    import app.main as main
+    from app.api.routes import items as items_routes, prices as prices_routes
+    from app.services.analytics_snapshots import compute_analytics
+    from app.services.config import API_PAGE_SIZE
+    from app.services.items import insert_item
+
+    new_item = dict(market_hash_name='Benchmark | Probe (Factory New)', item_type='weapon',
+                    weapon_type='Benchmark', skin_name='Probe', wear='Factory New')
+    return [
+        ('web.health', lambda conn: main._ping(conn)),
+        ('web.skin_detail.busy', lambda conn: main._load_skin_detail(conn, sample['busy'])),
+        ('web.skin_detail.quiet', lambda conn: main._load_skin_detail(conn, sample['quiet'])),
+        ('web.skins', lambda conn: main._load_skins(conn, None, None, None, None, 'name', 'asc')),
+        ('web.skins.filtered', lambda conn: main._load_skins(conn, sample['weapon_type'], sample['wear'],
+                                                             1, 100, 'price', 'desc')),
+        ('web.analytics', lambda conn: main._load_analytics(conn)),
+        ('analytics.snapshot', lambda conn: compute_analytics(conn)),
+        ('api.items.create', lambda conn: insert_item(conn, items_routes.ItemCreate(**new_item))),
+        ('api.items.list', lambda conn: items_routes._select_items(conn, API_PAGE_SIZE + 1)),
+        ('api.prices.list', lambda conn: prices_routes._select_items(conn, API_PAGE_SIZE + 1)),
+        ('api.prices.history.busy', lambda conn: prices_routes._select_price_history(conn, sample['busy'], 30, None)),
+        ('api.prices.history.buff', lambda conn: prices_routes._select_price_history(conn, sample['busy'], 7, 'buff')),
+        ('api.prices.history.candles', lambda conn: prices_routes._select_price_history(conn, sample['busy'], 90, None)),
+        ('api.prices.analysis', lambda conn: prices_routes._select_price_analysis(conn, sample['busy'])),
+    ]
+
+
+def compaction_cutoffs(conn) -> Dict:
+    """One day past where each compaction tier resumes, so a single representative step is captured"""
+    from app.services.compaction import day_start, get_watermark
+
+    cutoffs = {}
+    cur = conn.cursor()
+    for tier, oldest in (('raw', "SELECT MIN(timestamp) FROM price_history"),
+                         ('hourly', "SELECT MIN(bucket) FROM price_candles_hourly")):
+        start = get_watermark(conn, tier)
+        if start is None:
+            cur.execute(oldest)
+            start = cur.fetchone()[0]
+        if start is not None:
+            cutoffs[tier] = day_start(start) + timedelta(days=1)
+    cur.close()
+    conn.rollback()
+    return cutoffs
+
+
+def maintenance_scenarios(conn, sample: Dict) -> List:
+    """The collector's refresh scheduler and the partition and compaction jobs"""
+    from app.services.compaction import compact_hourly, compact_raw
+    from app.services.partitions import apply_retention, ensure_partitions
+    from app.services.refresh_scheduler import RefreshScheduler
+
+    cutoffs = compaction_cutoffs(conn)
+    scenarios = [
+        ('scheduler.load', lambda conn: RefreshScheduler().load(conn)),
+        ('scheduler.reschedule', lambda conn: RefreshScheduler().reschedule(conn, [sample['busy'], sample['quiet']])),
+        ('partitions.ensure', lambda conn: ensure_partitions(conn)),
+        ('partitions.retention', lambda conn: apply_retention(conn, retention_months=1, mode='detach')),
+    ]
+    if 'raw' in cutoffs:
+        scenarios.append(('compaction.raw', lambda conn: compact_raw(conn, cutoffs['raw'])))
+    if 'hourly' in cutoffs:
+        scenarios.append(('compaction.hourly', lambda conn: compact_hourly(conn, cutoffs['hourly'])))
+    return scenarios
+
+
+def run_scenarios(conn, scenarios: List) -> List[Dict]:
+    """Run scenarios on a capture that rolls back instead of committing, so the dataset is left as it was"""
+    from app.services.query_plans import PlanCapture
+
+    capture = PlanCapture(conn, keep_writes=False)
+    for name, scenario in scenarios:
+        with capture.label(name):
+            scenario(capture)
+        conn.rollback()
+    return capture.statements
+
+
+async def run_buff_parser(sample: Dict) -> List[Dict]:
+    """BuffParser's own read helpers, on autocommit connections like connect_db opens"""
+    from app.services.buff_parser import BuffParser
+    from app.services.query_plans import PlanCapture
+
+    statements = []
+    parser = BuffParser()
+
+    def connect_db():
+        conn = psycopg2.connect(**bench_db_params())
+        conn.autocommit = True
+        capture = PlanCapture(conn)
+        capture.scenario = parser_scenario
+        statements.append(capture)
+        return capture
+
+    parser.connect_db = connect_db
+    for parser_scenario, call in [
+        ('buff_parser.get_items', lambda: parser.get_items(limit=100)),
+        ('buff_parser.get_item', lambda: parser.get_item(sample['busy'])),
+        ('buff_parser.get_price_history', lambda: parser.get_price_history(sample['busy'])),
+    ]:
+        await call()
+    await parser.close()
+    return [statement for capture in statements for statement in capture.statements]
+
+
+async def run_collector(conn, port: int, rate: float) -> List[Dict]:
+    """A full sweep against the mock market, capturing every statement the collector and its verifier run"""
+    from mock_market_server import MockMarket, start_server
+    from app.services.price_collector import PriceCollector
+    from app.services.query_plans import PlanCapture
+    from app.services.rate_limiter import get_rate_limiter
+    import run_collection
+
+    cur = conn.cursor()
+    cur.execute("SELECT market_hash_name FROM items ORDER BY item_id")
+    names = [row[0] for row in cur.fetchall()]
+    cur.close()
+    conn.commit()
+
+    market = MockMarket(catalog=names, latency_ms=1, seed=42)
+    runner = await start_server(market, port=port)
+    get_rate_limiter().configure(f"127.0.0.1:{port}", rate, max(1, int(rate)))
+
+    capture = PlanCapture(conn)
+    try:
+        with capturing_pools(capture):
+            with capture.label('collector.sweep'):
+                async with PriceCollector(concurrency=32, mode='search') as collector:
+                    await collector.collect_and_store_prices()
+            with capture.label('collector.verify'):
+                run_collection.verify_collection()
+    finally:
+        await runner.cleanup()
+    return capture.statements
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=project_root,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_statement(statement: Dict):
+    if 'shape' not in statement:
+        print(f"  {statement['key']:<34} {statement['wall_ms']:>10.2f}ms wall  {statement['sql'][:60]}")
+        return
+    scans = ', '.join(f"{relation} ({rows})" for relation, rows in statement['seq_scans'].items())
+    print(f"  {statement['key']:<34} {statement['execution_ms']:>10.2f}ms  "
+          f"{statement['shared_hit_blocks'] + statement['shared_read_blocks']:>8} blocks"
+          + (f"  seq scan: {scans}" if scans else ''))
+
+
+def main():
+    """EXPLAIN (ANALYZE, BUFFERS) every web, API, collector and maintenance query against a large synthetic dataset"""
+    parser = argparse.ArgumentParser(description="Query-plan regression benchmark")
+    parser.add_argument('--generate', action='store_true', help="(Re)generate the benchmark dataset first")
+    parser.add_argument('--items', type=int, default=10000)
+    parser.add_argument('--ticks', type=int, default=10_000_000)
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--skip-collector', action='store_true', help="Only benchmark the read paths")
+    parser.add_argument('--port', type=int, default=8767)
+    parser.add_argument('--rate', type=float, default=5000, help="Requests/second allowed against the mock market")
+    parser.add_argument('--seq-scan-rows', type=int, default=50000,
+                        help="Flag sequential scans reading at least this many rows")
+    parser.add_argument('--output', default='query_benchmark.json')
+    parser.add_argument('--baseline', help="Previous results file to compare against")
+    parser.add_argument('--threshold', type=float, default=0.5, help="Relative slowdown counted as a regression")
+    parser.add_argument('--min-delta-ms', type=float, default=5.0, help="Ignore slowdowns smaller than this")
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output)
+    # Read the baseline up front: the report may not overwrite the file it is compared against
+    baseline = None
+    if args.baseline:
+        if os.path.realpath(args.baseline) == os.path.realpath(output):
+            parser.error("--output must differ from --baseline, or the baseline is overwritten before comparing")
+        with open(args.baseline) as f:
+            baseline = json.load(f)['statements']
+    use_bench_db(args.port)
+    if args.generate:
+        generate(args.items, args.ticks, args.days, args.workers)
+
+    # main.py resolves its templates and static files relative to the backend directory
+    os.chdir(backend_root)
+    conn = psycopg2.connect(**bench_db_params())
+    try:
+        sample = sample_items(conn)
+        statements = run_scenarios(conn, web_scenarios(sample) + maintenance_scenarios(conn, sample))
+        statements += asyncio.run(run_buff_parser(sample))
+        if not args.skip_collector:
+            statements += asyncio.run(run_collector(conn, args.port, args.rate))
+        cur = conn.cursor()
+        cur.execute("SELECT (SELECT COUNT(*) FROM items), (SELECT COUNT(*) FROM price_history)")
+        items, ticks = cur.fetchone()
+        cur.close()
+    finally:
+        conn.close()
+
+    print(f"{len(statements)} statements over {items} items / {ticks} ticks")
+    for statement in statements:
+        print_statement(statement)
+
+    report = {
+        'revision': git_revision(),
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'dataset': {'items': items, 'ticks': ticks},
+        'config': {k: v for k, v in vars(args).items() if k not in ('output', 'baseline')},
+        'statements': statements
+    }
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+    from app.services.query_plans import find_plan_problems
+    problems = find_plan_problems(statements, baseline, seq_scan_rows=args.seq_scan_rows,
+                                  threshold=args.threshold, min_delta_ms=args.min_delta_ms)
+    for problem in problems:
+        print(f"FLAG {problem}")
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
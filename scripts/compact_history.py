@@ -0,0 +1,42 @@
+import sys
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import argparse
+import json
+import logging
+from sqlalchemy import create_engine
+from backend.app.models.database import CompactionState
+from backend.app.services.compaction import run_compaction
+from backend.app.services.db_pool import get_pool, get_db_params
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+def main():
+    """Compact aged raw ticks into candles and hourly candles into daily ones (safe to rerun or interrupt)"""
+    parser = argparse.ArgumentParser(description="Downsample and delete aged price history")
+    parser.add_argument('--raw-days', type=int, help="Days of raw ticks to keep (default RAW_TICK_RETENTION_DAYS)")
+    parser.add_argument('--hourly-days', type=int,
+                        help="Days of hourly candles to keep (default HOURLY_CANDLE_RETENTION_DAYS)")
+    parser.add_argument('--vacuum', action='store_true', help="VACUUM afterwards so deleted rows are reusable")
+    args = parser.parse_args()
+
+    params = get_db_params()
+    engine = create_engine(
+        f"postgresql://{params['user']}:{params['password'] or ''}@{params['host']}:{params['port']}/{params['database']}"
+    )
+    CompactionState.__table__.create(engine, checkfirst=True)
+    engine.dispose()
+
+    with get_pool().connection() as conn:
+        report = run_compaction(conn, raw_days=args.raw_days, hourly_days=args.hourly_days, vacuum=args.vacuum)
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
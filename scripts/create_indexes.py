@@ -0,0 +1,37 @@
+import sys
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import logging
+from sqlalchemy import create_engine, inspect
+from backend.app.models.database import Base, CacheVersion
+from backend.app.services.db_pool import get_db_params
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+def main():
+    """Create tables and indexes declared on the models that an existing database is missing"""
+    params = get_db_params()
+    engine = create_engine(
+        f"postgresql://{params['user']}:{params['password'] or ''}@{params['host']}:{params['port']}/{params['database']}"
+    )
+    CacheVersion.__table__.create(engine, checkfirst=True)
+    existing_tables = set(inspect(engine).get_table_names())
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {index['name'] for index in inspect(engine).get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                logger.info(f"Creating {index.name} on {table.name}")
+                index.create(engine)
+    engine.dispose()
+
+if __name__ == "__main__":
+    main()
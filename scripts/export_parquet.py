@@ -0,0 +1,32 @@
+import sys
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import argparse
+import logging
+from datetime import date
+from backend.app.services.db_pool import get_pool
+from backend.app.services.parquet_archive import export_history
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+def main():
+    """Append completed days of price_history to the Parquet archive (run daily, before compaction)"""
+    parser = argparse.ArgumentParser(description="Export price_history to Parquet, partitioned by date and source")
+    parser.add_argument('--root', help="Archive directory (default PARQUET_ARCHIVE_PATH)")
+    parser.add_argument('--since', type=date.fromisoformat,
+                        help="First UTC day to (re)export, YYYY-MM-DD (default: newest archived day)")
+    parser.add_argument('--until', type=date.fromisoformat, help="Stop before this UTC day (default: today)")
+    args = parser.parse_args()
+
+    with get_pool().connection() as conn:
+        export_history(conn, root=args.root, since=args.since, until=args.until)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+import sys
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import argparse
+import io
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+
+import numpy as np
+import psycopg2
+from sqlalchemy import create_engine
+from backend.app.models.database import Base
+from backend.app.services.candles import CANDLE_TABLES, bucket_start, rebuild_candles
+from backend.app.services.db_pool import get_db_params
+from backend.app.services.market_generator import (
+    MarketSimulator, base_price, build_catalog, item_fields, split_evenly, tick_share, ticks_per_day,
+    to_binary_copy
+)
+from backend.app.services.partitions import ensure_partitions
+from backend.app.services.price_writer import PRICE_HISTORY_COLUMNS, rebuild_latest_prices, to_copy_buffer
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+GENERATED_TABLES = ('items', 'price_history', 'latest_prices', 'price_candles_hourly', 'price_candles_daily',
+                    'compaction_state', 'collection_runs')
+
+def prepare_schema(params: Dict, reset: bool):
+    engine = create_engine(
+        f"postgresql://{params['user']}:{params['password'] or ''}@{params['host']}:{params['port']}/{params['database']}"
+    )
+    Base.metadata.create_all(engine)
+    engine.dispose()
+    if reset:
+        conn = psycopg2.connect(**params)
+        cur = conn.cursor()
+        cur.execute(f"TRUNCATE {', '.join(GENERATED_TABLES)} RESTART IDENTITY CASCADE")
+        conn.commit()
+        conn.close()
+        logger.info(f"Truncated {', '.join(GENERATED_TABLES)}")
+
+def load_items(conn, names: List[str], created_at: datetime) -> Dict[str, int]:
+    """COPY the catalog into items (skipping names that already exist) and return their ids"""
+    cur = conn.cursor()
+    cur.execute("""
+        CREATE TEMP TABLE generated_items
+        (market_hash_name TEXT, item_type TEXT, weapon_type TEXT, skin_name TEXT, wear TEXT, created_at TIMESTAMPTZ)
+        ON COMMIT DROP
+    """)
+    rows = []
+    for name in names:
+        fields = item_fields(name)
+        rows.append((name, fields['item_type'], fields['weapon_type'], fields['skin_name'], fields['wear'], created_at))
+    cur.copy_expert("COPY generated_items FROM STDIN", to_copy_buffer(rows))
+    cur.execute("""
+        INSERT INTO items (market_hash_name, item_type, weapon_type, skin_name, wear, created_at)
+        SELECT * FROM generated_items
+        ON CONFLICT (market_hash_name) DO NOTHING
+    """)
+    inserted = cur.rowcount
+    cur.execute("SELECT i.market_hash_name, i.item_id FROM items i JOIN generated_items g USING (market_hash_name)")
+    item_ids = dict(cur.fetchall())
+    conn.commit()
+    cur.close()
+    logger.info(f"Loaded {inserted} new items ({len(names) - inserted} already present)")
+    return item_ids
+
+def load_ticks(params: Dict, item_ids: List[int], base_prices: List[float], day_counts: List[int],
+               start: datetime, end: datetime, volatility: float, steam_share: float, seed: int) -> int:
+    """Simulate and COPY one slice of items' ticks day by day up to end, committing after each day"""
+    simulator = MarketSimulator(item_ids, base_prices, volatility=volatility, steam_share=steam_share, seed=seed)
+    conn = psycopg2.connect(**params)
+    cur = conn.cursor()
+    written = 0
+    try:
+        # The ids come straight from items, so skip the per-row foreign key check when allowed
+        # (superuser only); it costs almost half of the COPY time
+        try:
+            cur.execute("SET session_replication_role = replica")
+        except psycopg2.Error:
+            conn.rollback()
+        for offset, count in enumerate(day_counts):
+            if not count:
+                continue
+            ticks = simulator.day(start + timedelta(days=offset), count, until=end)
+            cur.copy_expert(
+                f"COPY price_history ({', '.join(PRICE_HISTORY_COLUMNS)}) FROM STDIN WITH (FORMAT binary)",
+                io.BytesIO(to_binary_copy(*ticks))
+            )
+            conn.commit()
+            written += count
+    finally:
+        cur.close()
+        conn.close()
+    return written
+
+def build_rollups(conn, start: datetime, end: datetime):
+    """Derive candles day by day, then latest_prices and the items' current Buff price"""
+    day = start
+    while day < end:
+        for interval in CANDLE_TABLES:
+            rebuild_candles(conn, interval, since=day, until=day + timedelta(days=1))
+        conn.commit()
+        day += timedelta(days=1)
+
+    cur = conn.cursor()
+    rebuild_latest_prices(conn)
+    cur.execute("""
+        UPDATE items
+        SET buff_price = lp.price,
+            volume = COALESCE(lp.volume, items.volume)
+        FROM latest_prices lp
+        WHERE lp.item_id = items.item_id AND lp.source = 'buff'
+    """)
+    conn.commit()
+    conn.autocommit = True
+    cur.execute(f"ANALYZE {', '.join(GENERATED_TABLES)}")
+    conn.autocommit = False
+    cur.close()
+
+def main():
+    """Bulk-load a synthetic catalog and random-walk price history for load and scale testing"""
+    parser = argparse.ArgumentParser(description="Generate synthetic CS2 market data into DB_NAME")
+    parser.add_argument('--items', type=int, default=1000, help="Catalog size")
+    parser.add_argument('--ticks', type=int, default=1_000_000, help="Total price_history rows to generate")
+    parser.add_argument('--days', type=int, default=90, help="Days of history, ending today (UTC)")
+    parser.add_argument('--steam-share', type=float, default=0.2, help="Fraction of ticks quoted by Steam")
+    parser.add_argument('--volatility', type=float, default=0.03, help="Daily log-price volatility")
+    parser.add_argument('--workers', type=int, default=1, help="Parallel loader processes")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--reset', action='store_true', help="Truncate items and all price tables first")
+    args = parser.parse_args()
+
+    params = get_db_params()
+    prepare_schema(params, args.reset)
+
+    # Today is generated up to now only: latest_prices never moves back, so a tick dated in
+    # the future would hold off real collector ticks until its time passed
+    end = datetime.now(timezone.utc)
+    start = bucket_start(end, 'daily') - timedelta(days=args.days - 1)
+    conn = psycopg2.connect(**params)
+    ensure_partitions(conn, start=start)
+    conn.commit()
+
+    started = time.perf_counter()
+    names = build_catalog(args.items, seed=args.seed)
+    item_ids = load_items(conn, names, created_at=start)
+    rng = np.random.default_rng(args.seed)
+    items = [(item_ids[name], base_price(name, rng)) for name in names]
+
+    # Each worker walks its own slice of items and gets the ticks those items would have drawn
+    slices = split_evenly(items, args.workers)
+    all_prices = [price for _, price in items]
+    totals = [int(round(args.ticks * tick_share(all_prices, [price for _, price in chunk]))) for chunk in slices]
+    totals[-1] += args.ticks - sum(totals)
+    with ProcessPoolExecutor(max_workers=len(slices)) as pool:
+        futures = [
+            pool.submit(load_ticks, params, [item_id for item_id, _ in chunk], [price for _, price in chunk],
+                        ticks_per_day(total, args.days), start, end, args.volatility, args.steam_share, args.seed + n)
+            for n, (chunk, total) in enumerate(zip(slices, totals))
+        ]
+        written = sum(future.result() for future in futures)
+    load_seconds = time.perf_counter() - started
+    logger.info(f"Loaded {written} ticks in {load_seconds:.1f}s ({written / load_seconds:,.0f} rows/s)")
+
+    build_rollups(conn, start, end)
+    conn.close()
+    logger.info(f"Generated {len(items)} items x {written} ticks over {args.days} days "
+                f"in {time.perf_counter() - started:.1f}s")
+
+if __name__ == "__main__":
+    main()
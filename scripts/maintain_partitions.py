@@ -0,0 +1,80 @@
+import sys
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import argparse
+import logging
+from sqlalchemy import create_engine
+from backend.app.models.database import PriceHistory
+from backend.app.services.db_pool import get_db_params
+from backend.app.services.partitions import apply_retention, ensure_partitions, is_partitioned
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+OLD_INDEXES = ('idx_price_history_item_id', 'idx_price_history_timestamp', 'idx_price_history_source')
+
+def get_engine():
+    params = get_db_params()
+    return create_engine(
+        f"postgresql://{params['user']}:{params['password'] or ''}@{params['host']}:{params['port']}/{params['database']}"
+    )
+
+def migrate_to_partitioned(sa_conn) -> bool:
+    """Rebuild an unpartitioned price_history as the monthly partitioned table, keeping ids and rows"""
+    conn = sa_conn.connection
+    if is_partitioned(conn):
+        return False
+
+    cur = conn.cursor()
+    cur.execute("ALTER TABLE price_history RENAME TO price_history_unpartitioned")
+    cur.execute("ALTER INDEX IF EXISTS price_history_pkey RENAME TO price_history_unpartitioned_pkey")
+    cur.execute("ALTER SEQUENCE IF EXISTS price_history_id_seq RENAME TO price_history_unpartitioned_id_seq")
+    for index in OLD_INDEXES:
+        cur.execute(f"DROP INDEX IF EXISTS {index}")
+
+    PriceHistory.__table__.create(sa_conn)
+    cur.execute("SELECT MIN(timestamp), COUNT(*) FROM price_history_unpartitioned")
+    oldest, rows = cur.fetchone()
+    ensure_partitions(conn, start=oldest)
+
+    cur.execute("""
+        INSERT INTO price_history (id, item_id, price, volume, source, timestamp)
+        SELECT id, item_id, price, volume, source, timestamp
+        FROM price_history_unpartitioned
+    """)
+    cur.execute("SELECT setval('price_history_id_seq', COALESCE((SELECT MAX(id) FROM price_history), 0) + 1, false)")
+    cur.execute("DROP TABLE price_history_unpartitioned")
+    cur.close()
+    logger.info(f"Migrated {rows} price_history rows into monthly partitions")
+    return True
+
+def main():
+    """Create upcoming price_history partitions and apply the retention policy (run daily)"""
+    parser = argparse.ArgumentParser(description="Maintain monthly price_history partitions")
+    parser.add_argument('--months-ahead', type=int, help="Future months to pre-create (default PARTITION_MONTHS_AHEAD)")
+    parser.add_argument('--retention-months', type=int,
+                        help="Months of history to keep, 0 for all (default PRICE_HISTORY_RETENTION_MONTHS)")
+    parser.add_argument('--mode', choices=['detach', 'drop'],
+                        help="What to do with expired partitions (default PRICE_HISTORY_RETENTION_MODE)")
+    parser.add_argument('--migrate', action='store_true',
+                        help="Convert an existing unpartitioned price_history first")
+    args = parser.parse_args()
+
+    engine = get_engine()
+    try:
+        with engine.begin() as sa_conn:
+            if args.migrate:
+                migrate_to_partitioned(sa_conn)
+            ensure_partitions(sa_conn.connection, months_ahead=args.months_ahead)
+            apply_retention(sa_conn.connection, retention_months=args.retention_months, mode=args.mode)
+    finally:
+        engine.dispose()
+
+if __name__ == "__main__":
+    main()
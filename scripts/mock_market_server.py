@@ -0,0 +1,217 @@
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import random
+import zlib
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from aiohttp import web
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+BUFF_GOODS_PATH = '/api/market/goods'
+STEAM_PRICE_PATH = '/market/priceoverview/'
+CNY_PER_USD = 7.1
+
+
+def request_key(path: str, params: Dict) -> Tuple[str, str]:
+    return path.rstrip('/'), json.dumps(sorted((str(k), str(v)) for k, v in params.items()))
+
+
+def load_recordings(path: str) -> Dict[Tuple[str, str], List[Dict]]:
+    """Index recorded exchanges (written with SCRAPER_RECORD_PATH) by path and params"""
+    recordings = defaultdict(list)
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            exchange = json.loads(line)
+            recordings[request_key(urlparse(exchange['url']).path, exchange.get('params', {}))].append(exchange)
+    logger.info(f"Loaded {sum(len(v) for v in recordings.values())} recorded responses from {path}")
+    return recordings
+
+
+def load_catalog(path: str) -> List[str]:
+    """Read item names from a CSV with a 'name' column (like data/sale.csv) or one name per line"""
+    with open(path, encoding='utf-8') as f:
+        if path.endswith('.csv'):
+            return [row['name'] for row in csv.DictReader(f) if row.get('name')]
+        return [line.strip() for line in f if line.strip()]
+
+
+def base_price(name: str) -> float:
+    """Deterministic CNY price for an item name"""
+    return 0.5 + (zlib.crc32(name.encode('utf-8')) % 200000) / 100
+
+
+class MockMarket:
+    """Stand-in for the Buff goods and Steam priceoverview endpoints"""
+
+    def __init__(self, recordings: Optional[Dict] = None, catalog: Optional[List[str]] = None,
+                 latency_ms: float = 0, jitter_ms: float = 0, error_rate: float = 0,
+                 throttle_rate: float = 0, retry_after: float = 1, page_size: int = 80,
+                 synthesize: bool = True, seed: Optional[int] = None):
+        self.recordings = recordings or {}
+        self.catalog = catalog or []
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.page_size = page_size
+        self.synthesize = synthesize
+        self.random = random.Random(seed)
+        self.stats = defaultdict(int)
+        self._replay_positions = defaultdict(int)
+
+    def create_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get(BUFF_GOODS_PATH, self.handle)
+        app.router.add_get(STEAM_PRICE_PATH, self.handle)
+        app.router.add_get('/_stats', self.handle_stats)
+        return app
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(dict(self.stats))
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.stats['requests'] += 1
+        delay_ms = max(0.0, self.random.gauss(self.latency_ms, self.jitter_ms)) if self.jitter_ms else self.latency_ms
+        if delay_ms:
+            await asyncio.sleep(delay_ms / 1000)
+
+        roll = self.random.random()
+        if roll < self.throttle_rate:
+            self.stats['throttled'] += 1
+            return web.json_response({'error': 'Too Many Requests'}, status=429,
+                                     headers={'Retry-After': str(self.retry_after)})
+        if roll < self.throttle_rate + self.error_rate:
+            self.stats['errors'] += 1
+            return web.json_response({'error': 'Internal Server Error'}, status=500)
+
+        query = dict(request.query)
+        exchange = self._replay(request.path, query)
+        if exchange is not None:
+            self.stats['replayed'] += 1
+            body = exchange['body']
+            return web.Response(
+                status=exchange['status'],
+                text=body if isinstance(body, str) else json.dumps(body),
+                content_type='application/json',
+                headers=exchange.get('headers') or {}
+            )
+
+        if not self.synthesize:
+            self.stats['missing'] += 1
+            return web.json_response({'error': 'No recording for request'}, status=404)
+
+        self.stats['synthesized'] += 1
+        if request.path.rstrip('/') == BUFF_GOODS_PATH:
+            return web.json_response(self._buff_goods(query))
+        return web.json_response(self._steam_price(query))
+
+    def _replay(self, path: str, query: Dict) -> Optional[Dict]:
+        """Serve recorded responses for a request in order, cycling when exhausted"""
+        key = request_key(path, query)
+        exchanges = self.recordings.get(key)
+        if not exchanges:
+            return None
+        position = self._replay_positions[key]
+        self._replay_positions[key] = position + 1
+        return exchanges[position % len(exchanges)]
+
+    def _buff_item(self, name: str) -> Dict:
+        price = base_price(name) * (1 + self.random.gauss(0, 0.01))
+        return {
+            'market_hash_name': name,
+            'sell_min_price': f"{price:.2f}",
+            'sell_num': zlib.crc32(name.encode('utf-8')) % 2000,
+            'goods_info': {'steam_price_cny': f"{price * 1.15:.2f}"}
+        }
+
+    def _buff_goods(self, query: Dict) -> Dict:
+        page_size = int(query.get('page_size', self.page_size))
+        page_num = int(query.get('page_num', 1))
+        if query.get('search'):
+            names = [query['search']]
+            total = 1
+        else:
+            start = (page_num - 1) * page_size
+            names = self.catalog[start:start + page_size]
+            total = len(self.catalog)
+        return {
+            'code': 'OK',
+            'msg': None,
+            'data': {
+                'items': [self._buff_item(name) for name in names],
+                'page_num': page_num,
+                'page_size': page_size,
+                'total_count': total,
+                'total_page': max(1, -(-total // page_size))
+            }
+        }
+
+    def _steam_price(self, query: Dict) -> Dict:
+        name = query.get('market_hash_name', '')
+        price = base_price(name) / CNY_PER_USD * (1 + self.random.gauss(0, 0.01))
+        return {
+            'success': True,
+            'lowest_price': f"${price:,.2f}",
+            'volume': f"{zlib.crc32(name.encode('utf-8')) % 5000:,}",
+            'median_price': f"${price * 1.02:,.2f}"
+        }
+
+
+async def start_server(market: MockMarket, host: str = '127.0.0.1', port: int = 8765) -> web.AppRunner:
+    """Start the mock market inside the running event loop; call runner.cleanup() to stop it"""
+    runner = web.AppRunner(market.create_app(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    logger.info(f"Mock market listening on http://{host}:{port}")
+    return runner
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve recorded or synthetic Buff/Steam market responses")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--recordings', help="JSONL file written with SCRAPER_RECORD_PATH")
+    parser.add_argument('--catalog', default=str(Path(__file__).parent.parent / 'data' / 'sale.csv'),
+                        help="Item names listed by the synthetic Buff market crawl")
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--jitter-ms', type=float, default=0)
+    parser.add_argument('--error-rate', type=float, default=0, help="Fraction of requests answered with 500")
+    parser.add_argument('--throttle-rate', type=float, default=0, help="Fraction of requests answered with 429")
+    parser.add_argument('--retry-after', type=float, default=1)
+    parser.add_argument('--no-synthesize', action='store_true', help="Answer 404 when no recording matches")
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+
+    market = MockMarket(
+        recordings=load_recordings(args.recordings) if args.recordings else None,
+        catalog=load_catalog(args.catalog) if args.catalog else None,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after,
+        synthesize=not args.no_synthesize,
+        seed=args.seed
+    )
+    logger.info("Point the collector here with "
+                f"BUFF_BASE_URL=http://{args.host}:{args.port} STEAM_BASE_URL=http://{args.host}:{args.port}")
+    web.run_app(market.create_app(), host=args.host, port=args.port, access_log=None)
+
+
+if __name__ == "__main__":
+    main()
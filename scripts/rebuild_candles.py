@@ -0,0 +1,50 @@
+import sys
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import argparse
+import logging
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import create_engine
+from backend.app.models.database import CompactionState, PriceCandleDaily, PriceCandleHourly
+from backend.app.services.candles import CANDLE_TABLES, rebuild_candles
+from backend.app.services.compaction import get_watermark
+from backend.app.services.db_pool import get_pool, get_db_params
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+def main():
+    """Create the candle tables and indexes if needed and recompute them from raw price_history"""
+    parser = argparse.ArgumentParser(description="Rebuild hourly/daily price candles from price_history")
+    parser.add_argument('--days', type=int, help="Only rebuild the last N days (default: everything)")
+    args = parser.parse_args()
+
+    params = get_db_params()
+    engine = create_engine(
+        f"postgresql://{params['user']}:{params['password'] or ''}@{params['host']}:{params['port']}/{params['database']}"
+    )
+    for model in (PriceCandleHourly, PriceCandleDaily, CompactionState):
+        model.__table__.create(engine, checkfirst=True)
+        for index in model.__table__.indexes:
+            index.create(engine, checkfirst=True)
+    engine.dispose()
+
+    since = datetime.now(timezone.utc) - timedelta(days=args.days) if args.days else None
+    with get_pool().connection() as conn:
+        # Raw ticks before the compaction watermark are gone; their candles are the only copy
+        compacted_until = get_watermark(conn, 'raw')
+        if compacted_until and (since is None or since < compacted_until):
+            logger.info(f"Not rebuilding before {compacted_until}: already compacted")
+            since = compacted_until
+        for interval in CANDLE_TABLES:
+            rebuild_candles(conn, interval, since=since)
+        conn.commit()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+import sys
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import logging
+from sqlalchemy import create_engine
+from backend.app.models.database import LatestPrice
+from backend.app.services.db_pool import get_pool, get_db_params
+from backend.app.services.price_writer import rebuild_latest_prices
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+def main():
+    """Populate latest_prices from existing price_history (one-off after upgrading)"""
+    params = get_db_params()
+    engine = create_engine(
+        f"postgresql://{params['user']}:{params['password'] or ''}@{params['host']}:{params['port']}/{params['database']}"
+    )
+    LatestPrice.__table__.create(engine, checkfirst=True)
+    engine.dispose()
+
+    with get_pool().connection() as conn:
+        rows = rebuild_latest_prices(conn)
+        conn.commit()
+    logger.info(f"Upserted {rows} latest_prices rows from price_history")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+import sys
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import argparse
+import logging
+from sqlalchemy import create_engine
+from backend.app.models.database import AnalyticsSnapshot
+from backend.app.services.analytics_snapshots import refresh_snapshot
+from backend.app.services.config import ANALYTICS_REFRESH_INTERVAL
+from backend.app.services.db_pool import get_pool, get_db_params
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+def main():
+    """Create the snapshot table if needed and compute a new /analytics snapshot"""
+    parser = argparse.ArgumentParser(description="Precompute the market analytics snapshot")
+    parser.add_argument('--if-stale', action='store_true',
+                        help=f"Skip if the latest snapshot is younger than {ANALYTICS_REFRESH_INTERVAL:.0f}s")
+    args = parser.parse_args()
+
+    params = get_db_params()
+    engine = create_engine(
+        f"postgresql://{params['user']}:{params['password'] or ''}@{params['host']}:{params['port']}/{params['database']}"
+    )
+    AnalyticsSnapshot.__table__.create(engine, checkfirst=True)
+    engine.dispose()
+
+    with get_pool().connection() as conn:
+        version = refresh_snapshot(conn, min_interval=ANALYTICS_REFRESH_INTERVAL if args.if_stale else 0)
+    if version is None:
+        logger.info("Latest snapshot is still fresh or another refresh is running; nothing to do")
+
+if __name__ == "__main__":
+    main()
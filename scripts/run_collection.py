@@ -10,10 +10,13 @@ import schedule
 import time
 from datetime import datetime
 import logging
-import psycopg2
+from typing import Optional
 from psycopg2.extras import RealDictCursor
-from dotenv import load_dotenv
+from backend.app.services.analytics_snapshots import refresh_snapshot
 from backend.app.services.price_collector import PriceCollector
+from backend.app.services.db_pool import get_pool
+from backend.app.services.refresh_scheduler import RefreshScheduler
+from backend.app.services.config import RATE_LIMITS
 
 logging.basicConfig(
     level=logging.INFO,
@@ -28,33 +31,25 @@ logger = logging.getLogger(__name__)
 def verify_collection():
     """Verify that prices were collected successfully"""
     try:
-        load_dotenv()
-        db_params = {
-            'host': os.getenv('DB_HOST'),
-            'database': os.getenv('DB_NAME'),
-            'user': os.getenv('DB_USER'),
-            'password': os.getenv('DB_PASSWORD'),
-            'port': os.getenv('DB_PORT')
-        }
+        with get_pool().connection() as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
         
-        conn = psycopg2.connect(**db_params)
-        cur = conn.cursor(cursor_factory=RealDictCursor)
+            cur.execute("""
+                SELECT 
+                    i.market_hash_name,
+                    ph.price,
+                    ph.source,
+                    ph.timestamp
+                FROM price_history ph
+                JOIN items i ON ph.item_id = i.item_id
+                WHERE ph.timestamp > NOW() - INTERVAL '1 hour'
+                AND ph.source = 'buff'
+                ORDER BY ph.timestamp DESC
+                LIMIT 5
+            """)
         
-        cur.execute("""
-            SELECT 
-                i.market_hash_name,
-                ph.price,
-                ph.source,
-                ph.timestamp
-            FROM price_history ph
-            JOIN items i ON ph.item_id = i.item_id
-            WHERE ph.timestamp > NOW() - INTERVAL '1 hour'
-            AND ph.source = 'buff'
-            ORDER BY ph.timestamp DESC
-            LIMIT 5
-        """)
-        
-        recent_prices = cur.fetchall()
+            recent_prices = cur.fetchall()
+            cur.close()
         if recent_prices:
             logger.info("Recent price collections:")
             for price in recent_prices:
@@ -67,44 +62,93 @@ def verify_collection():
     except Exception as e:
         logger.error(f"Error verifying collection: {e}")
         return False
-    finally:
-        if conn:
-            cur.close()
-            conn.close()
 
-async def run_scheduled_collection():
-    """Run price collection and verify results"""
+async def run_scheduled_collection(items=None, collector: Optional[PriceCollector] = None) -> bool:
+    """Run price collection and verify results; False if it failed or another collector was sweeping.
+
+    Pass a long-lived collector to reuse its HTTP sessions; without one, a collector is made and closed.
+    """
+    owned = collector is None
+    collector = collector or PriceCollector()
     try:
         start_time = time.time()
-        logger.info(f"Starting scheduled collection at {datetime.now()}")
+        logger.info(f"Starting scheduled collection at {datetime.now()}"
+                    + (f" for {len(items)} due items" if items is not None else ""))
         
-        collector = PriceCollector()
-        await collector.collect_and_store_prices()
+        if not await collector.collect_and_store_prices(items):
+            return False
         
         if verify_collection():
             logger.info("✅ Price collection completed successfully!")
         else:
             logger.error("Price collection may have failed!")
+
+        # Precompute the /analytics page; throttled to ANALYTICS_REFRESH_INTERVAL
+        try:
+            await get_pool().run(refresh_snapshot)
+        except Exception as e:
+            logger.error(f"Error refreshing analytics snapshot: {e}")
             
         execution_time = time.time() - start_time
         logger.info(f"Collection completed in {execution_time:.2f} seconds")
+        return True
         
     except Exception as e:
         logger.error(f"Error in collection: {e}")
+        return False
+    finally:
+        if owned:
+            await collector.close()
+
+async def run_refresh_loop(poll_seconds: int = 30, catalog_reload_seconds: int = 3600):
+    """Refresh items as they come due, spending the Buff request budget where prices move"""
+    requests_per_second = RATE_LIMITS['buff.163.com'][0]
+    scheduler = RefreshScheduler()
+
+    # Connections are borrowed per step so the loop never pins one while it sleeps
+    with get_pool().connection() as conn:
+        scheduler.load(conn)
+    catalog_loaded_at = time.time()
+
+    # One collector, and so one set of keep-alive HTTP sessions, for the life of the loop
+    async with PriceCollector() as collector:
+        while True:
+            if time.time() - catalog_loaded_at >= catalog_reload_seconds:
+                with get_pool().connection() as conn:
+                    scheduler.load(conn)
+                catalog_loaded_at = time.time()
+
+            budget = max(1, int(requests_per_second * poll_seconds))
+            batch = scheduler.pop_due(budget)
+            if batch:
+                if await run_scheduled_collection(batch, collector):
+                    with get_pool().connection() as conn:
+                        scheduler.reschedule(conn, [item['item_id'] for item in batch])
+                else:
+                    # Nothing was stored for the batch: keep it due, backing off while failures repeat
+                    scheduler.retry(batch)
+
+            next_due = scheduler.next_due_in()
+            await asyncio.sleep(poll_seconds if next_due is None else min(poll_seconds, max(next_due, 1)))
 
 def main():
     """Main function to run the collection schedule"""
     logger.info("Starting price collection service")
-    
-    asyncio.run(run_scheduled_collection())
-    
-    schedule.every().hour.at(":00").do(lambda: asyncio.run(run_scheduled_collection()))
-    
-    logger.info("Price collection scheduled for every hour")
-    
-    while True:
-        schedule.run_pending()
-        time.sleep(60)
+
+    if os.getenv('COLLECTOR_MODE') == 'crawl':
+        # A crawl prices the whole market at once, so per-item scheduling buys nothing
+        asyncio.run(run_scheduled_collection())
+        
+        schedule.every().hour.at(":00").do(lambda: asyncio.run(run_scheduled_collection()))
+        
+        logger.info("Price collection scheduled for every hour")
+        
+        while True:
+            schedule.run_pending()
+            time.sleep(60)
+
+    logger.info("Refreshing items by volatility, volume and staleness")
+    asyncio.run(run_refresh_loop())
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()